@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""Content-addressed response cache shared by the AI request clients."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# Bump when the canonical encoding changes so old keys are never misread.
+CACHE_KEY_VERSION = 1
+
+DEFAULT_BACKEND = os.environ.get("AI_CACHE_BACKEND", "sqlite")
+DEFAULT_MAX_BYTES = int(os.environ.get("AI_CACHE_MAX_BYTES", str(1024 ** 3)))
+DEFAULT_TTL_SECONDS = float(os.environ.get("AI_CACHE_TTL_SECONDS", "0")) or None
+# Size of the in-process tier in front of every backend; 0 disables it.
+DEFAULT_MEMORY_BYTES = int(os.environ.get("AI_CACHE_MEMORY_BYTES", str(64 * 1024 ** 2)))
+
+# abs(hash(prompt)) of a str is a 64-bit value, almost always 15-19 digits; shorter numeric
+# names are more likely explicit ``filename=`` caches, which must be left alone.
+_LEGACY_FILENAME_RE = re.compile(r"^\d{15,19}\.json$")
+_KEY_FILENAME_RE = re.compile(r"^[0-9a-f]{64}\.json$")
+_migrated_dirs: set[str] = set()
+_backends: Dict[Tuple[str, str], "CacheBackend"] = {}
+_registry_lock = threading.Lock()
+_memory_cache: Optional["MemoryCache"] = None
+
+
+def _canonical(payload: Any) -> bytes:
+    return json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode("utf-8")
+
+
+def cache_key(**params: Any) -> str:
+    """Return a stable SHA-256 key over every parameter that shapes a response.
+
+    Keys are sorted and encoded compactly, so the same request maps to the same
+    key in every process regardless of ``PYTHONHASHSEED`` or argument order.
+    """
+    return hashlib.sha256(_canonical({"v": CACHE_KEY_VERSION, **params})).hexdigest()
+
+
+def legacy_cache_key(prompt: str) -> str:
+    """Key for entries whose only recorded input is the prompt text."""
+    return cache_key(legacy_prompt=prompt)
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for one cache backend."""
+
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    expired: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class CacheBackend(Protocol):
+    """Storage for cached responses, addressed by ``cache_key`` values."""
+
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    def set(self, key: str, response: Any, prompt: Optional[str] = None) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+
+class FileResponseCache:
+    """One JSON file per response under ``<cache_dir>/<ab>/<cd>/<key>.json``.
+
+    Two levels of 256-way sharding keep directories small at hundreds of
+    thousands of entries. Writes go to a temporary file that is renamed into
+    place, so readers never see a torn entry. There is no eviction; use
+    ``SQLiteResponseCache`` when the cache must stay within a size budget.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = Path(cache_dir)
+        self._stats = CacheStats()
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key[2:4] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with open(self.path_for(key), "r", encoding="utf-8") as handle:
+                response = json.load(handle)["response"]
+        except FileNotFoundError:
+            self._stats.misses += 1
+            return None
+        except (OSError, ValueError, KeyError) as exc:
+            LOGGER.warning("Ignoring unreadable cache entry %s: %s", key, exc)
+            self._stats.misses += 1
+            return None
+        self._stats.hits += 1
+        return response
+
+    def set(self, key: str, response: Any, prompt: Optional[str] = None) -> None:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump({"prompt": prompt, "response": response}, handle, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._stats.writes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "files", **self._stats.as_dict()}
+
+
+class SQLiteResponseCache:
+    """Responses in one SQLite file (WAL mode), bounded by age and total size.
+
+    Each write is its own transaction, so entries are never torn and many
+    threads or processes can share the file. Entries older than ``ttl_seconds``
+    are treated as misses and dropped. When the stored payloads exceed
+    ``max_bytes``, the least recently used entries are evicted down to 90% of
+    the budget. Access times are refreshed at most once a minute per entry to
+    keep hits from turning into writes.
+    """
+
+    _TOUCH_INTERVAL = 60.0
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)"
+        )
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, accessed_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats.misses += 1
+                return None
+            value, created_at, accessed_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._delete(key)
+                self._stats.expired += 1
+                self._stats.misses += 1
+                return None
+            if now - accessed_at > self._TOUCH_INTERVAL:
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+            self._stats.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, response: Any, prompt: Optional[str] = None) -> None:
+        value = json.dumps(response, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._total_bytes += len(value) - (previous[0] if previous else 0)
+            self._stats.writes += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _delete(self, key: str) -> None:
+        row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= row[0]
+
+    def _evict(self) -> None:
+        # Other processes may share the file, so re-read the real total first.
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            victims = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 256"
+            ).fetchall()
+            if not victims:
+                break
+            chosen = []
+            for key, size in victims:
+                chosen.append((key,))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", chosen)
+            self._stats.evictions += len(chosen)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "backend": "sqlite",
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                **self._stats.as_dict(),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU of responses, bounded by their encoded size.
+
+    Strings are kept as-is. Other responses are kept as their JSON text and
+    decoded on every hit, so callers can mutate what they get back without
+    corrupting the cached copy; that still skips the disk read, the SQLite
+    round trip and the backend lock. Entries larger than an eighth of the budget
+    are not kept so one huge response cannot flush the whole tier.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MEMORY_BYTES,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[bool, str, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            is_text, payload, size, stored_at = entry
+            if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self._bytes -= size
+                self._stats.expired += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+        return payload if is_text else json.loads(payload)
+
+    def set(self, key: str, response: Any, prompt: Optional[str] = None) -> None:
+        is_text = isinstance(response, str)
+        payload = response if is_text else json.dumps(response, ensure_ascii=False)
+        size = len(key) + len(payload)
+        if size > self.max_bytes // 8:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (is_text, payload, size, time.time())
+            self._bytes += size
+            self._stats.writes += 1
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self._stats.as_dict(),
+            }
+
+
+class TieredCache:
+    """A ``MemoryCache`` in front of a persistent backend.
+
+    Reads try memory first and fill it from the backend on a hit; writes go to
+    both. ``stats`` reports each tier separately plus the combined hit ratio.
+    The backend's ratio is over the lookups that missed memory.
+    """
+
+    def __init__(self, memory: MemoryCache, backend: CacheBackend) -> None:
+        self.memory = memory
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._lookups = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.lookup(key)[0]
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """The cached response and the tier that held it ("memory" or "persistent")."""
+        response, tier = self.memory.get(key), "memory"
+        if response is None:
+            response, tier = self.backend.get(key), "persistent"
+            if response is not None:
+                self.memory.set(key, response)
+        with self._lock:
+            self._lookups += 1
+            self._hits += response is not None
+        return response, tier if response is not None else None
+
+    def set(self, key: str, response: Any, prompt: Optional[str] = None) -> None:
+        self.backend.set(key, response, prompt=prompt)
+        self.memory.set(key, response)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, lookups = self._hits, self._lookups
+        return {
+            "backend": "tiered",
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "memory": self.memory.stats(),
+            "persistent": self.backend.stats(),
+        }
+
+
+def shared_memory_cache() -> Optional[MemoryCache]:
+    """The process-wide in-memory tier, or None when ``AI_CACHE_MEMORY_BYTES`` is 0."""
+    global _memory_cache
+    if DEFAULT_MEMORY_BYTES <= 0:
+        return None
+    with _registry_lock:
+        if _memory_cache is None:
+            _memory_cache = MemoryCache()
+        return _memory_cache
+
+
+def open_cache_backend(cache_dir: str, kind: Optional[str] = None) -> CacheBackend:
+    """Return the process-wide backend of ``kind`` for ``cache_dir``.
+
+    ``kind`` is ``"sqlite"`` (the default, overridable with ``AI_CACHE_BACKEND``)
+    or ``"files"``. Clients that share a directory share one backend, and so
+    one SQLite connection and one set of statistics. Every backend sits behind
+    the one ``shared_memory_cache`` of the process, which is safe to share
+    across directories because keys already cover provider, model and inputs.
+    Old file entries in the directory are migrated into it the first time it
+    is opened.
+    """
+    kind = (kind or DEFAULT_BACKEND).strip().lower()
+    registry_key = (kind, str(Path(cache_dir).resolve()))
+    memory = shared_memory_cache()
+    with _registry_lock:
+        cached = _backends.get(registry_key)
+        if cached is not None:
+            return cached
+        backend: CacheBackend
+        if kind == "sqlite":
+            backend = SQLiteResponseCache(os.path.join(cache_dir, "responses.sqlite3"))
+        elif kind == "files":
+            backend = FileResponseCache(cache_dir)
+        else:
+            raise ValueError(f"Unknown AI cache backend: {kind!r}")
+        _backends[registry_key] = TieredCache(memory, backend) if memory else backend
+    migrate_legacy_cache(cache_dir, backend)
+    return _backends[registry_key]
+
+
+def migrate_legacy_cache(cache_dir: str, cache: Optional[CacheBackend] = None) -> int:
+    """Move file-based entries in ``cache_dir`` into ``cache``.
+
+    When ``cache`` is not a ``FileResponseCache``, sharded ``<key>.json``
+    entries are imported under their key. ``abs(hash(prompt)).json`` files
+    from before content-addressed keys only recorded the prompt, not the
+    model, system prompt or schema that produced the response, so no full key
+    can be rebuilt for them; they are deleted rather than served to requests
+    they may not match. Runs once per directory and backend per process and
+    returns the number of entries moved.
+    """
+    root = Path(cache_dir)
+    cache = cache or FileResponseCache(cache_dir)
+    import_sharded = not isinstance(cache, FileResponseCache)
+    with _registry_lock:
+        marker = f"{type(cache).__name__}:{root.resolve()}"
+        if marker in _migrated_dirs:
+            return 0
+        _migrated_dirs.add(marker)
+    if not root.is_dir():
+        return 0
+
+    dropped = 0
+    for entry in os.scandir(root):
+        if entry.is_file() and _LEGACY_FILENAME_RE.match(entry.name):
+            os.remove(entry.path)
+            dropped += 1
+    if dropped:
+        LOGGER.info("Dropped %d prompt-only cache entries in %s", dropped, root)
+
+    moved = 0
+    if not import_sharded:
+        return moved
+    for path in root.glob("[0-9a-f][0-9a-f]/[0-9a-f][0-9a-f]/*.json"):
+        if not _KEY_FILENAME_RE.match(path.name):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+            prompt, response = data["prompt"], data["response"]
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            LOGGER.warning("Skipping unreadable cache file %s: %s", path, exc)
+            continue
+        cache.set(path.stem, response, prompt=prompt)
+        os.remove(path)
+        moved += 1
+    if moved:
+        LOGGER.info("Migrated %d cache entries in %s", moved, root)
+    return moved
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    for directory in sys.argv[1:] or ["cache"]:
+        # Opening the backend migrates any file entries into it.
+        print(f"{directory}: {open_cache_backend(directory).stats()}")
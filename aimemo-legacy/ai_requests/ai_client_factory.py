@@ -4,20 +4,28 @@
 from __future__ import annotations
 
 import logging
+import os
 from pathlib import Path
 from typing import Optional, Tuple
 
 from echomind.ai_config import load_ai_model_config, normalize_mode, normalize_priority
-from echomind.openai_request import OpenAIRequestJSONBase
-from echomind.mixed_ai_request import MixedAIRequestJSONBase
+from echomind.openai_request import AsyncOpenAIRequestJSONBase, OpenAIRequestJSONBase
+from echomind.mixed_ai_request import AsyncMixedAIRequestJSONBase, MixedAIRequestJSONBase
 
 try:
-    from echomind.deepseek_requests import DeepSeekRequestJSONBase  # type: ignore
+    from echomind.deepseek_requests import (  # type: ignore
+        AsyncDeepSeekRequestJSONBase,
+        DeepSeekRequestJSONBase,
+    )
 except Exception:  # pragma: no cover - optional dependency
     DeepSeekRequestJSONBase = None  # type: ignore
+    AsyncDeepSeekRequestJSONBase = None  # type: ignore
 
 LOGGER = logging.getLogger(__name__)
 
+# AI_SEMANTIC_CACHE=1 turns on the semantic response cache for clients built here
+SEMANTIC_CACHE_DEFAULT = os.environ.get("AI_SEMANTIC_CACHE", "0").strip() == "1"
+
 
 def build_ai_request_client(
     mode: Optional[str] = None,
@@ -25,9 +33,21 @@ def build_ai_request_client(
     *,
     use_cache: bool = True,
     cache_dir: str = 'cache',
-    max_retries: int = 3
+    max_retries: int = 3,
+    cache_backend: Optional[str] = None,
+    async_mode: bool = False,
+    semantic_cache: Optional[bool] = None,
 ) -> Tuple[object, str]:
-    """Construct an AI request client and report which mode was used."""
+    """Construct an AI request client and report which mode was used.
+
+    ``cache_backend`` selects the response cache store ('sqlite' or 'files');
+    it defaults to ``AI_CACHE_BACKEND``. With ``async_mode`` the Async*
+    clients are returned, whose request and TTS methods are coroutines.
+    ``semantic_cache`` also answers near-duplicate prompts from the cache
+    (see ``echomind.semantic_cache``); it defaults to ``AI_SEMANTIC_CACHE``.
+    """
+    if semantic_cache is None:
+        semantic_cache = SEMANTIC_CACHE_DEFAULT
     cfg = load_ai_model_config()
     effective_mode = normalize_mode(mode or cfg.get('mode'))
     effective_priority = normalize_priority(priority or cfg.get('priority'))
@@ -41,20 +61,31 @@ def build_ai_request_client(
     if effective_mode == 'deepseek':
         if DeepSeekRequestJSONBase is None:
             raise RuntimeError('DeepSeek provider requested but client not available')
-        client = DeepSeekRequestJSONBase(use_cache=use_cache, max_retries=max_retries, cache_dir=cache_dir)
+        deepseek_class = AsyncDeepSeekRequestJSONBase if async_mode else DeepSeekRequestJSONBase
+        client = deepseek_class(
+            use_cache=use_cache, max_retries=max_retries, cache_dir=cache_dir,
+            cache_backend=cache_backend, semantic_cache=semantic_cache,
+        )
         return client, 'deepseek'
 
     if effective_mode == 'mixed':
-        client = MixedAIRequestJSONBase(
+        mixed_class = AsyncMixedAIRequestJSONBase if async_mode else MixedAIRequestJSONBase
+        client = mixed_class(
             providers=effective_priority,
             use_cache=use_cache,
             max_retries=max_retries,
             cache_dir=cache_dir,
+            cache_backend=cache_backend,
+            semantic_cache=semantic_cache,
         )
         return client, 'mixed'
 
     # Default to OpenAI
-    client = OpenAIRequestJSONBase(use_cache=use_cache, max_retries=max_retries, cache_dir=cache_dir)
+    openai_class = AsyncOpenAIRequestJSONBase if async_mode else OpenAIRequestJSONBase
+    client = openai_class(
+        use_cache=use_cache, max_retries=max_retries, cache_dir=cache_dir,
+        cache_backend=cache_backend, semantic_cache=semantic_cache,
+    )
     return client, 'openai'
 
 
@@ -64,15 +95,26 @@ def build_with_fallback(
     *,
     use_cache: bool = True,
     cache_dir: str = 'cache',
-    max_retries: int = 3
+    max_retries: int = 3,
+    cache_backend: Optional[str] = None,
+    async_mode: bool = False,
+    semantic_cache: Optional[bool] = None,
 ) -> Tuple[object, str]:
     """Create client but fall back to OpenAI if requested provider fails."""
     try:
-        return build_ai_request_client(mode=mode, priority=priority, use_cache=use_cache, cache_dir=cache_dir, max_retries=max_retries)
+        return build_ai_request_client(
+            mode=mode, priority=priority, use_cache=use_cache, cache_dir=cache_dir,
+            max_retries=max_retries, cache_backend=cache_backend, async_mode=async_mode,
+            semantic_cache=semantic_cache,
+        )
     except Exception as exc:
         LOGGER.warning("AI client build failed for mode=%s priority=%s: %s", mode, priority, exc)
         if (mode or '').lower() != 'openai':
             LOGGER.info("Falling back to OpenAI client")
-            return build_ai_request_client(mode='openai', priority=['openai'], use_cache=use_cache, cache_dir=cache_dir, max_retries=max_retries)
+            return build_ai_request_client(
+                mode='openai', priority=['openai'], use_cache=use_cache, cache_dir=cache_dir,
+                max_retries=max_retries, cache_backend=cache_backend, async_mode=async_mode,
+                semantic_cache=semantic_cache,
+            )
         raise
 
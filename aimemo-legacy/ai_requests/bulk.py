@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Bounded-concurrency execution of many independent AI requests."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+
+
+@dataclass
+class BulkResult:
+    """Outcome of one request in a ``send_many`` batch; exactly one of value/error is set."""
+
+    index: int
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_many(
+    call: Callable[..., Any],
+    requests: Sequence[Dict[str, Any]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> List[BulkResult]:
+    """Call ``call(**request)`` for every request on at most ``concurrency`` threads.
+
+    Results come back in input order. An exception fails only its own item.
+    """
+
+    def run(index: int, request: Dict[str, Any]) -> BulkResult:
+        try:
+            return BulkResult(index, value=call(**request))
+        except Exception as exc:
+            LOGGER.warning("Bulk request %d failed: %s", index, exc)
+            return BulkResult(index, error=exc)
+
+    if not requests:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(requests)))) as pool:
+        return list(pool.map(run, range(len(requests)), requests))
+
+
+async def run_many_async(
+    call: Callable[..., Awaitable[Any]],
+    requests: Sequence[Dict[str, Any]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> List[BulkResult]:
+    """Async version of ``run_many``; at most ``concurrency`` calls are awaited at once."""
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index: int, request: Dict[str, Any]) -> BulkResult:
+        async with slots:
+            try:
+                return BulkResult(index, value=await call(**request))
+            except Exception as exc:
+                LOGGER.warning("Bulk request %d failed: %s", index, exc)
+                return BulkResult(index, error=exc)
+
+    return list(await asyncio.gather(*(run(index, request) for index, request in enumerate(requests))))
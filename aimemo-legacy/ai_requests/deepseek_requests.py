@@ -1,12 +1,25 @@
 import os
 import json
-import traceback
+import logging
 import hashlib
 from datetime import datetime
 from pathlib import Path
 import pygame
 import tempfile
-from openai import OpenAI
+import asyncio
+import time
+from openai import AsyncOpenAI, OpenAI, RateLimitError
+
+from echomind.ai_cache import cache_key, legacy_cache_key, open_cache_backend
+from echomind.bulk import DEFAULT_CONCURRENCY, run_many, run_many_async
+from echomind.instrumentation import record_cache_hit, record_call
+from echomind.retry_policy import RetryPolicy
+from echomind.schema_validation import compiled_schema, memoized_conversion
+from echomind.rate_limit import estimate_tokens, limiter_for, rate_limit_stats
+from echomind.single_flight import shared_single_flight
+from echomind.stream_stats import StreamTimer, shared_stream_stats
+
+LOGGER = logging.getLogger(__name__)
 
 
 class JSONValidationError(Exception):
@@ -19,50 +32,66 @@ class JSONValidationError(Exception):
 class JSONParsingError(Exception):
     def __init__(self, message, json_string, text):
         super().__init__(message)
-        print("The failed JSON string: \n\n")
-        print(json_string)
+        LOGGER.error("The failed JSON string:\n%s", json_string)
         self.message = message
         self.json_string = json_string
         self.text = text
 
 
 class DeepSeekRequestJSONBase:
-    def __init__(self, use_cache=True, max_retries=3, cache_dir='cache'):
+    _client_class = OpenAI
+
+    def __init__(self, use_cache=True, max_retries=3, cache_dir='cache', cache_backend=None, coalesce=True, retry_policy=None, semantic_cache=None):
         # Initialize DeepSeek client
         api_key = os.environ.get("DEEPSEEK_API_KEY")
         if not api_key:
             raise ValueError("DEEPSEEK_API_KEY environment variable is required")
         
-        self.client = OpenAI(
+        self.client = self._client_class(
             api_key=api_key,
-            base_url="https://api.deepseek.com"
+            base_url="https://api.deepseek.com",
+            max_retries=0,  # retries are handled by self.retry_policy
         )
         self.max_retries = max_retries
+        # Backoff, Retry-After and retryable/fatal classification for every request loop
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=max_retries, feedback_errors=(json.JSONDecodeError, JSONValidationError)
+        )
         self.use_cache = use_cache
         self.cache_dir = cache_dir
         self.audio_cache_dir = os.path.join(cache_dir, 'audio')
         self.ensure_dir_exists(self.cache_dir)
         self.ensure_dir_exists(self.audio_cache_dir)
+        # Either a CacheBackend instance or a backend name for open_cache_backend ("sqlite", "files")
+        if cache_backend is None or isinstance(cache_backend, str):
+            cache_backend = open_cache_backend(cache_dir, cache_backend)
+        self.response_cache = cache_backend
+        # Optional reuse of responses to near-duplicate prompts: True for the shared index under cache_dir,
+        # embedded with OpenAI embeddings, or a SemanticCache instance (see semantic_cache; needs numpy)
+        if semantic_cache is True:
+            from echomind.semantic_cache import open_semantic_cache
+
+            semantic_cache = open_semantic_cache(cache_dir)
+        self.semantic_cache = semantic_cache or None
+        # Identical requests already in flight in this process are joined instead of re-sent
+        self.coalesce = coalesce
+        self.flights = shared_single_flight()
+        self.stream_timings = shared_stream_stats()
         
         # Initialize pygame mixer for audio playback (though DeepSeek doesn't support TTS)
         try:
             pygame.mixer.init()
         except:
-            print("Warning: pygame mixer initialization failed. Audio playback may not work.")
+            LOGGER.warning("pygame mixer initialization failed. Audio playback may not work.")
 
     def ensure_dir_exists(self, path):
         if not os.path.exists(path):
             os.makedirs(path)
 
-    def get_cache_file_path(self, prompt, filename=None):
-        if filename is None:
-            filename = f"{abs(hash(prompt))}.json"
-    
+    def get_cache_file_path(self, prompt, filename):
+        """Return the path for a response cached under an explicit filename."""
         cache_path = os.path.join(self.cache_dir, filename)
-        print("cache_path: ", cache_path)
-        cache_dir = os.path.dirname(cache_path)
-        print("cache_dir: ", cache_dir)
-        os.makedirs(cache_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
         return cache_path
 
     def get_audio_cache_file_path(self, text, voice, model="tts-1", instructions=""):
@@ -74,18 +103,103 @@ class DeepSeekRequestJSONBase:
         cache_path = os.path.join(self.audio_cache_dir, filename)
         return cache_path
 
-    def save_to_cache(self, prompt, response, filename=None):
-        file_path = self.get_cache_file_path(prompt, filename=filename)
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump({"prompt": prompt, "response": response}, file, ensure_ascii=False, indent=4)
-
-    def load_from_cache(self, prompt, filename=None):
-        file_path = self.get_cache_file_path(prompt, filename=filename)
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as file:
-                cached_data = json.load(file)
-                return cached_data["response"]
-        return None
+    def save_to_cache(self, prompt, response, filename=None, key=None):
+        if filename is not None:
+            file_path = self.get_cache_file_path(prompt, filename=filename)
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump({"prompt": prompt, "response": response}, file, ensure_ascii=False, indent=4)
+            return
+        self.response_cache.set(key or legacy_cache_key(prompt), response, prompt=prompt)
+
+    def cache_stats(self):
+        """Hit/miss statistics of the response cache backend, and of the semantic cache when enabled."""
+        stats = self.response_cache.stats()
+        if self.semantic_cache is not None:
+            stats = {**stats, "semantic": self.semantic_cache.stats()}
+        return stats
+
+    def coalescing_stats(self):
+        """Counts of requests that were sent (leaders) or joined an identical one in flight (coalesced)."""
+        return self.flights.stats()
+
+    def stream_stats(self):
+        """Time to first token and tokens/second of recent streamed requests, per model."""
+        return self.stream_timings.snapshot()
+
+    def rate_limit_stats(self):
+        """Request/token budgets, throttled calls and time spent waiting for capacity, per model."""
+        return rate_limit_stats()
+
+    def _coalesce(self, key, request, filename=None):
+        if not self.coalesce:
+            return request()
+        return self.flights.do(self._flight_key(key, filename), request)
+
+    @staticmethod
+    def _flight_key(key, filename):
+        # cache_key leaves filename out, but each caller's request() saves to its own file,
+        # so identical calls with different filenames must not share one flight.
+        return key if filename is None else f"{key}:{filename}"
+
+    def load_from_cache(self, prompt, filename=None, key=None):
+        """
+        Look up a cached response.
+
+        ``key`` should come from ``cache_key`` over every parameter that affects the
+        output; it is looked up in ``self.response_cache``. Without a ``key`` the
+        prompt-only ``legacy_cache_key(prompt)`` is used, as in ``save_to_cache``.
+        """
+        return self._lookup_cache(prompt, filename=filename, key=key)[0]
+
+    def _lookup_cache(self, prompt, filename=None, key=None):
+        """load_from_cache, also naming the tier that held the response ("file", "memory" or "persistent")."""
+        if filename is not None:
+            file_path = self.get_cache_file_path(prompt, filename=filename)
+            if os.path.exists(file_path):
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    cached_data = json.load(file)
+                    return cached_data["response"], "file"
+            return None, None
+        return self._cache_get(key or legacy_cache_key(prompt))
+
+    def _cache_get(self, key):
+        lookup = getattr(self.response_cache, "lookup", None)
+        if lookup is not None:
+            return lookup(key)
+        cached = self.response_cache.get(key)
+        return cached, "persistent" if cached is not None else None
+
+    def _load_cached_call(self, prompt, model, operation, filename=None, key=None):
+        """load_from_cache that records a hit as a DeepSeek call answered by the cache."""
+        started = time.perf_counter()
+        cached_response, tier = self._lookup_cache(prompt, filename=filename, key=key)
+        if cached_response:
+            record_cache_hit("deepseek", model, operation, tier, started)
+        return cached_response
+
+    def _load_semantic_match(self, prompt, params, operation, filename=None):
+        """Cached response to an earlier prompt similar enough to ``prompt`` under the same model, system prompt and schema."""
+        if self.semantic_cache is None or filename is not None:
+            return None
+        started = time.perf_counter()
+        try:
+            key = self.semantic_cache.lookup(prompt, "deepseek", params)
+        except Exception as e:  # an unavailable embedder only costs the shortcut
+            LOGGER.warning("Semantic cache lookup failed: %s", e)
+            return None
+        cached_response = self.response_cache.get(key) if key is not None else None
+        if cached_response:
+            record_cache_hit("deepseek", params["model"], operation, "semantic", started)
+        return cached_response
+
+    def _remember_semantic(self, prompt, params, key, filename=None):
+        """Index ``prompt`` for _load_semantic_match; responses cached under a filename are not indexed."""
+        if self.semantic_cache is None or filename is not None:
+            return
+        try:
+            self.semantic_cache.add(prompt, "deepseek", params, key)
+        except Exception as e:
+            LOGGER.warning("Semantic cache update failed: %s", e)
 
     def load_audio_from_cache(self, audio_path):
         """Load audio file from cache if it exists"""
@@ -121,27 +235,153 @@ class DeepSeekRequestJSONBase:
             audio_path: Path to the audio file to play
         """
         try:
-            if not os.path.exists(audio_path):
-                print(f"Audio file not found: {audio_path}")
+            if not self._start_playback(audio_path):
                 return
             
-            print(f"Playing audio: {audio_path}")
-            pygame.mixer.music.load(audio_path)
-            pygame.mixer.music.play()
-            
             # Wait for playback to complete
             while pygame.mixer.music.get_busy():
                 pygame.time.wait(100)
             
         except Exception as e:
-            print(f"Error playing audio: {e}")
+            LOGGER.warning("Error playing audio: %s", e)
+
+    def _start_playback(self, audio_path):
+        if not os.path.exists(audio_path):
+            LOGGER.warning("Audio file not found: %s", audio_path)
+            return False
+        LOGGER.debug("Playing audio: %s", audio_path)
+        pygame.mixer.music.load(audio_path)
+        pygame.mixer.music.play()
+        return True
 
     def stop_audio(self):
         """Stop audio playback"""
         try:
             pygame.mixer.music.stop()
         except Exception as e:
-            print(f"Error stopping audio: {e}")
+            LOGGER.warning("Error stopping audio: %s", e)
+
+    def _prepare_json_request(self, prompt, json_schema, system_content, schema_name, model):
+        """Chat completion arguments and cache key for a JSON-output request."""
+        if model is None:
+            model = os.environ.get("DEEPSEEK_MODEL", "deepseek-chat")
+
+        # Modify system content to include JSON instruction and an example of the schema
+        enhanced_system_content = f"""{system_content}
+
+Please respond in valid JSON format. Here's an example of the expected JSON structure:
+{self._schema_example_text(json_schema)}
+
+Make sure your response is valid JSON that follows this structure."""
+
+        params = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": enhanced_system_content},
+                {"role": "user", "content": prompt}
+            ],
+            "response_format": {'type': 'json_object'},
+            "max_tokens": 4096,  # Set reasonable max_tokens to prevent truncation
+        }
+        return params, cache_key(provider="deepseek", **params)
+
+    def _prepare_simple_request(self, prompt, system_content, model):
+        """Chat completion arguments, cache key and legacy cache prompt for a text request."""
+        if model is None:
+            model = os.environ.get("DEEPSEEK_MODEL", "deepseek-chat")
+        params = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_content},
+                {"role": "user", "content": prompt}
+            ],
+        }
+        # Entries written before content-addressed keys were keyed on this string
+        legacy_prompt = f"{system_content}_{prompt}"
+        return params, cache_key(provider="deepseek", **params), legacy_prompt
+
+    def _parse_json_response(self, response, json_schema=None):
+        # Check for empty content (DeepSeek known issue)
+        message = response.choices[0].message
+        if not message.content or message.content.strip() == "":
+            raise Exception("DeepSeek returned empty content. This is a known issue with the JSON output feature.")
+        parsed = json.loads(message.content)
+        # json_object mode only guarantees JSON, not the requested shape
+        if json_schema is not None:
+            validator = compiled_schema(json_schema)
+            errors = validator.errors(parsed)
+            if errors:
+                raise JSONValidationError(f"Response does not match the JSON schema: {validator.describe(errors)}", message.content)
+        return parsed
+
+    def _parse_text_response(self, response):
+        return response.choices[0].message.content
+
+    def _report_failure(self, error):
+        if isinstance(error, json.JSONDecodeError):
+            LOGGER.warning("Failed to decode JSON response: %s. Response content: %s", error, error.doc)
+        elif isinstance(error, JSONValidationError):
+            LOGGER.warning("DeepSeek response failed schema validation: %s", error)
+        else:
+            LOGGER.warning("DeepSeek API error: %s", error, exc_info=True)
+
+    def _retry_feedback(self, error):
+        """System message asking the model to correct an invalid JSON response."""
+        content = getattr(error, "doc", None) or getattr(error, "json_string", None)
+        details = f"{error}. Response content: {content}" if content else f"{error}"
+        if isinstance(error, JSONValidationError):
+            return {"role": "system", "content": f"Previous response was valid JSON but did not follow the expected structure: {details}. Please provide a JSON response that fixes these problems and follows the example structure exactly."}
+        return {"role": "system", "content": f"Previous response had JSON parsing error: {details}. Please provide a valid JSON response that strictly follows the JSON format."}
+
+    def _complete(self, params):
+        """Create a chat completion once the (deepseek, model) rate limiter has capacity for it."""
+        limiter = limiter_for("deepseek", params["model"])
+        estimated = estimate_tokens(params)
+        limiter.acquire(estimated)
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(**params)
+        except RateLimitError as e:
+            limiter.record_rate_limited(e.response.headers)
+            raise
+        limiter.observe_headers(raw.headers)
+        response = raw.parse()
+        limiter.settle(estimated, response.usage.total_tokens if response.usage else None)
+        return response
+
+    def _open_stream(self, params):
+        """Open a chat completion stream under the (deepseek, model) rate limiter, settled by its usage chunk."""
+        limiter = limiter_for("deepseek", params["model"])
+        estimated = estimate_tokens(params)
+        limiter.acquire(estimated)
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(**self._stream_params(params))
+        except RateLimitError as e:
+            limiter.record_rate_limited(e.response.headers)
+            raise
+        limiter.observe_headers(raw.headers)
+        return limiter.settle_stream(raw.parse(), estimated)
+
+    def _request_with_retries(self, params, parse, description):
+        attempt = 0
+        feedback_sent = False
+        with record_call("deepseek", params["model"], "chat") as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                try:
+                    LOGGER.debug("Querying DeepSeek with %s (attempt %d)", description, attempt)
+                    response = self._complete(params)
+                    # Tokens of responses that fail parsing or validation are billed too
+                    call.add_usage(response.usage)
+                    return parse(response)
+                except Exception as e:
+                    self._report_failure(e)
+                    delay = self.retry_policy.backoff(e, attempt)
+                    # Only invalid output is worth explaining to the model, and only once
+                    if self.retry_policy.wants_feedback(e) and not feedback_sent:
+                        params["messages"].append(self._retry_feedback(e))
+                        feedback_sent = True
+                time.sleep(delay)
 
     def send_request_with_json_schema(self, prompt, json_schema, system_content="You are an AI.", filename=None, schema_name="response", model=None):
         """
@@ -158,81 +398,23 @@ class DeepSeekRequestJSONBase:
         Returns:
             Parsed JSON response
         """
-        retries = 0
-        if model is None:
-            model = os.environ.get("DEEPSEEK_MODEL", "deepseek-chat")
-
-        # Convert JSON schema to example format for DeepSeek
-        schema_example = self._schema_to_example(json_schema)
-        
-        # Modify system content to include JSON instruction and example
-        enhanced_system_content = f"""{system_content}
-
-Please respond in valid JSON format. Here's an example of the expected JSON structure:
-{json.dumps(schema_example, indent=2)}
-
-Make sure your response is valid JSON that follows this structure."""
-
-        messages = [
-            {"role": "system", "content": enhanced_system_content},
-            {"role": "user", "content": prompt}
-        ]
-
-        print("self.use_cache: ", self.use_cache)
+        params, key = self._prepare_json_request(prompt, json_schema, system_content, schema_name, model)
 
         if self.use_cache:
-            cached_response = self.load_from_cache(prompt, filename=filename)
+            cached_response = self._load_cached_call(prompt, params["model"], "chat", filename=filename, key=key)
+            cached_response = cached_response or self._load_semantic_match(prompt, params, "chat", filename=filename)
             if cached_response:
-                print("DeepSeek cache found. ")
+                LOGGER.debug("DeepSeek cache found")
                 return cached_response
 
-        while retries < self.max_retries:
-            try:
-                print(f"Querying DeepSeek with JSON output (attempt {retries + 1})...")
-                
-                # Use DeepSeek's JSON output format
-                response = self.client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    response_format={'type': 'json_object'},
-                    max_tokens=4096  # Set reasonable max_tokens to prevent truncation
-                )
-
-                # Check for empty content (DeepSeek known issue)
-                message = response.choices[0].message
-                if not message.content or message.content.strip() == "":
-                    raise Exception("DeepSeek returned empty content. This is a known issue with the JSON output feature.")
+        def request():
+            parsed_response = self._request_with_retries(params, lambda response: self._parse_json_response(response, json_schema), "JSON output")
+            if self.use_cache:
+                self.save_to_cache(prompt, parsed_response, filename=filename, key=key)
+                self._remember_semantic(prompt, params, key, filename=filename)
+            return parsed_response
 
-                # Parse the JSON response
-                parsed_response = json.loads(message.content)
-                
-                # Save to cache
-                if self.use_cache:
-                    self.save_to_cache(prompt, parsed_response, filename=filename)
-                
-                return parsed_response
-
-            except json.JSONDecodeError as e:
-                error_msg = f"Failed to decode JSON response: {e}. Response content: {message.content if 'message' in locals() else 'No content'}"
-                print(error_msg)
-                traceback.print_exc()
-                retries += 1
-                
-                if retries < self.max_retries:
-                    messages.append({"role": "system", "content": f"Previous response had JSON parsing error: {error_msg}. Please provide a valid JSON response that strictly follows the JSON format."})
-                
-            except Exception as e:
-                error_msg = f"DeepSeek API error: {e}"
-                print(error_msg)
-                traceback.print_exc()
-                retries += 1
-                
-                if retries < self.max_retries:
-                    # Add specific guidance for DeepSeek's common issues
-                    retry_message = f"Previous request failed: {error_msg}. Please ensure your response is valid JSON format. Do not include any text outside the JSON structure."
-                    messages.append({"role": "system", "content": retry_message})
-
-        raise Exception("Maximum retries reached without success.")
+        return self._coalesce(key, request, filename=filename)
 
     def send_simple_request(self, prompt, system_content="You are a helpful AI assistant.", model=None):
         """
@@ -246,52 +428,94 @@ Make sure your response is valid JSON that follows this structure."""
         Returns:
             Text response from the AI
         """
-        if model is None:
-            model = os.environ.get("DEEPSEEK_MODEL", "deepseek-chat")
-        
-        # Use prompt as cache key for simple requests
-        cache_key = f"{system_content}_{prompt}"
-        
+        params, key, legacy_prompt = self._prepare_simple_request(prompt, system_content, model)
+
         if self.use_cache:
-            cached_response = self.load_from_cache(cache_key)
+            cached_response = self._load_cached_call(legacy_prompt, params["model"], "chat", key=key)
+            cached_response = cached_response or self._load_semantic_match(prompt, params, "chat")
             if cached_response:
-                print("DeepSeek simple request cache found.")
+                LOGGER.debug("DeepSeek simple request cache found")
                 return cached_response
 
-        retries = 0
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": prompt}
-        ]
+        def request():
+            response_text = self._request_with_retries(params, self._parse_text_response, "simple request")
+            if self.use_cache:
+                self.save_to_cache(legacy_prompt, response_text, key=key)
+                self._remember_semantic(prompt, params, key)
+            return response_text
 
-        while retries < self.max_retries:
-            try:
-                print(f"Querying DeepSeek with simple request (attempt {retries + 1})...")
-                
-                response = self.client.chat.completions.create(
-                    model=model,
-                    messages=messages
-                )
+        return self._coalesce(key, request)
 
-                message = response.choices[0].message
-                response_text = message.content
-                
-                # Save to cache
-                if self.use_cache:
-                    self.save_to_cache(cache_key, response_text)
-                
-                return response_text
+    def _stream_params(self, params):
+        return {**params, "stream": True, "stream_options": {"include_usage": True}}
 
-            except Exception as e:
-                error_msg = f"DeepSeek API error: {e}"
-                print(error_msg)
-                traceback.print_exc()
-                retries += 1
-                
-                if retries < self.max_retries:
-                    messages.append({"role": "system", "content": f"Previous request failed: {error_msg}. Please try again."})
+    def _stream_delta(self, chunk):
+        """Text delta and completion-token count (only sent on the final chunk) of a streamed chunk."""
+        tokens = chunk.usage.completion_tokens if getattr(chunk, "usage", None) else None
+        if not chunk.choices:
+            return None, tokens
+        return chunk.choices[0].delta.content, tokens
+
+    def _finish_stream(self, params, key, legacy_prompt, timer, parts, tokens):
+        timer.finish()
+        self.stream_timings.record("deepseek", params["model"], timer, tokens or len(parts))
+        if self.use_cache and parts:
+            self.save_to_cache(legacy_prompt, "".join(parts), key=key)
 
-        raise Exception("Maximum retries reached without success.")
+    def stream_simple_request(self, prompt, system_content="You are a helpful AI assistant.", model=None):
+        """
+        Stream a simple text request to DeepSeek, yielding text deltas as they arrive.
+
+        A cached response is yielded as a single delta. Failed attempts are retried only until the
+        first delta has been yielded; after that errors propagate to the caller. The assembled text
+        is cached once the stream completes, and time to first token and tokens/second are recorded
+        per model (see ``stream_stats``).
+        """
+        params, key, legacy_prompt = self._prepare_simple_request(prompt, system_content, model)
+
+        if self.use_cache:
+            cached_response = self._load_cached_call(legacy_prompt, params["model"], "stream", key=key)
+            if cached_response:
+                LOGGER.debug("DeepSeek simple request cache found")
+                yield cached_response
+                return
+
+        attempt = 0
+        with record_call("deepseek", params["model"], "stream") as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                timer, parts, tokens = StreamTimer(), [], None
+                try:
+                    LOGGER.debug("Streaming DeepSeek simple request (attempt %d)", attempt)
+                    for chunk in self._open_stream(params):
+                        call.add_usage(getattr(chunk, "usage", None))
+                        text, usage_tokens = self._stream_delta(chunk)
+                        tokens = usage_tokens or tokens
+                        if text:
+                            timer.mark_token()
+                            parts.append(text)
+                            yield text
+                    break
+                except Exception as e:
+                    if parts:
+                        raise
+                    self._report_failure(e)
+                    delay = self.retry_policy.backoff(e, attempt)
+                time.sleep(delay)
+
+        self._finish_stream(params, key, legacy_prompt, timer, parts, tokens)
+
+    def send_many(self, requests, concurrency=DEFAULT_CONCURRENCY, batch_api=False, poll_interval=30, timeout=None):
+        """
+        Run many send_request_with_json_schema calls and return one BulkResult per request, in input order.
+
+        Items are served from the cache when possible, and a failed item carries its exception in
+        ``error`` without affecting the others. DeepSeek has no Batch API, so ``batch_api`` is not supported.
+        """
+        if batch_api:
+            raise NotImplementedError("DeepSeek API does not offer a batch endpoint. Use OpenAI API for batch jobs.")
+        return run_many(self.send_request_with_json_schema, requests, concurrency)
 
     def send_request_with_retry(self, prompt, system_content="You are an AI.", sample_json=None, filename=None):
         """
@@ -315,6 +539,7 @@ Make sure your response is valid JSON that follows this structure."""
             filename=filename
         )
 
+    @memoized_conversion
     def _convert_sample_to_schema(self, sample_json):
         """
         Convert a sample JSON object to a JSON schema.
@@ -324,12 +549,12 @@ Make sure your response is valid JSON that follows this structure."""
         def get_type_schema(value):
             if isinstance(value, str):
                 return {"type": "string"}
+            elif isinstance(value, bool):  # bool is an int subclass, so test it first
+                return {"type": "boolean"}
             elif isinstance(value, int):
                 return {"type": "integer"}
             elif isinstance(value, float):
                 return {"type": "number"}
-            elif isinstance(value, bool):
-                return {"type": "boolean"}
             elif isinstance(value, list):
                 if len(value) > 0:
                     return {
@@ -358,6 +583,12 @@ Make sure your response is valid JSON that follows this structure."""
 
         return get_type_schema(sample_json)
 
+    @memoized_conversion
+    def _schema_example_text(self, json_schema):
+        """The example for json_schema as indented JSON, as quoted in the system prompt."""
+        return json.dumps(self._schema_to_example(json_schema), indent=2)
+
+    @memoized_conversion
     def _schema_to_example(self, json_schema):
         """
         Convert a JSON schema to an example JSON object for DeepSeek.
@@ -409,3 +640,176 @@ Make sure your response is valid JSON that follows this structure."""
             return response
         except json.JSONDecodeError:
             raise JSONParsingError("Failed to parse JSON response", response, response)
+
+
+class AsyncDeepSeekRequestJSONBase(DeepSeekRequestJSONBase):
+    """
+    asyncio counterpart of DeepSeekRequestJSONBase, built on AsyncOpenAI.
+
+    Request building, response parsing, retry feedback, the response cache and request coalescing are
+    inherited from the sync client; only network calls and audio playback are awaited.
+    """
+
+    _client_class = AsyncOpenAI
+
+    async def _coalesce(self, key, request, filename=None):
+        if not self.coalesce:
+            return await request()
+        return await self.flights.do_async(self._flight_key(key, filename), request)
+
+    async def _complete(self, params):
+        limiter = limiter_for("deepseek", params["model"])
+        estimated = estimate_tokens(params)
+        await limiter.acquire_async(estimated)
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(**params)
+        except RateLimitError as e:
+            limiter.record_rate_limited(e.response.headers)
+            raise
+        limiter.observe_headers(raw.headers)
+        response = raw.parse()
+        limiter.settle(estimated, response.usage.total_tokens if response.usage else None)
+        return response
+
+    async def _open_stream(self, params):
+        limiter = limiter_for("deepseek", params["model"])
+        estimated = estimate_tokens(params)
+        await limiter.acquire_async(estimated)
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(**self._stream_params(params))
+        except RateLimitError as e:
+            limiter.record_rate_limited(e.response.headers)
+            raise
+        limiter.observe_headers(raw.headers)
+        return limiter.settle_stream_async(raw.parse(), estimated)
+
+    async def _request_with_retries(self, params, parse, description):
+        attempt = 0
+        feedback_sent = False
+        with record_call("deepseek", params["model"], "chat") as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                try:
+                    LOGGER.debug("Querying DeepSeek with %s (attempt %d)", description, attempt)
+                    response = await self._complete(params)
+                    # Tokens of responses that fail parsing or validation are billed too
+                    call.add_usage(response.usage)
+                    return parse(response)
+                except Exception as e:
+                    self._report_failure(e)
+                    delay = self.retry_policy.backoff(e, attempt)
+                    # Only invalid output is worth explaining to the model, and only once
+                    if self.retry_policy.wants_feedback(e) and not feedback_sent:
+                        params["messages"].append(self._retry_feedback(e))
+                        feedback_sent = True
+                await asyncio.sleep(delay)
+
+    async def send_request_with_json_schema(self, prompt, json_schema, system_content="You are an AI.", filename=None, schema_name="response", model=None):
+        """Async version of DeepSeekRequestJSONBase.send_request_with_json_schema."""
+        params, key = self._prepare_json_request(prompt, json_schema, system_content, schema_name, model)
+
+        if self.use_cache:
+            cached_response = self._load_cached_call(prompt, params["model"], "chat", filename=filename, key=key)
+            if not cached_response and self.semantic_cache is not None:
+                cached_response = await asyncio.get_running_loop().run_in_executor(
+                    None, self._load_semantic_match, prompt, params, "chat", filename
+                )
+            if cached_response:
+                LOGGER.debug("DeepSeek cache found")
+                return cached_response
+
+        async def request():
+            parsed_response = await self._request_with_retries(params, lambda response: self._parse_json_response(response, json_schema), "JSON output")
+            if self.use_cache:
+                self.save_to_cache(prompt, parsed_response, filename=filename, key=key)
+                if self.semantic_cache is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, self._remember_semantic, prompt, params, key, filename
+                    )
+            return parsed_response
+
+        return await self._coalesce(key, request, filename=filename)
+
+    async def send_simple_request(self, prompt, system_content="You are a helpful AI assistant.", model=None):
+        """Async version of DeepSeekRequestJSONBase.send_simple_request."""
+        params, key, legacy_prompt = self._prepare_simple_request(prompt, system_content, model)
+
+        if self.use_cache:
+            cached_response = self._load_cached_call(legacy_prompt, params["model"], "chat", key=key)
+            if not cached_response and self.semantic_cache is not None:
+                cached_response = await asyncio.get_running_loop().run_in_executor(
+                    None, self._load_semantic_match, prompt, params, "chat"
+                )
+            if cached_response:
+                LOGGER.debug("DeepSeek simple request cache found")
+                return cached_response
+
+        async def request():
+            response_text = await self._request_with_retries(params, self._parse_text_response, "simple request")
+            if self.use_cache:
+                self.save_to_cache(legacy_prompt, response_text, key=key)
+                if self.semantic_cache is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, self._remember_semantic, prompt, params, key)
+            return response_text
+
+        return await self._coalesce(key, request)
+
+    async def stream_simple_request(self, prompt, system_content="You are a helpful AI assistant.", model=None):
+        """Async-iterator version of DeepSeekRequestJSONBase.stream_simple_request."""
+        params, key, legacy_prompt = self._prepare_simple_request(prompt, system_content, model)
+
+        if self.use_cache:
+            cached_response = self._load_cached_call(legacy_prompt, params["model"], "stream", key=key)
+            if cached_response:
+                LOGGER.debug("DeepSeek simple request cache found")
+                yield cached_response
+                return
+
+        attempt = 0
+        with record_call("deepseek", params["model"], "stream") as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                timer, parts, tokens = StreamTimer(), [], None
+                try:
+                    LOGGER.debug("Streaming DeepSeek simple request (attempt %d)", attempt)
+                    async for chunk in await self._open_stream(params):
+                        call.add_usage(getattr(chunk, "usage", None))
+                        text, usage_tokens = self._stream_delta(chunk)
+                        tokens = usage_tokens or tokens
+                        if text:
+                            timer.mark_token()
+                            parts.append(text)
+                            yield text
+                    break
+                except Exception as e:
+                    if parts:
+                        raise
+                    self._report_failure(e)
+                    delay = self.retry_policy.backoff(e, attempt)
+                await asyncio.sleep(delay)
+
+        self._finish_stream(params, key, legacy_prompt, timer, parts, tokens)
+
+    async def send_many(self, requests, concurrency=DEFAULT_CONCURRENCY, batch_api=False, poll_interval=30, timeout=None):
+        """Async version of DeepSeekRequestJSONBase.send_many."""
+        if batch_api:
+            raise NotImplementedError("DeepSeek API does not offer a batch endpoint. Use OpenAI API for batch jobs.")
+        return await run_many_async(self.send_request_with_json_schema, requests, concurrency)
+
+    async def text_to_speech(self, text, voice="coral", model="tts-1", instructions="", response_format="mp3", play_audio=True):
+        return super().text_to_speech(text, voice, model, instructions, response_format, play_audio)
+
+    async def text_to_speech_stream(self, text, voice="coral", model="tts-1", instructions="", response_format="mp3", play_audio=True):
+        return super().text_to_speech_stream(text, voice, model, instructions, response_format, play_audio)
+
+    async def play_audio(self, audio_path):
+        """Play an audio file, yielding to the event loop while it plays."""
+        try:
+            if not self._start_playback(audio_path):
+                return
+            while pygame.mixer.music.get_busy():
+                await asyncio.sleep(0.1)
+        except Exception as e:
+            LOGGER.warning("Error playing audio: %s", e)
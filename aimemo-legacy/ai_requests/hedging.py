@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Bookkeeping for hedged requests raced across providers."""
+
+from __future__ import annotations
+
+import statistics
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Hedge delay while the primary has too few recent samples for a meaningful p90.
+DEFAULT_HEDGE_DELAY = 1.5
+# Floor for the p90-derived delay, so a run of unusually quick answers does not make every call a hedge.
+MIN_HEDGE_DELAY = 0.25
+HEDGE_DELAY_MIN_SAMPLES = 20
+
+
+class HedgeStats:
+    """How often requests were hedged, how often the hedge won and what it saved.
+
+    The saving is only known when the losing primary's completion is
+    observed: sync clients run on threads that cannot be interrupted, so
+    their losers finish in the background and are timed; cancelled async
+    losers count towards wins but not towards the gain.
+    """
+
+    def __init__(self, max_samples: int = 500) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._gains: Deque[float] = deque(maxlen=max_samples)
+
+    def record_call(self, hedged: bool, hedge_won: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.hedged += int(hedged)
+            self.hedge_wins += int(hedge_won)
+
+    def record_gain(self, seconds: float) -> None:
+        """Time by which the hedge beat the primary it replaced."""
+        with self._lock:
+            self._gains.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            gains = list(self._gains)
+            gain_p50: Optional[float] = statistics.median(gains) if gains else None
+            return {
+                'calls': self.calls,
+                'hedged': self.hedged,
+                'hedge_rate': round(self.hedged / self.calls, 3) if self.calls else 0.0,
+                'hedge_wins': self.hedge_wins,
+                'win_rate': round(self.hedge_wins / self.hedged, 3) if self.hedged else 0.0,
+                'gain_samples': len(gains),
+                'latency_gain_ms_p50': round(gain_p50 * 1000, 1) if gain_p50 is not None else None,
+                'latency_gain_ms_total': round(sum(gains) * 1000, 1),
+            }
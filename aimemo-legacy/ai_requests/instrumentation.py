@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Usage, latency and cost instrumentation for LLM and TTS calls.
+
+Clients wrap each logical call, meaning all attempts of one request, in
+``record_call`` and report cache hits with ``record_cache_hit``. Each
+produces one ``CallEvent`` that is handed to every registered hook. The
+shared ``MetricsAggregator`` is always registered. It keeps lifetime
+totals and a rolling window per provider and model, which
+``SharedModelManager.get_status()`` and ``render_prometheus`` read.
+``observe_calls`` also collects the events of one thread or task, so a
+caller can tell whether an answer came from the cache.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# USD per million input/output tokens, or per million characters for TTS. List prices at the time of
+# writing; AI_MODEL_PRICES='{"model": [input, output]}' overrides or extends them.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "deepseek-chat": (0.27, 1.10),
+    "deepseek-reasoner": (0.55, 2.19),
+    "tts-1": (15.00, 0.0),
+    "tts-1-hd": (30.00, 0.0),
+}
+MODEL_PRICES.update(
+    {model: tuple(prices) for model, prices in json.loads(os.environ.get("AI_MODEL_PRICES", "{}")).items()}
+)
+
+# Rolling window behind the rates and latency percentiles.
+METRICS_WINDOW_SECONDS = float(os.environ.get("AI_METRICS_WINDOW_SECONDS", "300"))
+METRICS_WINDOW_SAMPLES = 1000
+
+
+@dataclass
+class CallEvent:
+    """One logical LLM or TTS call, including its retries, or one cache hit."""
+
+    provider: str
+    model: str
+    operation: str  # "chat", "stream", "tts" or "tts_stream"
+    latency: float  # seconds, including retries and backoff
+    attempts: int = 0  # requests sent; 0 for a cache hit
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    characters: int = 0  # TTS input length
+    cache: Optional[str] = None  # tier that answered ("memory", "persistent", "file", "semantic"), None if sent
+    error: Optional[str] = None  # exception class of a failed call
+    cancelled: bool = False  # abandoned by the caller (closed stream, cancelled task, lost hedge)
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    @property
+    def cost_usd(self) -> Optional[float]:
+        """List-price cost of the tokens or characters billed; None for unknown models."""
+        prices = price_for(self.model)
+        if prices is None:
+            return None
+        if self.operation.startswith("tts"):
+            return self.characters * prices[0] / 1_000_000
+        return (self.prompt_tokens * prices[0] + self.completion_tokens * prices[1]) / 1_000_000
+
+
+Hook = Callable[[CallEvent], None]
+
+
+def price_for(model: str) -> Optional[Tuple[float, float]]:
+    """Prices of ``model`` or of the longest known prefix of it (dated snapshots)."""
+    if model in MODEL_PRICES:
+        return MODEL_PRICES[model]
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+class CallRecorder:
+    """Collects attempts and token usage of one call; emits its event when the call ends.
+
+    Used as a context manager: leaving the block normally records a success,
+    an exception records a failure of that class, and GeneratorExit or
+    CancelledError a cancellation, which is not the provider's fault.
+    ``finish`` records early, e.g. before audio playback that should not
+    count as latency.
+    """
+
+    def __init__(self, provider: str, model: str, operation: str, characters: int = 0) -> None:
+        self.event = CallEvent(provider, model, operation, 0.0, characters=characters)
+        self._started = time.perf_counter()
+        self._emitted = False
+
+    def attempt(self) -> None:
+        self.event.attempts += 1
+
+    def add_usage(self, usage: Any) -> None:
+        """Add a response's ``usage`` (prompt/completion tokens); missing usage is ignored."""
+        if usage is None:
+            return
+        self.event.prompt_tokens += getattr(usage, "prompt_tokens", None) or 0
+        self.event.completion_tokens += getattr(usage, "completion_tokens", None) or 0
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self._emitted:
+            return
+        self._emitted = True
+        self.event.latency = time.perf_counter() - self._started
+        if isinstance(error, Exception):
+            self.event.error = type(error).__name__
+        elif error is not None:
+            self.event.cancelled = True
+        emit(self.event)
+
+    def __enter__(self) -> "CallRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.finish(exc)
+
+
+def record_call(provider: str, model: str, operation: str, characters: int = 0) -> CallRecorder:
+    """Context manager that records one call; see ``CallRecorder``."""
+    return CallRecorder(provider, model, operation, characters=characters)
+
+
+def record_cache_hit(provider: str, model: str, operation: str, tier: Optional[str], started: float) -> None:
+    """Record a call answered from the response cache; ``started`` is a ``time.perf_counter()`` value."""
+    emit(CallEvent(provider, model, operation, time.perf_counter() - started, cache=tier or "persistent"))
+
+
+class _ModelMetrics:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors: Dict[str, int] = {}
+        self.cancelled = 0
+        self.cache_hits: Dict[str, int] = {}
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.characters = 0
+        self.cost_usd = 0.0
+        self.window: Deque[CallEvent] = deque(maxlen=METRICS_WINDOW_SAMPLES)
+
+    def add(self, event: CallEvent) -> None:
+        self.requests += 1
+        if event.error:
+            self.errors[event.error] = self.errors.get(event.error, 0) + 1
+        self.cancelled += event.cancelled
+        if event.cache:
+            self.cache_hits[event.cache] = self.cache_hits.get(event.cache, 0) + 1
+        self.retries += event.retries
+        self.prompt_tokens += event.prompt_tokens
+        self.completion_tokens += event.completion_tokens
+        self.characters += event.characters
+        self.cost_usd += event.cost_usd or 0.0
+        self.window.append(event)
+
+    def snapshot(self, now: float, window_seconds: float) -> Dict[str, Any]:
+        recent = [event for event in self.window if now - event.timestamp <= window_seconds]
+        sent = sorted(
+            event.latency for event in recent if not (event.cache or event.error or event.cancelled)
+        )
+        span = min(window_seconds, now - recent[0].timestamp) if recent else 0.0
+
+        def quantile(q: float) -> Optional[float]:
+            return round(sent[min(len(sent) - 1, int(len(sent) * q))] * 1000, 1) if sent else None
+
+        return {
+            "totals": {
+                "requests": self.requests,
+                "errors": dict(self.errors),
+                "cancelled": self.cancelled,
+                "cache_hits": dict(self.cache_hits),
+                "retries": self.retries,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "characters": self.characters,
+                "cost_usd": round(self.cost_usd, 6),
+            },
+            "window": {
+                "seconds": window_seconds,
+                "requests": len(recent),
+                "requests_per_minute": round(len(recent) * 60 / span, 2) if span > 0 else None,
+                "error_rate": round(sum(1 for event in recent if event.error) / len(recent), 3) if recent else 0.0,
+                "cache_hit_ratio": round(sum(1 for event in recent if event.cache) / len(recent), 3) if recent else 0.0,
+                "latency_ms_p50": round(statistics.median(sent) * 1000, 1) if sent else None,
+                "latency_ms_p90": quantile(0.9),
+                "latency_ms_p99": quantile(0.99),
+                "tokens": sum(event.prompt_tokens + event.completion_tokens for event in recent),
+                "cost_usd": round(sum(event.cost_usd or 0.0 for event in recent), 6),
+            },
+        }
+
+
+class MetricsAggregator:
+    """In-memory totals and rolling-window statistics per provider and model."""
+
+    def __init__(self, window_seconds: float = METRICS_WINDOW_SECONDS) -> None:
+        self.window_seconds = window_seconds
+        self._models: Dict[Tuple[str, str], _ModelMetrics] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: CallEvent) -> None:
+        with self._lock:
+            metrics = self._models.get((event.provider, event.model))
+            if metrics is None:
+                metrics = self._models[(event.provider, event.model)] = _ModelMetrics()
+            metrics.add(event)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """``{"provider/model": {"totals": ..., "window": ...}}``."""
+        now = time.time()
+        with self._lock:
+            return {
+                f"{provider}/{model}": metrics.snapshot(now, self.window_seconds)
+                for (provider, model), metrics in self._models.items()
+            }
+
+
+_hooks: List[Hook] = []
+_hooks_lock = threading.Lock()
+_shared_metrics = MetricsAggregator()
+_hooks.append(_shared_metrics)
+_observed: ContextVar[Optional[List[CallEvent]]] = ContextVar("observed_calls", default=None)
+
+
+def add_hook(hook: Hook) -> None:
+    """Call ``hook(event)`` for every recorded call; hooks must be fast and must not block."""
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+@contextmanager
+def observe_calls(events: Optional[List[CallEvent]] = None) -> Iterator[List[CallEvent]]:
+    """Collect the events emitted by this thread or task inside the block into ``events``."""
+    events = [] if events is None else events
+    token = _observed.set(events)
+    try:
+        yield events
+    finally:
+        _observed.reset(token)
+
+
+def served_from_cache(events: List[CallEvent]) -> bool:
+    """True when every call in ``events`` was answered by the response cache without a request."""
+    return bool(events) and all(event.cache is not None for event in events)
+
+
+def emit(event: CallEvent) -> None:
+    observed = _observed.get()
+    if observed is not None:
+        observed.append(event)
+    with _hooks_lock:
+        hooks = list(_hooks)
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:  # a broken exporter must not fail the request
+            LOGGER.exception("Instrumentation hook %r failed", hook)
+
+
+def shared_metrics() -> MetricsAggregator:
+    """The process-wide aggregator fed by every client."""
+    return _shared_metrics
+
+
+def metrics_snapshot() -> Dict[str, Dict[str, Any]]:
+    return _shared_metrics.snapshot()
+
+
+def _labels(key: str, **extra: str) -> str:
+    provider, _, model = key.partition("/")
+    pairs = {"provider": provider, "model": model, **extra}
+    return ",".join(f'{name}="{value}"' for name, value in pairs.items())
+
+
+def render_prometheus(snapshot: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """Prometheus text exposition of ``snapshot`` (default: the shared aggregator) for a metrics endpoint."""
+    snapshot = metrics_snapshot() if snapshot is None else snapshot
+    lines = [
+        "# TYPE ai_requests_total counter",
+        "# TYPE ai_request_errors_total counter",
+        "# TYPE ai_cache_hits_total counter",
+        "# TYPE ai_retries_total counter",
+        "# TYPE ai_tokens_total counter",
+        "# TYPE ai_cost_usd_total counter",
+        "# TYPE ai_request_latency_seconds gauge",
+    ]
+    for key, metrics in sorted(snapshot.items()):
+        totals, window = metrics["totals"], metrics["window"]
+        lines.append(f"ai_requests_total{{{_labels(key)}}} {totals['requests']}")
+        for error, count in totals["errors"].items():
+            lines.append(f"ai_request_errors_total{{{_labels(key, error=error)}}} {count}")
+        for tier, count in totals["cache_hits"].items():
+            lines.append(f"ai_cache_hits_total{{{_labels(key, tier=tier)}}} {count}")
+        lines.append(f"ai_retries_total{{{_labels(key)}}} {totals['retries']}")
+        lines.append(f"ai_tokens_total{{{_labels(key, kind='prompt')}}} {totals['prompt_tokens']}")
+        lines.append(f"ai_tokens_total{{{_labels(key, kind='completion')}}} {totals['completion_tokens']}")
+        lines.append(f"ai_cost_usd_total{{{_labels(key)}}} {totals['cost_usd']}")
+        for quantile in ("50", "90", "99"):
+            value = window[f"latency_ms_p{quantile}"]
+            if value is not None:
+                lines.append(f"ai_request_latency_seconds{{{_labels(key, quantile=f'0.{quantile}')}}} {value / 1000}")
+    return "\n".join(lines) + "\n"
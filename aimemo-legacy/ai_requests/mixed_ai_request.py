@@ -3,28 +3,83 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
 
-from echomind.openai_request import OpenAIRequestJSONBase
+from echomind.bulk import DEFAULT_CONCURRENCY, run_many, run_many_async
+from echomind.hedging import (
+    DEFAULT_HEDGE_DELAY,
+    HEDGE_DELAY_MIN_SAMPLES,
+    MIN_HEDGE_DELAY,
+    HedgeStats,
+)
+from echomind.instrumentation import CallEvent, observe_calls, served_from_cache
+from echomind.provider_health import ProviderHealth
+from echomind.openai_request import AsyncOpenAIRequestJSONBase, OpenAIRequestJSONBase
 
 try:
-    from echomind.deepseek_requests import DeepSeekRequestJSONBase  # type: ignore
+    from echomind.deepseek_requests import (  # type: ignore
+        AsyncDeepSeekRequestJSONBase,
+        DeepSeekRequestJSONBase,
+    )
 except Exception:  # pragma: no cover - DeepSeek optional
     DeepSeekRequestJSONBase = None  # type: ignore
+    AsyncDeepSeekRequestJSONBase = None  # type: ignore
 
 LOGGER = logging.getLogger(__name__)
 
+# Threads for hedged sync calls: the primary and the hedge of up to DEFAULT_CONCURRENCY callers.
+HEDGE_WORKERS = 2 * DEFAULT_CONCURRENCY
+
+
+def _run_observed(events: List[CallEvent], method, args, kwargs):
+    """``method(*args, **kwargs)`` with the calls it records collected into ``events``."""
+    with observe_calls(events):
+        return method(*args, **kwargs)
+
+
+async def _run_observed_async(events: List[CallEvent], method, args, kwargs):
+    with observe_calls(events):
+        return await method(*args, **kwargs)
+
 
 class MixedAIRequestJSONBase:
-    """Proxy client that tries providers in order with graceful fallback."""
+    """Proxy client that tries providers in order with graceful fallback.
+
+    Each provider has a circuit breaker fed by a rolling window of call
+    outcomes. Providers whose circuit is open are skipped, so a degraded
+    provider stops costing every request a slow failure; half-open circuits
+    get one probe call. Every failure counts against a provider except a
+    rejection of the request itself (400, 404, 422); auth and quota errors do
+    count. With ``prefer_fastest`` healthy providers are tried by recent
+    median latency instead of configured priority. Answers from a provider's
+    response cache count as successes but not towards its latency.
+
+    With ``hedge`` set, a request the primary has not answered within
+    ``hedge_delay`` seconds (default: the primary's rolling p90 latency) is
+    also sent to the next provider; the first success is returned and the
+    other call is cancelled. This trades extra spend for tail latency and is
+    meant for interactive turns.
+    """
+
+    _openai_class = OpenAIRequestJSONBase
+    _deepseek_class = DeepSeekRequestJSONBase
 
     def __init__(
         self,
         providers: Optional[List[str]] = None,
         use_cache: bool = True,
         max_retries: int = 3,
-        cache_dir: str = 'cache'
+        cache_dir: str = 'cache',
+        cache_backend: Optional[str] = None,
+        prefer_fastest: bool = False,
+        hedge: bool = False,
+        hedge_delay: Optional[float] = None,
+        semantic_cache: Any = None,
     ) -> None:
         order = providers or ['openai', 'deepseek']
         self._clients: Dict[str, object] = {}
@@ -32,22 +87,36 @@ class MixedAIRequestJSONBase:
         self.use_cache = use_cache
         self.max_retries = max_retries
         self.cache_dir = cache_dir
+        self.cache_backend = cache_backend
+        self.semantic_cache = semantic_cache
+        self.prefer_fastest = prefer_fastest
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self._hedge_stats = HedgeStats()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
 
         for name in order:
             key = (name or '').strip().lower()
             if key == 'openai':
                 try:
-                    client = OpenAIRequestJSONBase(use_cache=use_cache, max_retries=max_retries, cache_dir=cache_dir)
+                    client = self._openai_class(
+                        use_cache=use_cache, max_retries=max_retries, cache_dir=cache_dir,
+                        cache_backend=cache_backend, semantic_cache=semantic_cache,
+                    )
                     self._clients['openai'] = client
                     self._order.append('openai')
                 except Exception as exc:  # pragma: no cover - initialization failure
                     LOGGER.warning("MixedAI: failed to initialise OpenAI client: %s", exc)
             elif key == 'deepseek':
-                if DeepSeekRequestJSONBase is None:
+                if self._deepseek_class is None:
                     LOGGER.warning("MixedAI: DeepSeek client not available (module import failed)")
                     continue
                 try:
-                    client = DeepSeekRequestJSONBase(use_cache=use_cache, max_retries=max_retries, cache_dir=cache_dir)
+                    client = self._deepseek_class(
+                        use_cache=use_cache, max_retries=max_retries, cache_dir=cache_dir,
+                        cache_backend=cache_backend, semantic_cache=semantic_cache,
+                    )
                     self._clients['deepseek'] = client
                     self._order.append('deepseek')
                 except Exception as exc:  # pragma: no cover - initialization failure
@@ -55,36 +124,227 @@ class MixedAIRequestJSONBase:
 
         if not self._order:
             raise RuntimeError('MixedAIRequestJSONBase: no providers available')
+        self._health: Dict[str, ProviderHealth] = {name: ProviderHealth() for name in self._order}
 
     @property
     def providers(self) -> List[str]:
         return self._order.copy()
 
+    def provider_health(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit state, error rate and latency percentiles per provider."""
+        return {name: self._health[name].snapshot() for name in self._order}
+
+    def hedging_stats(self) -> Dict[str, Any]:
+        """Hedge rate, hedge win rate and measured latency gain."""
+        return self._hedge_stats.stats()
+
+    def _hedge_after(self, provider: str) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        p90 = self._health[provider].latency_p90(min_samples=HEDGE_DELAY_MIN_SAMPLES)
+        return DEFAULT_HEDGE_DELAY if p90 is None else max(MIN_HEDGE_DELAY, p90)
+
+    def _routing_order(self) -> List[str]:
+        if not self.prefer_fastest:
+            return self._order
+        latency = {name: self._health[name].latency_p50() for name in self._order}
+        # Providers without recent successes keep their priority, after the measured ones.
+        return sorted(
+            self._order,
+            key=lambda name: (latency[name] is None, latency[name] or 0.0, self._order.index(name)),
+        )
+
+    def _attempts(self, method_name: str, kwargs: Dict[str, object]):
+        """Yield (provider, bound method, kwargs) for each provider whose circuit admits a call."""
+        admitted = False
+        for provider in self._routing_order():
+            if not self._health[provider].allow():
+                LOGGER.debug("MixedAI: skipping %s, circuit open", provider)
+                continue
+            admitted = True
+            yield self._attempt(provider, method_name, kwargs)
+        if not admitted:
+            # Every circuit is open; trying beats failing without sending anything.
+            LOGGER.warning("MixedAI: all provider circuits open, trying %s anyway", self._order)
+            for provider in self._order:
+                yield self._attempt(provider, method_name, kwargs)
+
+    def _attempt(self, provider: str, method_name: str, kwargs: Dict[str, object]):
+        client = self._clients[provider]
+        call_kwargs = dict(kwargs)
+        if provider != 'openai' and 'model' in call_kwargs:
+            call_kwargs['model'] = None
+        return provider, getattr(client, method_name), call_kwargs
+
+    def _record(
+        self, provider: str, started: float, exc: Optional[Exception] = None, events: Optional[List[CallEvent]] = None,
+    ) -> None:
+        """Record an outcome; ``events`` are the calls the provider client recorded for it."""
+        if exc is not None and self._clients[provider].retry_policy.is_request_error(exc):
+            # The request itself was bad: the provider answered, so it counts as up.
+            # Auth, permission and quota errors are not: every other request would fail too.
+            self._health[provider].record(True)
+            return
+        if exc is None and events and served_from_cache(events):
+            # Answered from the cache: a success, but its latency says nothing about the provider.
+            self._health[provider].record(True)
+            return
+        self._health[provider].record(exc is None, time.perf_counter() - started)
+
     def _call_with_fallback(self, method_name: str, *args, **kwargs):
+        if self.hedge:
+            return self._call_hedged(method_name, *args, **kwargs)
         last_exc: Optional[Exception] = None
-        for provider in self._order:
-            client = self._clients.get(provider)
-            if not client:
-                continue
-            call_kwargs = dict(kwargs)
-            if provider != 'openai' and 'model' in call_kwargs:
-                call_kwargs['model'] = None
+        for provider, method, call_kwargs in self._attempts(method_name, kwargs):
+            started = time.perf_counter()
             try:
-                method = getattr(client, method_name)
-                return method(*args, **call_kwargs)
+                with observe_calls() as events:
+                    result = method(*args, **call_kwargs)
             except Exception as exc:  # pragma: no cover - network failure
+                self._record(provider, started, exc)
                 last_exc = exc
                 LOGGER.warning("MixedAI: provider %s failed for %s: %s", provider, method_name, exc)
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the provider, but free a half-open probe.
+                self._health[provider].release()
+                raise
+            self._record(provider, started, events=events)
+            return result
         if last_exc:
             raise last_exc
         raise RuntimeError(f'MixedAI: no providers succeeded for {method_name}')
 
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='mixed-hedge')
+            return self._hedge_pool
+
+    def _call_hedged(self, method_name: str, *args, **kwargs):
+        """Fallback that also races the next provider once the primary is slower than the hedge delay."""
+        attempts = self._attempts(method_name, kwargs)
+        pool = self._hedge_executor()
+        running: Dict[Future, Tuple[str, float, List[CallEvent]]] = {}
+
+        def launch() -> bool:
+            attempt = next(attempts, None)
+            if attempt is None:
+                return False
+            provider, method, call_kwargs = attempt
+            events: List[CallEvent] = []
+            future = pool.submit(_run_observed, events, method, args, call_kwargs)
+            running[future] = (provider, time.perf_counter(), events)
+            return True
+
+        launch()
+        primary = next(iter(running))
+        delay = self._hedge_after(running[primary][0])
+        waiting_to_hedge, hedged = True, False
+        last_exc: Optional[Exception] = None
+        winner: Optional[Future] = None
+        try:
+            while running:
+                done, _ = wait(running, timeout=delay if waiting_to_hedge else None, return_when=FIRST_COMPLETED)
+                if not done:
+                    waiting_to_hedge = False
+                    hedged = launch()
+                    if hedged:
+                        LOGGER.info(
+                            "MixedAI: %s slower than %.2fs, hedging %s", running[primary][0], delay, method_name,
+                        )
+                    continue
+                for future in done:
+                    provider, started, events = running.pop(future)
+                    exc = future.exception()
+                    self._record(provider, started, exc, events)
+                    if exc is None:
+                        winner = future
+                        return future.result()
+                    last_exc = exc
+                    LOGGER.warning("MixedAI: provider %s failed for %s: %s", provider, method_name, exc)
+                if not running:
+                    waiting_to_hedge = False
+                    launch()
+        finally:
+            hedge_won = winner is not None and winner is not primary and hedged
+            self._hedge_stats.record_call(hedged, hedge_won)
+            self._abandon(running, primary if hedge_won else None)
+        if last_exc:
+            raise last_exc
+        raise RuntimeError(f'MixedAI: no providers succeeded for {method_name}')
+
+    def _abandon(
+        self, running: Dict[Future, Tuple[str, float, List[CallEvent]]], beaten_primary: Optional[Future],
+    ) -> None:
+        """Cancel losing calls; ones already running on a thread finish in the background and are timed."""
+        won_at = time.perf_counter()
+        for future, (provider, started, events) in running.items():
+            if future.cancel():
+                # Never started, so there is no outcome to record; a probe it held is free again.
+                self._health[provider].release()
+                continue
+
+            def finished(
+                future: Future, provider: str = provider, started: float = started, events: List[CallEvent] = events,
+            ) -> None:
+                exc = future.exception()
+                self._record(provider, started, exc, events)
+                if exc is None and future is beaten_primary:
+                    self._hedge_stats.record_gain(time.perf_counter() - won_at)
+
+            future.add_done_callback(finished)
+
     def send_request_with_json_schema(self, *args, **kwargs):
         return self._call_with_fallback('send_request_with_json_schema', *args, **kwargs)
 
     def send_simple_request(self, *args, **kwargs):
         return self._call_with_fallback('send_simple_request', *args, **kwargs)
 
+    def _batch_client(self):
+        client = self._clients.get('openai')
+        if client is None:
+            raise NotImplementedError('MixedAI: batch_api needs the OpenAI provider')
+        return client
+
+    def send_many(
+        self,
+        requests,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        batch_api: bool = False,
+        **batch_options,
+    ):
+        """Run structured requests with per-item fallback; see OpenAIRequestJSONBase.send_many."""
+        if batch_api:
+            return self._batch_client().send_many(requests, batch_api=True, **batch_options)
+        return run_many(self.send_request_with_json_schema, requests, concurrency)
+
+    def stream_simple_request(self, *args, **kwargs):
+        """Stream from the first provider that produces a delta; fall back only before that."""
+        last_exc: Optional[Exception] = None
+        for provider, method, call_kwargs in self._attempts('stream_simple_request', kwargs):
+            started = time.perf_counter()
+            stream = method(*args, **call_kwargs)
+            try:
+                with observe_calls() as events:
+                    first = next(stream)
+            except StopIteration:
+                self._record(provider, started, events=events)
+                return
+            except Exception as exc:  # pragma: no cover - network failure
+                self._record(provider, started, exc)
+                last_exc = exc
+                LOGGER.warning("MixedAI: provider %s failed to start stream: %s", provider, exc)
+                continue
+            # Time to first delta is what routing cares about for streams.
+            self._record(provider, started, events=events)
+            yield first
+            yield from stream
+            return
+        if last_exc:
+            raise last_exc
+        raise RuntimeError('MixedAI: no providers succeeded for stream_simple_request')
+
     def __getattr__(self, item):
         # Fallback to primary provider for any other attributes/methods
         primary = self._order[0]
@@ -93,3 +353,127 @@ class MixedAIRequestJSONBase:
             raise AttributeError(item)
         return getattr(client, item)
 
+
+class AsyncMixedAIRequestJSONBase(MixedAIRequestJSONBase):
+    """Async proxy over the Async* provider clients with the same fallback order."""
+
+    _openai_class = AsyncOpenAIRequestJSONBase
+    _deepseek_class = AsyncDeepSeekRequestJSONBase
+
+    async def _call_with_fallback(self, method_name: str, *args, **kwargs):
+        if self.hedge:
+            return await self._call_hedged(method_name, *args, **kwargs)
+        last_exc: Optional[Exception] = None
+        for provider, method, call_kwargs in self._attempts(method_name, kwargs):
+            started = time.perf_counter()
+            try:
+                with observe_calls() as events:
+                    result = await method(*args, **call_kwargs)
+            except Exception as exc:  # pragma: no cover - network failure
+                self._record(provider, started, exc)
+                last_exc = exc
+                LOGGER.warning("MixedAI: provider %s failed for %s: %s", provider, method_name, exc)
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the provider, but free a half-open probe.
+                self._health[provider].release()
+                raise
+            self._record(provider, started, events=events)
+            return result
+        if last_exc:
+            raise last_exc
+        raise RuntimeError(f'MixedAI: no providers succeeded for {method_name}')
+
+    async def _call_hedged(self, method_name: str, *args, **kwargs):
+        """Async version of MixedAIRequestJSONBase._call_hedged; losing calls are cancelled outright."""
+        attempts = self._attempts(method_name, kwargs)
+        running: Dict[asyncio.Future, Tuple[str, float, List[CallEvent]]] = {}
+
+        def launch() -> bool:
+            attempt = next(attempts, None)
+            if attempt is None:
+                return False
+            provider, method, call_kwargs = attempt
+            events: List[CallEvent] = []
+            task = asyncio.ensure_future(_run_observed_async(events, method, args, call_kwargs))
+            running[task] = (provider, time.perf_counter(), events)
+            return True
+
+        launch()
+        primary = next(iter(running))
+        delay = self._hedge_after(running[primary][0])
+        waiting_to_hedge, hedged = True, False
+        last_exc: Optional[Exception] = None
+        winner: Optional[asyncio.Future] = None
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running, timeout=delay if waiting_to_hedge else None, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    waiting_to_hedge = False
+                    hedged = launch()
+                    if hedged:
+                        LOGGER.info(
+                            "MixedAI: %s slower than %.2fs, hedging %s", running[primary][0], delay, method_name,
+                        )
+                    continue
+                for task in done:
+                    provider, started, events = running.pop(task)
+                    exc = task.exception()
+                    self._record(provider, started, exc, events)
+                    if exc is None:
+                        winner = task
+                        return task.result()
+                    last_exc = exc
+                    LOGGER.warning("MixedAI: provider %s failed for %s: %s", provider, method_name, exc)
+                if not running:
+                    waiting_to_hedge = False
+                    launch()
+        finally:
+            self._hedge_stats.record_call(hedged, winner is not None and winner is not primary and hedged)
+            for task, (provider, _, _) in running.items():
+                task.cancel()
+                # A cancelled call has no outcome to record; a probe it held is free again.
+                self._health[provider].release()
+        if last_exc:
+            raise last_exc
+        raise RuntimeError(f'MixedAI: no providers succeeded for {method_name}')
+
+    async def send_many(
+        self,
+        requests,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        batch_api: bool = False,
+        **batch_options,
+    ):
+        """Async version of MixedAIRequestJSONBase.send_many."""
+        if batch_api:
+            return await self._batch_client().send_many(requests, batch_api=True, **batch_options)
+        return await run_many_async(self.send_request_with_json_schema, requests, concurrency)
+
+    async def stream_simple_request(self, *args, **kwargs):
+        """Async-iterator version of MixedAIRequestJSONBase.stream_simple_request."""
+        last_exc: Optional[Exception] = None
+        for provider, method, call_kwargs in self._attempts('stream_simple_request', kwargs):
+            started = time.perf_counter()
+            stream = method(*args, **call_kwargs)
+            try:
+                with observe_calls() as events:
+                    first = await stream.__anext__()
+            except StopAsyncIteration:
+                self._record(provider, started, events=events)
+                return
+            except Exception as exc:  # pragma: no cover - network failure
+                self._record(provider, started, exc)
+                last_exc = exc
+                LOGGER.warning("MixedAI: provider %s failed to start stream: %s", provider, exc)
+                continue
+            self._record(provider, started, events=events)
+            yield first
+            async for delta in stream:
+                yield delta
+            return
+        if last_exc:
+            raise last_exc
+        raise RuntimeError('MixedAI: no providers succeeded for stream_simple_request')
@@ -22,7 +22,9 @@ from echomind.enhancements.japanese_enhancement import LanguageEnhancer
 from echomind.enhancements.english_enhancement import EnglishLanguageEnhancer
 from echomind.database import DatabaseManager
 from echomind.ai_client_factory import build_with_fallback
+from echomind.mixed_ai_request import MixedAIRequestJSONBase
 from echomind.ai_config import load_ai_model_config
+from echomind.instrumentation import metrics_snapshot, render_prometheus
 
 logger = logging.getLogger(__name__)
 
@@ -612,8 +614,29 @@ class SharedModelManager:
             'whisper_pool': {
                 'instances': len(self._whisper_instances),
                 'devices': [x.get('device') for x in self._whisper_instances],
-            }
+            },
+            'response_cache': self.openai_client.cache_stats() if self.openai_client else None,
+            'request_coalescing': (
+                self.openai_client.coalescing_stats() if self.openai_client else None
+            ),
+            'streaming': self.openai_client.stream_stats() if self.openai_client else None,
+            'rate_limits': self.openai_client.rate_limit_stats() if self.openai_client else None,
+            # Circuit breakers and rolling health; only the mixed client routes between providers
+            'providers': (
+                self.openai_client.provider_health()
+                if isinstance(self.openai_client, MixedAIRequestJSONBase) else None
+            ),
+            'hedging': (
+                self.openai_client.hedging_stats()
+                if isinstance(self.openai_client, MixedAIRequestJSONBase) else None
+            ),
+            # Tokens, cost, cache hits, errors and latency of every LLM/TTS call, per provider/model
+            'llm_usage': metrics_snapshot(),
         }
+
+    def get_metrics_text(self):
+        """LLM/TTS usage metrics in Prometheus text format, for a metrics endpoint"""
+        return render_prometheus()
     
     def _get_memory_info(self):
         """Get memory usage information"""
@@ -1,12 +1,26 @@
 import os
 import json
-import traceback
+import logging
 import hashlib
 from datetime import datetime
 from pathlib import Path
 import pygame
 import tempfile
-from openai import OpenAI
+import asyncio
+import time
+from openai import AsyncOpenAI, OpenAI, RateLimitError
+from openai.types.chat import ChatCompletion
+
+from echomind.ai_cache import cache_key, legacy_cache_key, open_cache_backend
+from echomind.bulk import DEFAULT_CONCURRENCY, BulkResult, run_many, run_many_async
+from echomind.instrumentation import record_cache_hit, record_call
+from echomind.retry_policy import RetryPolicy
+from echomind.schema_validation import memoized_conversion
+from echomind.rate_limit import estimate_tokens, limiter_for, rate_limit_stats
+from echomind.single_flight import shared_single_flight
+from echomind.stream_stats import StreamTimer, shared_stream_stats
+
+LOGGER = logging.getLogger(__name__)
 
 
 class JSONValidationError(Exception):
@@ -19,42 +33,61 @@ class JSONValidationError(Exception):
 class JSONParsingError(Exception):
     def __init__(self, message, json_string, text):
         super().__init__(message)
-        print("The failed JSON string: \n\n")
-        print(json_string)
+        LOGGER.error("The failed JSON string:\n%s", json_string)
         self.message = message
         self.json_string = json_string
         self.text = text
 
 
+BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
 class OpenAIRequestJSONBase:
-    def __init__(self, use_cache=True, max_retries=3, cache_dir='cache'):
-        self.client = OpenAI()  # Assume correct initialization with API key
+    _client_class = OpenAI
+
+    def __init__(self, use_cache=True, max_retries=3, cache_dir='cache', cache_backend=None, coalesce=True, retry_policy=None, semantic_cache=None):
+        # Assume correct initialization with API key; retries are handled by self.retry_policy
+        self.client = self._client_class(max_retries=0)
         self.max_retries = max_retries
+        # Backoff, Retry-After and retryable/fatal classification for every request loop
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=max_retries, feedback_errors=(json.JSONDecodeError, JSONValidationError)
+        )
         self.use_cache = use_cache
         self.cache_dir = cache_dir
         self.audio_cache_dir = os.path.join(cache_dir, 'audio')
         self.ensure_dir_exists(self.cache_dir)
         self.ensure_dir_exists(self.audio_cache_dir)
+        # Either a CacheBackend instance or a backend name for open_cache_backend ("sqlite", "files")
+        if cache_backend is None or isinstance(cache_backend, str):
+            cache_backend = open_cache_backend(cache_dir, cache_backend)
+        self.response_cache = cache_backend
+        # Optional reuse of responses to near-duplicate prompts: True for the shared index under cache_dir,
+        # embedded with OpenAI embeddings, or a SemanticCache instance (see semantic_cache; needs numpy)
+        if semantic_cache is True:
+            from echomind.semantic_cache import open_semantic_cache
+
+            semantic_cache = open_semantic_cache(cache_dir)
+        self.semantic_cache = semantic_cache or None
+        # Identical requests already in flight in this process are joined instead of re-sent
+        self.coalesce = coalesce
+        self.flights = shared_single_flight()
+        self.stream_timings = shared_stream_stats()
         
         # Initialize pygame mixer for audio playback
         try:
             pygame.mixer.init()
         except:
-            print("Warning: pygame mixer initialization failed. Audio playback may not work.")
+            LOGGER.warning("pygame mixer initialization failed. Audio playback may not work.")
 
     def ensure_dir_exists(self, path):
         if not os.path.exists(path):
             os.makedirs(path)
 
-    def get_cache_file_path(self, prompt, filename=None):
-        if filename is None:
-            filename = f"{abs(hash(prompt))}.json"
-    
+    def get_cache_file_path(self, prompt, filename):
+        """Return the path for a response cached under an explicit filename."""
         cache_path = os.path.join(self.cache_dir, filename)
-        print("cache_path: ", cache_path)
-        cache_dir = os.path.dirname(cache_path)
-        print("cache_dir: ", cache_dir)
-        os.makedirs(cache_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
         return cache_path
 
     def get_audio_cache_file_path(self, text, voice, model="tts-1", instructions=""):
@@ -66,18 +99,103 @@ class OpenAIRequestJSONBase:
         cache_path = os.path.join(self.audio_cache_dir, filename)
         return cache_path
 
-    def save_to_cache(self, prompt, response, filename=None):
-        file_path = self.get_cache_file_path(prompt, filename=filename)
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump({"prompt": prompt, "response": response}, file, ensure_ascii=False, indent=4)
-
-    def load_from_cache(self, prompt, filename=None):
-        file_path = self.get_cache_file_path(prompt, filename=filename)
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as file:
-                cached_data = json.load(file)
-                return cached_data["response"]
-        return None
+    def save_to_cache(self, prompt, response, filename=None, key=None):
+        if filename is not None:
+            file_path = self.get_cache_file_path(prompt, filename=filename)
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump({"prompt": prompt, "response": response}, file, ensure_ascii=False, indent=4)
+            return
+        self.response_cache.set(key or legacy_cache_key(prompt), response, prompt=prompt)
+
+    def cache_stats(self):
+        """Hit/miss statistics of the response cache backend, and of the semantic cache when enabled."""
+        stats = self.response_cache.stats()
+        if self.semantic_cache is not None:
+            stats = {**stats, "semantic": self.semantic_cache.stats()}
+        return stats
+
+    def coalescing_stats(self):
+        """Counts of requests that were sent (leaders) or joined an identical one in flight (coalesced)."""
+        return self.flights.stats()
+
+    def stream_stats(self):
+        """Time to first token and tokens/second of recent streamed requests, per model."""
+        return self.stream_timings.snapshot()
+
+    def rate_limit_stats(self):
+        """Request/token budgets, throttled calls and time spent waiting for capacity, per model."""
+        return rate_limit_stats()
+
+    def _coalesce(self, key, request, filename=None):
+        if not self.coalesce:
+            return request()
+        return self.flights.do(self._flight_key(key, filename), request)
+
+    @staticmethod
+    def _flight_key(key, filename):
+        # cache_key leaves filename out, but each caller's request() saves to its own file,
+        # so identical calls with different filenames must not share one flight.
+        return key if filename is None else f"{key}:{filename}"
+
+    def load_from_cache(self, prompt, filename=None, key=None):
+        """
+        Look up a cached response.
+
+        ``key`` should come from ``cache_key`` over every parameter that affects the
+        output; it is looked up in ``self.response_cache``. Without a ``key`` the
+        prompt-only ``legacy_cache_key(prompt)`` is used, as in ``save_to_cache``.
+        """
+        return self._lookup_cache(prompt, filename=filename, key=key)[0]
+
+    def _lookup_cache(self, prompt, filename=None, key=None):
+        """load_from_cache, also naming the tier that held the response ("file", "memory" or "persistent")."""
+        if filename is not None:
+            file_path = self.get_cache_file_path(prompt, filename=filename)
+            if os.path.exists(file_path):
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    cached_data = json.load(file)
+                    return cached_data["response"], "file"
+            return None, None
+        return self._cache_get(key or legacy_cache_key(prompt))
+
+    def _cache_get(self, key):
+        lookup = getattr(self.response_cache, "lookup", None)
+        if lookup is not None:
+            return lookup(key)
+        cached = self.response_cache.get(key)
+        return cached, "persistent" if cached is not None else None
+
+    def _load_cached_call(self, prompt, model, operation, filename=None, key=None):
+        """load_from_cache that records a hit as a OpenAI call answered by the cache."""
+        started = time.perf_counter()
+        cached_response, tier = self._lookup_cache(prompt, filename=filename, key=key)
+        if cached_response:
+            record_cache_hit("openai", model, operation, tier, started)
+        return cached_response
+
+    def _load_semantic_match(self, prompt, params, operation, filename=None):
+        """Cached response to an earlier prompt similar enough to ``prompt`` under the same model, system prompt and schema."""
+        if self.semantic_cache is None or filename is not None:
+            return None
+        started = time.perf_counter()
+        try:
+            key = self.semantic_cache.lookup(prompt, "openai", params)
+        except Exception as e:  # an unavailable embedder only costs the shortcut
+            LOGGER.warning("Semantic cache lookup failed: %s", e)
+            return None
+        cached_response = self.response_cache.get(key) if key is not None else None
+        if cached_response:
+            record_cache_hit("openai", params["model"], operation, "semantic", started)
+        return cached_response
+
+    def _remember_semantic(self, prompt, params, key, filename=None):
+        """Index ``prompt`` for _load_semantic_match; responses cached under a filename are not indexed."""
+        if self.semantic_cache is None or filename is not None:
+            return
+        try:
+            self.semantic_cache.add(prompt, "openai", params, key)
+        except Exception as e:
+            LOGGER.warning("Semantic cache update failed: %s", e)
 
     def load_audio_from_cache(self, audio_path):
         """Load audio file from cache if it exists"""
@@ -91,6 +209,28 @@ class OpenAIRequestJSONBase:
             file.write(audio_data)
         return audio_path
 
+    def _tts_params(self, text, voice, model, instructions, response_format):
+        tts_params = {
+            "model": model,
+            "voice": voice,
+            "input": text,
+            "response_format": response_format
+        }
+        # Only add instructions for gpt-4o-mini-tts model
+        if instructions and model == "gpt-4o-mini-tts":
+            tts_params["instructions"] = instructions
+        return tts_params
+
+    def _store_speech(self, audio_content, text, voice, model, instructions, response_format):
+        """Write generated audio to the audio cache, or to a temporary file when caching is off."""
+        if self.use_cache:
+            audio_path = self.get_audio_cache_file_path(text, voice, model, instructions)
+            return self.save_audio_to_cache(audio_content, audio_path)
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{response_format}")
+        temp_file.write(audio_content)
+        temp_file.close()
+        return temp_file.name
+
     def text_to_speech(self, text, voice="coral", model="tts-1", instructions="", response_format="mp3", play_audio=True):
         """
         Convert text to speech using OpenAI's TTS API with caching support.
@@ -109,60 +249,39 @@ class OpenAIRequestJSONBase:
         
         # Check cache first if enabled
         if self.use_cache:
+            started = time.perf_counter()
             audio_cache_path = self.get_audio_cache_file_path(text, voice, model, instructions)
             cached_audio = self.load_audio_from_cache(audio_cache_path)
             if cached_audio:
-                print("TTS cache found.")
+                LOGGER.debug("TTS cache found")
+                record_cache_hit("openai", model, "tts", "file", started)
                 if play_audio:
                     self.play_audio(cached_audio)
                 return cached_audio
 
-        retries = 0
-        while retries < self.max_retries:
-            try:
-                print(f"Generating speech with OpenAI TTS (attempt {retries + 1})...")
-                
-                # Create TTS request
-                tts_params = {
-                    "model": model,
-                    "voice": voice,
-                    "input": text,
-                    "response_format": response_format
-                }
-                
-                # Only add instructions for gpt-4o-mini-tts model
-                if instructions and model == "gpt-4o-mini-tts":
-                    tts_params["instructions"] = instructions
-                
-                response = self.client.audio.speech.create(**tts_params)
-                
-                # Get audio content
-                audio_content = response.content
-                
-                # Save to cache if enabled
-                if self.use_cache:
-                    audio_path = self.get_audio_cache_file_path(text, voice, model, instructions)
-                    self.save_audio_to_cache(audio_content, audio_path)
-                else:
-                    # Create temporary file if not caching
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{response_format}")
-                    temp_file.write(audio_content)
-                    temp_file.close()
-                    audio_path = temp_file.name
-                
-                if play_audio:
-                    self.play_audio(audio_path)
-                
-                return audio_path
-                
-            except Exception as e:
-                error_msg = f"TTS API error: {e}"
-                print(error_msg)
-                traceback.print_exc()
-                retries += 1
-                
-                if retries >= self.max_retries:
-                    raise Exception("Maximum retries reached for TTS request.")
+        attempt = 0
+        with record_call("openai", model, "tts", characters=len(text)) as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                try:
+                    LOGGER.debug("Generating speech with OpenAI TTS (attempt %d)", attempt)
+
+                    tts_params = self._tts_params(text, voice, model, instructions, response_format)
+                    response = self.client.audio.speech.create(**tts_params)
+                    audio_path = self._store_speech(response.content, text, voice, model, instructions, response_format)
+                    # Playback time is not request latency
+                    call.finish()
+
+                    if play_audio:
+                        self.play_audio(audio_path)
+
+                    return audio_path
+
+                except Exception as e:
+                    LOGGER.warning("TTS API error: %s", e, exc_info=True)
+                    delay = self.retry_policy.backoff(e, attempt)
+                time.sleep(delay)
 
     def text_to_speech_stream(self, text, voice="coral", model="tts-1", instructions="", response_format="mp3", play_audio=True):
         """
@@ -180,25 +299,18 @@ class OpenAIRequestJSONBase:
         Returns:
             Path to the generated audio file
         """
+        call = record_call("openai", model, "tts_stream", characters=len(text))
         try:
-            print("Generating speech with OpenAI TTS (streaming)...")
+            LOGGER.debug("Generating speech with OpenAI TTS (streaming)")
             
             # Create temporary file for streaming
             temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{response_format}")
             
-            tts_params = {
-                "model": model,
-                "voice": voice,
-                "input": text,
-                "response_format": response_format
-            }
-            
-            # Only add instructions for gpt-4o-mini-tts model
-            if instructions and model == "gpt-4o-mini-tts":
-                tts_params["instructions"] = instructions
-            
+            tts_params = self._tts_params(text, voice, model, instructions, response_format)
+            call.attempt()
             with self.client.audio.speech.with_streaming_response.create(**tts_params) as response:
                 response.stream_to_file(temp_file.name)
+            call.finish()
             
             if play_audio:
                 self.play_audio(temp_file.name)
@@ -206,9 +318,8 @@ class OpenAIRequestJSONBase:
             return temp_file.name
             
         except Exception as e:
-            error_msg = f"TTS streaming API error: {e}"
-            print(error_msg)
-            traceback.print_exc()
+            call.finish(e)
+            LOGGER.warning("TTS streaming API error: %s", e, exc_info=True)
             raise Exception(f"TTS streaming failed: {e}")
 
     def play_audio(self, audio_path):
@@ -219,27 +330,139 @@ class OpenAIRequestJSONBase:
             audio_path: Path to the audio file to play
         """
         try:
-            if not os.path.exists(audio_path):
-                print(f"Audio file not found: {audio_path}")
+            if not self._start_playback(audio_path):
                 return
             
-            print(f"Playing audio: {audio_path}")
-            pygame.mixer.music.load(audio_path)
-            pygame.mixer.music.play()
-            
             # Wait for playback to complete
             while pygame.mixer.music.get_busy():
                 pygame.time.wait(100)
             
         except Exception as e:
-            print(f"Error playing audio: {e}")
+            LOGGER.warning("Error playing audio: %s", e)
+
+    def _start_playback(self, audio_path):
+        if not os.path.exists(audio_path):
+            LOGGER.warning("Audio file not found: %s", audio_path)
+            return False
+        LOGGER.debug("Playing audio: %s", audio_path)
+        pygame.mixer.music.load(audio_path)
+        pygame.mixer.music.play()
+        return True
 
     def stop_audio(self):
         """Stop audio playback"""
         try:
             pygame.mixer.music.stop()
         except Exception as e:
-            print(f"Error stopping audio: {e}")
+            LOGGER.warning("Error stopping audio: %s", e)
+
+    def _prepare_json_request(self, prompt, json_schema, system_content, schema_name, model):
+        """Chat completion arguments and cache key for a structured-output request."""
+        if model is None:
+            model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+        params = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_content},
+                {"role": "user", "content": prompt}
+            ],
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": schema_name,
+                    "strict": True,
+                    "schema": json_schema
+                }
+            },
+        }
+        return params, cache_key(provider="openai", **params)
+
+    def _prepare_simple_request(self, prompt, system_content, model):
+        """Chat completion arguments, cache key and legacy cache prompt for a text request."""
+        if model is None:
+            model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+        params = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_content},
+                {"role": "user", "content": prompt}
+            ],
+        }
+        # Entries written before content-addressed keys were keyed on this string
+        legacy_prompt = f"{system_content}_{prompt}"
+        return params, cache_key(provider="openai", **params), legacy_prompt
+
+    def _parse_json_response(self, response):
+        message = response.choices[0].message
+        if message.refusal:
+            raise Exception(f"Request was refused: {message.refusal}")
+        return json.loads(message.content)
+
+    def _parse_text_response(self, response):
+        message = response.choices[0].message
+        if message.refusal:
+            raise Exception(f"Request was refused: {message.refusal}")
+        return message.content
+
+    def _report_failure(self, error):
+        if isinstance(error, json.JSONDecodeError):
+            LOGGER.warning("Failed to decode JSON response: %s", error)
+        else:
+            LOGGER.warning("OpenAI API error: %s", error, exc_info=True)
+
+    def _retry_feedback(self, error):
+        """System message asking the model to correct an invalid JSON response."""
+        return {"role": "system", "content": f"Previous response had JSON parsing error: {error}. Please provide a valid JSON response."}
+
+    def _complete(self, params):
+        """Create a chat completion once the (openai, model) rate limiter has capacity for it."""
+        limiter = limiter_for("openai", params["model"])
+        estimated = estimate_tokens(params)
+        limiter.acquire(estimated)
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(**params)
+        except RateLimitError as e:
+            limiter.record_rate_limited(e.response.headers)
+            raise
+        limiter.observe_headers(raw.headers)
+        response = raw.parse()
+        limiter.settle(estimated, response.usage.total_tokens if response.usage else None)
+        return response
+
+    def _open_stream(self, params):
+        """Open a chat completion stream under the (openai, model) rate limiter, settled by its usage chunk."""
+        limiter = limiter_for("openai", params["model"])
+        estimated = estimate_tokens(params)
+        limiter.acquire(estimated)
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(**self._stream_params(params))
+        except RateLimitError as e:
+            limiter.record_rate_limited(e.response.headers)
+            raise
+        limiter.observe_headers(raw.headers)
+        return limiter.settle_stream(raw.parse(), estimated)
+
+    def _request_with_retries(self, params, parse, description):
+        attempt = 0
+        feedback_sent = False
+        with record_call("openai", params["model"], "chat") as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                try:
+                    LOGGER.debug("Querying OpenAI with %s (attempt %d)", description, attempt)
+                    response = self._complete(params)
+                    # Tokens of responses that fail parsing or validation are billed too
+                    call.add_usage(response.usage)
+                    return parse(response)
+                except Exception as e:
+                    self._report_failure(e)
+                    delay = self.retry_policy.backoff(e, attempt)
+                    # Only invalid output is worth explaining to the model, and only once
+                    if self.retry_policy.wants_feedback(e) and not feedback_sent:
+                        params["messages"].append(self._retry_feedback(e))
+                        feedback_sent = True
+                time.sleep(delay)
 
     def send_request_with_json_schema(self, prompt, json_schema, system_content="You are an AI.", filename=None, schema_name="response", model=None):
         """
@@ -255,74 +478,23 @@ class OpenAIRequestJSONBase:
         Returns:
             Parsed JSON response that conforms to the schema
         """
-        retries = 0
-        if model is None:
-            model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
-
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": prompt}
-        ]
-
-        print("self.use_cache: ", self.use_cache)
+        params, key = self._prepare_json_request(prompt, json_schema, system_content, schema_name, model)
 
         if self.use_cache:
-            cached_response = self.load_from_cache(prompt, filename=filename)
+            cached_response = self._load_cached_call(prompt, params["model"], "chat", filename=filename, key=key)
+            cached_response = cached_response or self._load_semantic_match(prompt, params, "chat", filename=filename)
             if cached_response:
-                print("OpenAI cache found. ")
+                LOGGER.debug("OpenAI cache found")
                 return cached_response
 
-        while retries < self.max_retries:
-            try:
-                print(f"Querying OpenAI with structured outputs (attempt {retries + 1})...")
-                
-                # Use the new Structured Outputs API
-                response = self.client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    response_format={
-                        "type": "json_schema",
-                        "json_schema": {
-                            "name": schema_name,
-                            "strict": True,
-                            "schema": json_schema
-                        }
-                    }
-                )
+        def request():
+            parsed_response = self._request_with_retries(params, self._parse_json_response, "structured outputs")
+            if self.use_cache:
+                self.save_to_cache(prompt, parsed_response, filename=filename, key=key)
+                self._remember_semantic(prompt, params, key, filename=filename)
+            return parsed_response
 
-                # Check for refusal
-                message = response.choices[0].message
-                if message.refusal:
-                    raise Exception(f"Request was refused: {message.refusal}")
-
-                # Parse the structured response
-                parsed_response = json.loads(message.content)
-                
-                # Save to cache
-                if self.use_cache:
-                    self.save_to_cache(prompt, parsed_response, filename=filename)
-                
-                return parsed_response
-
-            except json.JSONDecodeError as e:
-                error_msg = f"Failed to decode JSON response: {e}"
-                print(error_msg)
-                traceback.print_exc()
-                retries += 1
-                
-                if retries < self.max_retries:
-                    messages.append({"role": "system", "content": f"Previous response had JSON parsing error: {error_msg}. Please provide a valid JSON response."})
-                
-            except Exception as e:
-                error_msg = f"OpenAI API error: {e}"
-                print(error_msg)
-                traceback.print_exc()
-                retries += 1
-                
-                if retries < self.max_retries:
-                    messages.append({"role": "system", "content": f"Previous request failed: {error_msg}. Please try again."})
-
-        raise Exception("Maximum retries reached without success.")
+        return self._coalesce(key, request, filename=filename)
 
     def send_simple_request(self, prompt, system_content="You are a helpful AI assistant.", model=None):
         """
@@ -336,56 +508,177 @@ class OpenAIRequestJSONBase:
         Returns:
             Text response from the AI
         """
-        if model is None:
-            model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
-        
-        # Use prompt as cache key for simple requests
-        cache_key = f"{system_content}_{prompt}"
-        
+        params, key, legacy_prompt = self._prepare_simple_request(prompt, system_content, model)
+
         if self.use_cache:
-            cached_response = self.load_from_cache(cache_key)
+            cached_response = self._load_cached_call(legacy_prompt, params["model"], "chat", key=key)
+            cached_response = cached_response or self._load_semantic_match(prompt, params, "chat")
             if cached_response:
-                print("OpenAI simple request cache found.")
+                LOGGER.debug("OpenAI simple request cache found")
                 return cached_response
 
-        retries = 0
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": prompt}
-        ]
+        def request():
+            response_text = self._request_with_retries(params, self._parse_text_response, "simple request")
+            if self.use_cache:
+                self.save_to_cache(legacy_prompt, response_text, key=key)
+                self._remember_semantic(prompt, params, key)
+            return response_text
+
+        return self._coalesce(key, request)
+
+    def _stream_params(self, params):
+        return {**params, "stream": True, "stream_options": {"include_usage": True}}
+
+    def _stream_delta(self, chunk):
+        """Text delta and completion-token count (only sent on the final chunk) of a streamed chunk."""
+        tokens = chunk.usage.completion_tokens if getattr(chunk, "usage", None) else None
+        if not chunk.choices:
+            return None, tokens
+        delta = chunk.choices[0].delta
+        if getattr(delta, "refusal", None):
+            raise Exception(f"Request was refused: {delta.refusal}")
+        return delta.content, tokens
+
+    def _finish_stream(self, params, key, legacy_prompt, timer, parts, tokens):
+        timer.finish()
+        self.stream_timings.record("openai", params["model"], timer, tokens or len(parts))
+        if self.use_cache and parts:
+            self.save_to_cache(legacy_prompt, "".join(parts), key=key)
+
+    def stream_simple_request(self, prompt, system_content="You are a helpful AI assistant.", model=None):
+        """
+        Stream a simple text request to OpenAI, yielding text deltas as they arrive.
 
-        while retries < self.max_retries:
-            try:
-                print(f"Querying OpenAI with simple request (attempt {retries + 1})...")
-                
-                response = self.client.chat.completions.create(
-                    model=model,
-                    messages=messages
-                )
+        A cached response is yielded as a single delta. Failed attempts are retried only until the
+        first delta has been yielded; after that errors propagate to the caller. The assembled text
+        is cached once the stream completes, and time to first token and tokens/second are recorded
+        per model (see ``stream_stats``).
+        """
+        params, key, legacy_prompt = self._prepare_simple_request(prompt, system_content, model)
 
-                # Check for refusal
-                message = response.choices[0].message
-                if message.refusal:
-                    raise Exception(f"Request was refused: {message.refusal}")
+        if self.use_cache:
+            cached_response = self._load_cached_call(legacy_prompt, params["model"], "stream", key=key)
+            if cached_response:
+                LOGGER.debug("OpenAI simple request cache found")
+                yield cached_response
+                return
 
-                response_text = message.content
-                
-                # Save to cache
-                if self.use_cache:
-                    self.save_to_cache(cache_key, response_text)
-                
-                return response_text
+        attempt = 0
+        with record_call("openai", params["model"], "stream") as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                timer, parts, tokens = StreamTimer(), [], None
+                try:
+                    LOGGER.debug("Streaming OpenAI simple request (attempt %d)", attempt)
+                    for chunk in self._open_stream(params):
+                        call.add_usage(getattr(chunk, "usage", None))
+                        text, usage_tokens = self._stream_delta(chunk)
+                        tokens = usage_tokens or tokens
+                        if text:
+                            timer.mark_token()
+                            parts.append(text)
+                            yield text
+                    break
+                except Exception as e:
+                    if parts:
+                        raise
+                    self._report_failure(e)
+                    delay = self.retry_policy.backoff(e, attempt)
+                time.sleep(delay)
+
+        self._finish_stream(params, key, legacy_prompt, timer, parts, tokens)
+
+    def send_many(self, requests, concurrency=DEFAULT_CONCURRENCY, batch_api=False, poll_interval=30, timeout=None):
+        """
+        Run many send_request_with_json_schema calls and return one BulkResult per request, in input order.
 
+        Args:
+            requests: List of keyword-argument dicts for send_request_with_json_schema
+            concurrency: Maximum number of requests in flight at once
+            batch_api: Submit the uncached requests as one Batch API job (completes within 24h) instead
+            poll_interval: Seconds between batch status checks
+            timeout: Stop waiting for the batch after this many seconds
+
+        Every item is served from the cache when possible and cached when it succeeds. A failed item
+        carries its exception in ``error`` and does not affect the others.
+        """
+        if batch_api:
+            return self._send_batch(requests, poll_interval, timeout)
+        return run_many(self.send_request_with_json_schema, requests, concurrency)
+
+    def _batch_item(self, prompt, json_schema, system_content="You are an AI.", filename=None, schema_name="response", model=None):
+        params, key = self._prepare_json_request(prompt, json_schema, system_content, schema_name, model)
+        return params, key, prompt, filename
+
+    def _batch_plan(self, requests):
+        """Split requests into cached results and a Batch API input file for the rest."""
+        results = [None] * len(requests)
+        pending = []
+        lines = []
+        for index, request in enumerate(requests):
+            try:
+                params, key, prompt, filename = self._batch_item(**request)
             except Exception as e:
-                error_msg = f"OpenAI API error: {e}"
-                print(error_msg)
-                traceback.print_exc()
-                retries += 1
-                
-                if retries < self.max_retries:
-                    messages.append({"role": "system", "content": f"Previous request failed: {error_msg}. Please try again."})
-
-        raise Exception("Maximum retries reached without success.")
+                results[index] = BulkResult(index, error=e)
+                continue
+            if self.use_cache:
+                cached_response = self.load_from_cache(prompt, filename=filename, key=key)
+                if cached_response:
+                    results[index] = BulkResult(index, value=cached_response)
+                    continue
+            pending.append((index, prompt, filename, key))
+            lines.append(json.dumps({"custom_id": str(index), "method": "POST", "url": "/v1/chat/completions", "body": params}, ensure_ascii=False))
+        return results, pending, "\n".join(lines).encode("utf-8")
+
+    def _batch_collect(self, results, pending, batch, output, errors):
+        """Fill in results for the pending requests from the batch output and error files."""
+        replies = {}
+        for line in (output + "\n" + errors).splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                replies[entry["custom_id"]] = entry
+        for index, prompt, filename, key in pending:
+            entry = replies.get(str(index))
+            try:
+                if entry is None:
+                    raise Exception(f"Batch {batch.id} ended {batch.status} without a result for request {index}")
+                if entry.get("error"):
+                    raise Exception(f"Batch request failed: {entry['error']}")
+                response = entry["response"]
+                if response["status_code"] != 200:
+                    raise Exception(f"Batch request failed with status {response['status_code']}: {response['body']}")
+                parsed_response = self._parse_json_response(ChatCompletion.model_validate(response["body"]))
+            except Exception as e:
+                results[index] = BulkResult(index, error=e)
+                continue
+            if self.use_cache:
+                self.save_to_cache(prompt, parsed_response, filename=filename, key=key)
+            results[index] = BulkResult(index, value=parsed_response)
+        return results
+
+    def _batch_timed_out(self, results, pending, batch, timeout):
+        error = TimeoutError(f"Batch {batch.id} still {batch.status} after {timeout}s; it keeps running on the server")
+        for index, _, _, _ in pending:
+            results[index] = BulkResult(index, error=error)
+        return results
+
+    def _send_batch(self, requests, poll_interval, timeout):
+        results, pending, input_file = self._batch_plan(requests)
+        if not pending:
+            return results
+        upload = self.client.files.create(file=("requests.jsonl", input_file), purpose="batch")
+        batch = self.client.batches.create(input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h")
+        LOGGER.info("Submitted OpenAI batch %s with %d requests", batch.id, len(pending))
+        deadline = time.monotonic() + timeout if timeout else None
+        while batch.status not in BATCH_FINAL_STATUSES:
+            if deadline is not None and time.monotonic() > deadline:
+                return self._batch_timed_out(results, pending, batch, timeout)
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        output = self.client.files.content(batch.output_file_id).text if batch.output_file_id else ""
+        errors = self.client.files.content(batch.error_file_id).text if batch.error_file_id else ""
+        return self._batch_collect(results, pending, batch, output, errors)
 
     def send_request_with_retry(self, prompt, system_content="You are an AI.", sample_json=None, filename=None):
         """
@@ -409,6 +702,7 @@ class OpenAIRequestJSONBase:
             filename=filename
         )
 
+    @memoized_conversion
     def _convert_sample_to_schema(self, sample_json):
         """
         Convert a sample JSON object to a JSON schema.
@@ -418,12 +712,12 @@ class OpenAIRequestJSONBase:
         def get_type_schema(value):
             if isinstance(value, str):
                 return {"type": "string"}
+            elif isinstance(value, bool):  # bool is an int subclass, so test it first
+                return {"type": "boolean"}
             elif isinstance(value, int):
                 return {"type": "integer"}
             elif isinstance(value, float):
                 return {"type": "number"}
-            elif isinstance(value, bool):
-                return {"type": "boolean"}
             elif isinstance(value, list):
                 if len(value) > 0:
                     return {
@@ -462,4 +756,242 @@ class OpenAIRequestJSONBase:
         try:
             return json.loads(response)
         except json.JSONDecodeError:
-            raise JSONParsingError("Failed to parse JSON response", response, response)
\ No newline at end of file
+            raise JSONParsingError("Failed to parse JSON response", response, response)
+
+
+class AsyncOpenAIRequestJSONBase(OpenAIRequestJSONBase):
+    """
+    asyncio counterpart of OpenAIRequestJSONBase, built on AsyncOpenAI.
+
+    Request building, response parsing, retry feedback, the response cache and request coalescing are
+    inherited from the sync client; only network calls and audio playback are awaited. Cache lookups
+    stay synchronous because they are served from memory or a local SQLite file; semantic cache
+    lookups, which may call an embeddings API, run in the default executor.
+    """
+
+    _client_class = AsyncOpenAI
+
+    async def _coalesce(self, key, request, filename=None):
+        if not self.coalesce:
+            return await request()
+        return await self.flights.do_async(self._flight_key(key, filename), request)
+
+    async def _complete(self, params):
+        limiter = limiter_for("openai", params["model"])
+        estimated = estimate_tokens(params)
+        await limiter.acquire_async(estimated)
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(**params)
+        except RateLimitError as e:
+            limiter.record_rate_limited(e.response.headers)
+            raise
+        limiter.observe_headers(raw.headers)
+        response = raw.parse()
+        limiter.settle(estimated, response.usage.total_tokens if response.usage else None)
+        return response
+
+    async def _open_stream(self, params):
+        limiter = limiter_for("openai", params["model"])
+        estimated = estimate_tokens(params)
+        await limiter.acquire_async(estimated)
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(**self._stream_params(params))
+        except RateLimitError as e:
+            limiter.record_rate_limited(e.response.headers)
+            raise
+        limiter.observe_headers(raw.headers)
+        return limiter.settle_stream_async(raw.parse(), estimated)
+
+    async def _request_with_retries(self, params, parse, description):
+        attempt = 0
+        feedback_sent = False
+        with record_call("openai", params["model"], "chat") as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                try:
+                    LOGGER.debug("Querying OpenAI with %s (attempt %d)", description, attempt)
+                    response = await self._complete(params)
+                    # Tokens of responses that fail parsing or validation are billed too
+                    call.add_usage(response.usage)
+                    return parse(response)
+                except Exception as e:
+                    self._report_failure(e)
+                    delay = self.retry_policy.backoff(e, attempt)
+                    # Only invalid output is worth explaining to the model, and only once
+                    if self.retry_policy.wants_feedback(e) and not feedback_sent:
+                        params["messages"].append(self._retry_feedback(e))
+                        feedback_sent = True
+                await asyncio.sleep(delay)
+
+    async def send_request_with_json_schema(self, prompt, json_schema, system_content="You are an AI.", filename=None, schema_name="response", model=None):
+        """Async version of OpenAIRequestJSONBase.send_request_with_json_schema."""
+        params, key = self._prepare_json_request(prompt, json_schema, system_content, schema_name, model)
+
+        if self.use_cache:
+            cached_response = self._load_cached_call(prompt, params["model"], "chat", filename=filename, key=key)
+            if not cached_response and self.semantic_cache is not None:
+                cached_response = await asyncio.get_running_loop().run_in_executor(
+                    None, self._load_semantic_match, prompt, params, "chat", filename
+                )
+            if cached_response:
+                LOGGER.debug("OpenAI cache found")
+                return cached_response
+
+        async def request():
+            parsed_response = await self._request_with_retries(params, self._parse_json_response, "structured outputs")
+            if self.use_cache:
+                self.save_to_cache(prompt, parsed_response, filename=filename, key=key)
+                if self.semantic_cache is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, self._remember_semantic, prompt, params, key, filename
+                    )
+            return parsed_response
+
+        return await self._coalesce(key, request, filename=filename)
+
+    async def send_simple_request(self, prompt, system_content="You are a helpful AI assistant.", model=None):
+        """Async version of OpenAIRequestJSONBase.send_simple_request."""
+        params, key, legacy_prompt = self._prepare_simple_request(prompt, system_content, model)
+
+        if self.use_cache:
+            cached_response = self._load_cached_call(legacy_prompt, params["model"], "chat", key=key)
+            if not cached_response and self.semantic_cache is not None:
+                cached_response = await asyncio.get_running_loop().run_in_executor(
+                    None, self._load_semantic_match, prompt, params, "chat"
+                )
+            if cached_response:
+                LOGGER.debug("OpenAI simple request cache found")
+                return cached_response
+
+        async def request():
+            response_text = await self._request_with_retries(params, self._parse_text_response, "simple request")
+            if self.use_cache:
+                self.save_to_cache(legacy_prompt, response_text, key=key)
+                if self.semantic_cache is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, self._remember_semantic, prompt, params, key)
+            return response_text
+
+        return await self._coalesce(key, request)
+
+    async def stream_simple_request(self, prompt, system_content="You are a helpful AI assistant.", model=None):
+        """Async-iterator version of OpenAIRequestJSONBase.stream_simple_request."""
+        params, key, legacy_prompt = self._prepare_simple_request(prompt, system_content, model)
+
+        if self.use_cache:
+            cached_response = self._load_cached_call(legacy_prompt, params["model"], "stream", key=key)
+            if cached_response:
+                LOGGER.debug("OpenAI simple request cache found")
+                yield cached_response
+                return
+
+        attempt = 0
+        with record_call("openai", params["model"], "stream") as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                timer, parts, tokens = StreamTimer(), [], None
+                try:
+                    LOGGER.debug("Streaming OpenAI simple request (attempt %d)", attempt)
+                    async for chunk in await self._open_stream(params):
+                        call.add_usage(getattr(chunk, "usage", None))
+                        text, usage_tokens = self._stream_delta(chunk)
+                        tokens = usage_tokens or tokens
+                        if text:
+                            timer.mark_token()
+                            parts.append(text)
+                            yield text
+                    break
+                except Exception as e:
+                    if parts:
+                        raise
+                    self._report_failure(e)
+                    delay = self.retry_policy.backoff(e, attempt)
+                await asyncio.sleep(delay)
+
+        self._finish_stream(params, key, legacy_prompt, timer, parts, tokens)
+
+    async def send_many(self, requests, concurrency=DEFAULT_CONCURRENCY, batch_api=False, poll_interval=30, timeout=None):
+        """Async version of OpenAIRequestJSONBase.send_many."""
+        if batch_api:
+            return await self._send_batch(requests, poll_interval, timeout)
+        return await run_many_async(self.send_request_with_json_schema, requests, concurrency)
+
+    async def _send_batch(self, requests, poll_interval, timeout):
+        results, pending, input_file = self._batch_plan(requests)
+        if not pending:
+            return results
+        upload = await self.client.files.create(file=("requests.jsonl", input_file), purpose="batch")
+        batch = await self.client.batches.create(input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h")
+        LOGGER.info("Submitted OpenAI batch %s with %d requests", batch.id, len(pending))
+        deadline = time.monotonic() + timeout if timeout else None
+        while batch.status not in BATCH_FINAL_STATUSES:
+            if deadline is not None and time.monotonic() > deadline:
+                return self._batch_timed_out(results, pending, batch, timeout)
+            await asyncio.sleep(poll_interval)
+            batch = await self.client.batches.retrieve(batch.id)
+        output = (await self.client.files.content(batch.output_file_id)).text if batch.output_file_id else ""
+        errors = (await self.client.files.content(batch.error_file_id)).text if batch.error_file_id else ""
+        return self._batch_collect(results, pending, batch, output, errors)
+
+    async def text_to_speech(self, text, voice="coral", model="tts-1", instructions="", response_format="mp3", play_audio=True):
+        """Async version of OpenAIRequestJSONBase.text_to_speech."""
+        if self.use_cache:
+            started = time.perf_counter()
+            audio_cache_path = self.get_audio_cache_file_path(text, voice, model, instructions)
+            cached_audio = self.load_audio_from_cache(audio_cache_path)
+            if cached_audio:
+                LOGGER.debug("TTS cache found")
+                record_cache_hit("openai", model, "tts", "file", started)
+                if play_audio:
+                    await self.play_audio(cached_audio)
+                return cached_audio
+
+        attempt = 0
+        with record_call("openai", model, "tts", characters=len(text)) as call:
+            while True:
+                attempt += 1
+                call.attempt()
+                try:
+                    LOGGER.debug("Generating speech with OpenAI TTS (attempt %d)", attempt)
+                    tts_params = self._tts_params(text, voice, model, instructions, response_format)
+                    response = await self.client.audio.speech.create(**tts_params)
+                    audio_path = self._store_speech(response.content, text, voice, model, instructions, response_format)
+                    call.finish()
+                    if play_audio:
+                        await self.play_audio(audio_path)
+                    return audio_path
+                except Exception as e:
+                    LOGGER.warning("TTS API error: %s", e, exc_info=True)
+                    delay = self.retry_policy.backoff(e, attempt)
+                await asyncio.sleep(delay)
+
+    async def text_to_speech_stream(self, text, voice="coral", model="tts-1", instructions="", response_format="mp3", play_audio=True):
+        """Async version of OpenAIRequestJSONBase.text_to_speech_stream."""
+        call = record_call("openai", model, "tts_stream", characters=len(text))
+        try:
+            LOGGER.debug("Generating speech with OpenAI TTS (streaming)")
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{response_format}")
+            temp_file.close()
+            tts_params = self._tts_params(text, voice, model, instructions, response_format)
+            call.attempt()
+            async with self.client.audio.speech.with_streaming_response.create(**tts_params) as response:
+                await response.stream_to_file(temp_file.name)
+            call.finish()
+            if play_audio:
+                await self.play_audio(temp_file.name)
+            return temp_file.name
+        except Exception as e:
+            call.finish(e)
+            LOGGER.warning("TTS streaming API error: %s", e, exc_info=True)
+            raise Exception(f"TTS streaming failed: {e}")
+
+    async def play_audio(self, audio_path):
+        """Play an audio file, yielding to the event loop while it plays."""
+        try:
+            if not self._start_playback(audio_path):
+                return
+            while pygame.mixer.music.get_busy():
+                await asyncio.sleep(0.1)
+        except Exception as e:
+            LOGGER.warning("Error playing audio: %s", e)
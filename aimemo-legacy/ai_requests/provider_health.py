@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Circuit breakers and rolling health windows for AI providers."""
+
+from __future__ import annotations
+
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def _p90(ordered: List[float]) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+
+
+class CircuitBreaker:
+    """Stops sending traffic to a provider that keeps failing.
+
+    Closed: calls flow. After ``failure_threshold`` consecutive failures, or
+    an error rate of ``error_rate_threshold`` over at least ``min_calls`` calls
+    in the window, the breaker opens and calls are refused. After
+    ``reset_timeout`` seconds it lets a single probe through (half-open): a
+    success closes it again, a failure re-opens it for another timeout.
+    Not thread-safe on its own; ``ProviderHealth`` serialises access.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        error_rate_threshold: float = 0.5,
+        min_calls: int = 10,
+        reset_timeout: float = 30.0,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.opened_at is not None and now - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def on_success(self) -> None:
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Give up a half-open probe that ended without an outcome, so the next call can probe."""
+        self._probe_in_flight = False
+
+    def on_failure(self, now: float, calls: int, error_rate: float) -> None:
+        self.consecutive_failures += 1
+        tripped = self.consecutive_failures >= self.failure_threshold or (
+            calls >= self.min_calls and error_rate >= self.error_rate_threshold
+        )
+        if self.state == HALF_OPEN or (self.state == CLOSED and tripped):
+            self.state = OPEN
+            self.opened_at = now
+            self.times_opened += 1
+        self._probe_in_flight = False
+
+
+class ProviderHealth:
+    """Rolling latency and error rate of one provider plus its circuit breaker.
+
+    The window keeps outcomes from the last ``window_seconds`` (at most
+    ``max_samples``), so both the error rate and the latency percentiles
+    describe current behaviour.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        max_samples: int = 200,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self._samples: Deque[Tuple[float, Optional[float], bool]] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        while self._samples and now - self._samples[0][0] > self.window_seconds:
+            self._samples.popleft()
+
+    def _error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, _, ok in self._samples if not ok) / len(self._samples)
+
+    def allow(self) -> bool:
+        with self._lock:
+            return self.breaker.allow(time.monotonic())
+
+    def record(self, ok: bool, latency: Optional[float] = None) -> None:
+        """Add one outcome; ``latency`` is left out for answers that say nothing about speed."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._samples.append((now, latency, ok))
+            if ok:
+                self.breaker.on_success()
+            else:
+                self.breaker.on_failure(now, len(self._samples), self._error_rate())
+
+    def release(self) -> None:
+        """Forget a call that was abandoned before it succeeded or failed."""
+        with self._lock:
+            self.breaker.release()
+
+    def _latencies(self) -> List[float]:
+        return sorted(latency for _, latency, ok in self._samples if ok and latency is not None)
+
+    def latency_p50(self) -> Optional[float]:
+        with self._lock:
+            self._trim(time.monotonic())
+            latencies = self._latencies()
+        return statistics.median(latencies) if latencies else None
+
+    def latency_p90(self, min_samples: int = 1) -> Optional[float]:
+        """90th percentile of recent successful calls, or None with fewer than ``min_samples``."""
+        with self._lock:
+            self._trim(time.monotonic())
+            latencies = self._latencies()
+        return _p90(latencies) if latencies and len(latencies) >= min_samples else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            latencies = self._latencies()
+            p90 = _p90(latencies) if latencies else None
+            return {
+                'state': self.breaker.state,
+                'times_opened': self.breaker.times_opened,
+                'consecutive_failures': self.breaker.consecutive_failures,
+                'calls': len(self._samples),
+                'error_rate': round(self._error_rate(), 3),
+                'latency_ms_p50': round(statistics.median(latencies) * 1000, 1) if latencies else None,
+                'latency_ms_p90': round(p90 * 1000, 1) if p90 is not None else None,
+            }
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Client-side request and token rate limiting per provider and model."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# Starting budgets; replaced by the provider's own limits once x-ratelimit-* headers are seen.
+DEFAULT_RPM = float(os.environ.get("AI_RATE_LIMIT_RPM", "500"))
+DEFAULT_TPM = float(os.environ.get("AI_RATE_LIMIT_TPM", "200000"))
+# Output budget assumed for requests that do not set max_tokens.
+DEFAULT_MAX_OUTPUT_TOKENS = 1024
+CHARS_PER_TOKEN = 4
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+_limiters: Dict[Tuple[str, str], "RateLimiter"] = {}
+_registry_lock = threading.Lock()
+
+
+def estimate_tokens(params: Mapping[str, Any]) -> int:
+    """Rough token cost of a chat completion: prompt characters / 4 plus the output budget."""
+    chars = sum(len(str(message.get("content") or "")) for message in params.get("messages", ()))
+    if params.get("response_format"):
+        chars += len(json.dumps(params["response_format"]))
+    output = params.get("max_tokens") or params.get("max_completion_tokens") or DEFAULT_MAX_OUTPUT_TOKENS
+    return chars // CHARS_PER_TOKEN + output
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Parse an x-ratelimit-reset-* duration such as ``"1s"``, ``"6m0s"`` or ``"20ms"``."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Continuously refilling bucket of ``per_minute`` units that may go into debt.
+
+    ``reserve`` always succeeds and returns how long the caller must wait
+    for its share to be refilled, so waiters are served in arrival order
+    without polling.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.per_minute = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.per_minute, self.level + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        self.level -= amount
+        return max(0.0, -self.level * 60 / self.per_minute)
+
+    def adjust(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.per_minute, self.level + amount)
+
+    def observe(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float], now: float) -> None:
+        """Align with the provider's view of this budget."""
+        self._refill(now)
+        if limit:
+            self.per_minute = limit
+        if remaining is not None:
+            self.level = min(self.level, remaining)
+            if remaining <= 0 and reset:
+                # Empty until the provider's reset time.
+                self.level = min(self.level, -reset * self.per_minute / 60)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget for one provider and model.
+
+    Callers reserve one request and an estimated token count before each
+    call and sleep for any deficit, so bursts queue locally instead of
+    drawing 429s. Response headers keep the budgets in step with the
+    provider, and ``settle`` corrects estimates with actual usage.
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.rate_limited = 0
+
+    def _reserve(self, tokens: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            delay = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now))
+            self.calls += 1
+            if delay > 0:
+                self.throttled += 1
+                self.wait_seconds += delay
+                self.max_wait_seconds = max(self.max_wait_seconds, delay)
+        return delay
+
+    def acquire(self, tokens: int) -> float:
+        """Block until the request fits the budget; returns the seconds waited."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            LOGGER.debug("Rate limiter: waiting %.2fs for capacity", delay)
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens: int) -> float:
+        """Async version of ``acquire``."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            LOGGER.debug("Rate limiter: waiting %.2fs for capacity", delay)
+            await asyncio.sleep(delay)
+        return delay
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Return (or charge) the difference between the estimated and the reported token usage."""
+        if actual is None:
+            return
+        with self._lock:
+            self.tokens.adjust(estimated - actual, time.monotonic())
+
+    def settle_stream(self, chunks: Iterable[Any], estimated: int) -> Iterator[Any]:
+        """Yield streamed ``chunks`` and ``settle`` with the usage carried by the final one.
+
+        Needs ``stream_options={"include_usage": True}``; a stream cut short keeps the estimate.
+        """
+        for chunk in chunks:
+            usage = getattr(chunk, "usage", None)
+            if usage is not None:
+                self.settle(estimated, usage.total_tokens)
+            yield chunk
+
+    async def settle_stream_async(self, chunks: AsyncIterable[Any], estimated: int) -> AsyncIterator[Any]:
+        """Async version of ``settle_stream``."""
+        async for chunk in chunks:
+            usage = getattr(chunk, "usage", None)
+            if usage is not None:
+                self.settle(estimated, usage.total_tokens)
+            yield chunk
+
+    def observe_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Adopt the limits and remaining budget reported in x-ratelimit-* headers."""
+        if not headers:
+            return
+
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(headers[name])
+            except (KeyError, TypeError, ValueError):
+                return None
+
+        now = time.monotonic()
+        with self._lock:
+            self.requests.observe(
+                number("x-ratelimit-limit-requests"),
+                number("x-ratelimit-remaining-requests"),
+                parse_reset(headers.get("x-ratelimit-reset-requests")),
+                now,
+            )
+            self.tokens.observe(
+                number("x-ratelimit-limit-tokens"),
+                number("x-ratelimit-remaining-tokens"),
+                parse_reset(headers.get("x-ratelimit-reset-tokens")),
+                now,
+            )
+
+    def record_rate_limited(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Account for a 429 and drain the budget so concurrent callers back off too."""
+        with self._lock:
+            self.rate_limited += 1
+            now = time.monotonic()
+            self.requests.observe(None, 0, parse_reset((headers or {}).get("x-ratelimit-reset-requests")), now)
+        self.observe_headers(headers)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rpm": self.requests.per_minute,
+                "tpm": self.tokens.per_minute,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "rate_limited": self.rate_limited,
+                "wait_seconds_total": round(self.wait_seconds, 3),
+                "wait_seconds_max": round(self.max_wait_seconds, 3),
+            }
+
+
+def limiter_for(provider: str, model: str) -> RateLimiter:
+    """The process-wide ``RateLimiter`` for ``provider``/``model``."""
+    with _registry_lock:
+        limiter = _limiters.get((provider, model))
+        if limiter is None:
+            limiter = _limiters[(provider, model)] = RateLimiter()
+        return limiter
+
+
+def rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """Budgets and wait metrics of every limiter created in this process."""
+    with _registry_lock:
+        limiters = dict(_limiters)
+    return {f"{provider}/{model}": limiter.stats() for (provider, model), limiter in limiters.items()}
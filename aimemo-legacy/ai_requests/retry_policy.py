@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Retry policy shared by the AI request clients."""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import random
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple, Type
+
+import openai
+
+# Statuses worth retrying: timeouts, conflicts, rate limits and server errors.
+RETRYABLE_STATUSES = frozenset({408, 409, 429})
+# 429s that no amount of waiting will fix.
+FATAL_ERROR_CODES = frozenset({"insufficient_quota"})
+# Rejections of one particular request; the provider itself answered and is up.
+REQUEST_ERROR_STATUSES = frozenset({400, 404, 422})
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by the server via ``retry-after-ms`` or ``Retry-After``, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return (when - dt.datetime.now(when.tzinfo or dt.timezone.utc)).total_seconds()
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """When to retry a failed model call and how long to wait first.
+
+    Waits grow exponentially from ``base_delay`` up to ``max_delay`` with
+    full jitter, so concurrent callers that failed together do not retry
+    together. A server ``Retry-After`` of up to ``max_retry_after`` seconds
+    is honoured instead. Client errors (400, 401, 403, 404, 422, exhausted
+    quota) fail immediately. ``feedback_errors`` are failures of the model's
+    output rather than of the call; only those justify telling the model
+    what went wrong.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    max_retry_after: float = 60.0
+    feedback_errors: Tuple[Type[BaseException], ...] = (json.JSONDecodeError,)
+
+    def is_retryable(self, error: BaseException) -> bool:
+        if isinstance(error, openai.APIStatusError):
+            if getattr(error, "code", None) in FATAL_ERROR_CODES:
+                return False
+            return error.status_code in RETRYABLE_STATUSES or error.status_code >= 500
+        # Connection errors, timeouts, malformed output and provider quirks such as empty content.
+        return isinstance(error, Exception)
+
+    def is_request_error(self, error: BaseException) -> bool:
+        """Whether the provider rejected this request, as opposed to failing or refusing every request."""
+        return isinstance(error, openai.APIStatusError) and error.status_code in REQUEST_ERROR_STATUSES
+
+    def wants_feedback(self, error: BaseException) -> bool:
+        return isinstance(error, self.feedback_errors)
+
+    def delay(self, error: BaseException, attempt: int) -> float:
+        """Seconds to wait after failed attempt number ``attempt`` (1-based)."""
+        requested = retry_after_seconds(error)
+        if requested is not None and 0 <= requested <= self.max_retry_after:
+            return requested
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def backoff(self, error: BaseException, attempt: int) -> float:
+        """Delay before the next attempt; raises when ``error`` must not or can no longer be retried."""
+        if not self.is_retryable(error):
+            raise error
+        if attempt >= self.max_attempts:
+            raise Exception("Maximum retries reached without success.") from error
+        return self.delay(error, attempt)
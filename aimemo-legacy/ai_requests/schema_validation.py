@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""Compiled JSON-schema validators and memoized schema conversions.
+
+Schemas are compiled once into a tree of small checks and cached by the
+hash of their canonical JSON, so validating a response costs a walk over
+the response only. The compiler covers the keywords the request clients
+generate and structured outputs accept (types, enum/const, properties,
+required, additionalProperties, items, length and range bounds, pattern,
+anyOf/oneOf/allOf and local ``$ref``); other keywords are ignored.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# Distinct schemas kept compiled / memoized; a process only ever sees a handful.
+SCHEMA_CACHE_SIZE = 256
+# Errors quoted back to the model; the first few are enough to fix a response.
+MAX_REPORTED_ERRORS = 10
+
+Check = Callable[[Any, str, List[str]], None]
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: (
+        isinstance(value, int) and not isinstance(value, bool)
+        or isinstance(value, float) and value.is_integer()
+    ),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def schema_hash(schema: Any) -> str:
+    """Stable identity of a schema, independent of key order."""
+    return hashlib.sha256(canonical_json(schema).encode("utf-8")).hexdigest()
+
+
+class CompiledSchema:
+    """A JSON schema compiled into nested check functions."""
+
+    def __init__(self, schema: Any) -> None:
+        self.schema = schema
+        self._root = schema
+        self._refs: Dict[str, Check] = {}
+        self._check = self._compile(schema)
+
+    def errors(self, instance: Any) -> List[str]:
+        """Every violation in ``instance``, each prefixed with its JSON path."""
+        errors: List[str] = []
+        self._check(instance, "$", errors)
+        return errors
+
+    def describe(self, errors: List[str]) -> str:
+        shown = "; ".join(errors[:MAX_REPORTED_ERRORS])
+        more = len(errors) - MAX_REPORTED_ERRORS
+        return f"{shown}; and {more} more" if more > 0 else shown
+
+    def _resolve(self, ref: str) -> Check:
+        if ref not in self._refs:
+            if not ref.startswith("#"):
+                raise ValueError(f"Only local $ref is supported, got {ref!r}")
+            # Bind a forwarder first so recursive definitions terminate.
+            target: List[Check] = []
+            self._refs[ref] = lambda value, path, errors: target[0](value, path, errors)
+            node = self._root
+            for part in filter(None, ref[1:].split("/")):
+                node = node[part.replace("~1", "/").replace("~0", "~")]
+            target.append(self._compile(node))
+        return self._refs[ref]
+
+    def _compile(self, schema: Any) -> Check:
+        if schema is True or schema == {}:
+            return lambda value, path, errors: None
+        if schema is False:
+            return lambda value, path, errors: errors.append(f"{path}: no value is allowed here")
+        if "$ref" in schema:
+            return self._resolve(schema["$ref"])
+
+        checks: List[Check] = []
+        types = schema.get("type")
+        if types is not None:
+            names = [types] if isinstance(types, str) else list(types)
+            predicates = [_TYPE_CHECKS[name] for name in names if name in _TYPE_CHECKS]
+            expected = " or ".join(names)
+        else:
+            predicates = []
+
+        if "enum" in schema:
+            options = schema["enum"]
+            checks.append(lambda value, path, errors: None if any(
+                _json_equal(value, option) for option in options
+            ) else errors.append(f"{path}: {value!r} is not one of {options!r}"))
+        if "const" in schema:
+            const = schema["const"]
+            checks.append(lambda value, path, errors: None if _json_equal(value, const) else errors.append(
+                f"{path}: expected {const!r}"
+            ))
+        checks.extend(self._object_checks(schema))
+        checks.extend(self._array_checks(schema))
+        checks.extend(_scalar_checks(schema))
+        checks.extend(self._combinator_checks(schema))
+
+        def check(value: Any, path: str, errors: List[str]) -> None:
+            if predicates and not any(predicate(value) for predicate in predicates):
+                errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+                return
+            for keyword_check in checks:
+                keyword_check(value, path, errors)
+
+        return check
+
+    def _object_checks(self, schema: Dict[str, Any]) -> List[Check]:
+        properties = {name: self._compile(sub) for name, sub in schema.get("properties", {}).items()}
+        required = list(schema.get("required", ()))
+        additional = schema.get("additionalProperties", True)
+        extra = None if additional is True else self._compile(additional)
+        if not properties and not required and extra is None:
+            return []
+
+        def check(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing required property {name!r}")
+            for name, item in value.items():
+                property_check = properties.get(name)
+                if property_check is not None:
+                    property_check(item, f"{path}.{name}", errors)
+                elif additional is False:
+                    errors.append(f"{path}: unexpected property {name!r}")
+                elif extra is not None:
+                    extra(item, f"{path}.{name}", errors)
+
+        return [check]
+
+    def _array_checks(self, schema: Dict[str, Any]) -> List[Check]:
+        items = schema.get("items")
+        item_check = self._compile(items) if isinstance(items, (dict, bool)) else None
+        min_items, max_items = schema.get("minItems"), schema.get("maxItems")
+        if item_check is None and min_items is None and max_items is None:
+            return []
+
+        def check(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: expected at least {min_items} items, got {len(value)}")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: expected at most {max_items} items, got {len(value)}")
+            if item_check is not None:
+                for index, item in enumerate(value):
+                    item_check(item, f"{path}[{index}]", errors)
+
+        return [check]
+
+    def _combinator_checks(self, schema: Dict[str, Any]) -> List[Check]:
+        checks: List[Check] = []
+        for keyword in ("anyOf", "oneOf"):
+            if keyword not in schema:
+                continue
+            options = [self._compile(sub) for sub in schema[keyword]]
+            exactly_one = keyword == "oneOf"
+
+            def check(value: Any, path: str, errors: List[str], options=options, exactly_one=exactly_one) -> None:
+                matches = sum(1 for option in options if not _collect(option, value, path))
+                if matches == 0 or (exactly_one and matches > 1):
+                    wanted = "exactly one" if exactly_one else "at least one"
+                    errors.append(f"{path}: value must match {wanted} of {len(options)} alternatives")
+
+            checks.append(check)
+        checks.extend(self._compile(sub) for sub in schema.get("allOf", ()))
+        return checks
+
+
+def _json_equal(left: Any, right: Any) -> bool:
+    """Equality as JSON schema defines it: like ``==``, but booleans never equal numbers, at any depth."""
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(_json_equal(left[key], right[key]) for key in left)
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(map(_json_equal, left, right))
+    return left == right
+
+
+def _collect(check: Check, value: Any, path: str) -> List[str]:
+    errors: List[str] = []
+    check(value, path, errors)
+    return errors
+
+
+def _scalar_checks(schema: Dict[str, Any]) -> List[Check]:
+    checks: List[Check] = []
+    min_length, max_length = schema.get("minLength"), schema.get("maxLength")
+    pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+    if min_length is not None or max_length is not None or pattern is not None:
+        def check_string(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{path}: shorter than {min_length} characters")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{path}: longer than {max_length} characters")
+            if pattern is not None and not pattern.search(value):
+                errors.append(f"{path}: does not match {pattern.pattern!r}")
+
+        checks.append(check_string)
+
+    bounds = [
+        (schema.get("minimum"), lambda value, bound: value >= bound, "at least"),
+        (schema.get("maximum"), lambda value, bound: value <= bound, "at most"),
+        (schema.get("exclusiveMinimum"), lambda value, bound: value > bound, "greater than"),
+        (schema.get("exclusiveMaximum"), lambda value, bound: value < bound, "less than"),
+    ]
+    bounds = [bound for bound in bounds if isinstance(bound[0], (int, float))]
+    if bounds:
+        def check_number(value: Any, path: str, errors: List[str]) -> None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return
+            for bound, holds, wording in bounds:
+                if not holds(value, bound):
+                    errors.append(f"{path}: {value} is not {wording} {bound}")
+
+        checks.append(check_number)
+    return checks
+
+
+_compiled: "OrderedDict[str, CompiledSchema]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compiled_schema(schema: Any) -> CompiledSchema:
+    """The compiled validator for ``schema``, compiled on first use and shared afterwards."""
+    digest = schema_hash(schema)
+    with _compiled_lock:
+        compiled = _compiled.get(digest)
+        if compiled is not None:
+            _compiled.move_to_end(digest)
+            return compiled
+    compiled = CompiledSchema(schema)
+    with _compiled_lock:
+        _compiled[digest] = compiled
+        while len(_compiled) > SCHEMA_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def memoized_conversion(method: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    """Memoize a pure JSON-to-JSON method on the canonical JSON of its argument.
+
+    Strings are returned as stored; other results are kept as JSON text and
+    decoded per call, so callers get a private copy they may mutate.
+    """
+    memo: "OrderedDict[str, tuple]" = OrderedDict()
+    lock = threading.Lock()
+
+    @functools.wraps(method)
+    def wrapper(self: Any, value: Any) -> Any:
+        key = canonical_json(value)
+        with lock:
+            entry = memo.get(key)
+            if entry is not None:
+                memo.move_to_end(key)
+        if entry is None:
+            result = method(self, value)
+            entry = (True, result) if isinstance(result, str) else (False, json.dumps(result))
+            with lock:
+                memo[key] = entry
+                while len(memo) > SCHEMA_CACHE_SIZE:
+                    memo.popitem(last=False)
+        is_text, stored = entry
+        return stored if is_text else json.loads(stored)
+
+    return wrapper
+
+
+def _nested_schema(depth: int, width: int) -> Dict[str, Any]:
+    if depth == 0:
+        return {"type": "object", "properties": {
+            "name": {"type": "string", "minLength": 1},
+            "score": {"type": "number", "minimum": 0},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "kind": {"enum": ["a", "b", "c"]},
+        }, "required": ["name", "score", "tags", "kind"], "additionalProperties": False}
+    child = _nested_schema(depth - 1, width)
+    properties: Dict[str, Any] = {f"field_{index}": child for index in range(width)}
+    properties["items"] = {"type": "array", "items": child}
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+def _instance_for(schema: Dict[str, Any], list_length: int) -> Any:
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema["type"]
+    if kind == "object":
+        return {name: _instance_for(sub, list_length) for name, sub in schema["properties"].items()}
+    if kind == "array":
+        return [_instance_for(schema["items"], list_length) for _ in range(list_length)]
+    return {"string": "text", "number": 1.5}[kind]
+
+
+def benchmark(depth: int = 4, width: int = 3, list_length: int = 3, rounds: int = 50) -> Dict[str, Optional[float]]:
+    """Milliseconds to compile and to validate a large nested schema, plus jsonschema for comparison."""
+    import time
+
+    schema = _nested_schema(depth, width)
+    instance = _instance_for(schema, list_length)
+    started = time.perf_counter()
+    compiled = CompiledSchema(schema)
+    compile_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        assert not compiled.errors(instance)
+    validate_ms = (time.perf_counter() - started) * 1000 / rounds
+    started = time.perf_counter()
+    for _ in range(rounds):
+        compiled_schema(schema)
+    lookup_ms = (time.perf_counter() - started) * 1000 / rounds
+
+    reference_ms = None
+    try:
+        import jsonschema
+    except ImportError:
+        pass
+    else:
+        validator = jsonschema.validators.validator_for(schema)(schema)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            validator.validate(instance)
+        reference_ms = (time.perf_counter() - started) * 1000 / rounds
+    return {
+        "schema_bytes": len(canonical_json(schema)),
+        "instance_bytes": len(canonical_json(instance)),
+        "compile_ms": round(compile_ms, 3),
+        "cached_lookup_ms": round(lookup_ms, 3),
+        "validate_ms": round(validate_ms, 3),
+        "jsonschema_validate_ms": round(reference_ms, 3) if reference_ms is not None else None,
+    }
+
+
+if __name__ == "__main__":
+    for depth, width in ((2, 3), (3, 4), (4, 4)):
+        print(f"depth={depth} width={width}: {benchmark(depth, width)}")
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""Embedding-based lookup of cached responses for paraphrased prompts.
+
+The exact-match response cache misses "summarize today's chat" after
+"give me today's summary". ``SemanticCache`` embeds each answered prompt
+and maps the vector to the response cache key it was stored under. A new
+prompt whose embedding is at least ``threshold`` cosine-similar to one in
+the same scope reuses that response. The scope covers provider, model,
+system prompt and response format. Responses stay in the response cache,
+so its TTL and eviction apply; a match whose response was evicted is a
+miss.
+
+Search is brute force over a NumPy matrix. With ``ivf_lists`` set, an
+inverted-file index (k-means partitions, ``nprobe`` of them searched)
+takes over once there are enough vectors. Vectors are appended to a flat
+float32 file that is memory-mapped on open, so a large index costs page
+cache instead of heap. Processes sharing a directory append under a file
+lock and pick up each other's rows before searching.
+
+Requires NumPy. The embedder defaults to ``OpenAIEmbedder``: the threshold
+is only meaningful for a model trained on meaning. ``HashingEmbedder``
+rates a prompt and its negation as near-duplicates and is for tests only.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+from echomind.ai_cache import cache_key
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = float(os.environ.get("AI_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# k-means wants a few dozen points per partition before an IVF beats brute force.
+IVF_MIN_POINTS_PER_LIST = 39
+IVF_TRAINING_SAMPLE_PER_LIST = 256
+# Embeddings of recent prompts, so a miss followed by add() embeds once.
+EMBEDDING_MEMO_SIZE = 256
+
+Embedder = Callable[[Sequence[str]], np.ndarray]
+
+_registry: Dict[str, "SemanticCache"] = {}
+_registry_lock = threading.Lock()
+
+
+def normalize_prompt(text: str) -> str:
+    """Case-, width- and whitespace-insensitive form of a prompt, without trailing punctuation."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return re.sub(r"\s+", " ", text).strip().strip(".!?。！？ ")
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+class HashingEmbedder:
+    """Deterministic embedding from hashed word and character-trigram features, for tests.
+
+    Needs no model or network and gives the same vector in every process.
+    Prompts sharing most of their words score high whatever they mean, so
+    "I will attend" finds "I will not attend"; serving cached answers with
+    it returns wrong ones. Character trigrams also cover text without
+    spaces, e.g. Japanese.
+    """
+
+    def __init__(self, dim: int = 512) -> None:
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = [("w:" + word, 1.0) for word in text.split()]
+            padded = f" {text} "
+            features += [("c:" + padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+            for feature, weight in features:
+                digest = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, digest % self.dim] += weight if digest & 0x80000000 else -weight
+        return _normalized(vectors)
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI embeddings endpoint; one request per call."""
+
+    def __init__(self, client: Any = None, model: str = "text-embedding-3-small") -> None:
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI()
+        self.client = client
+        self.model = model
+        self.name = f"openai-{model}"
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        response = self.client.embeddings.create(model=self.model, input=list(texts))
+        return _normalized(np.array([item.embedding for item in response.data], dtype=np.float32))
+
+
+def semantic_scope(provider: str, params: Mapping[str, Any]) -> int:
+    """64-bit id of everything but the user prompt: provider, model, response format, system prompt.
+
+    Only messages before the first user message count, so retry feedback
+    appended later does not change the scope.
+    """
+    leading: List[Any] = []
+    for message in params.get("messages", ()):
+        if message.get("role") == "user":
+            break
+        leading.append(message)
+    rest = {name: value for name, value in params.items() if name != "messages"}
+    return int(cache_key(provider=provider, semantic_scope=leading, **rest)[:16], 16)
+
+
+class _InvertedFile:
+    """k-means partitions of the index; a query only scans its ``nprobe`` nearest partitions."""
+
+    def __init__(self, vectors: np.ndarray, lists: int, iterations: int = 10) -> None:
+        rng = np.random.default_rng(0)
+        sample_size = min(len(vectors), lists * IVF_TRAINING_SAMPLE_PER_LIST)
+        sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+        centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for index in range(lists):
+                members = sample[assignment == index]
+                if len(members):
+                    centroids[index] = members.mean(axis=0)
+            centroids = _normalized(centroids)
+        self.centroids = centroids
+        self.trained_on = len(vectors)
+        self.assignment = np.concatenate([
+            np.argmax(np.asarray(vectors[start:start + 8192]) @ centroids.T, axis=1)
+            for start in range(0, len(vectors), 8192)
+        ]).astype(np.int32)
+
+    def add(self, vector: np.ndarray) -> None:
+        self.assignment = np.append(self.assignment, np.int32(np.argmax(self.centroids @ vector)))
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nearest = np.argsort(self.centroids @ query)[-nprobe:]
+        return np.flatnonzero(np.isin(self.assignment, nearest))
+
+
+class SemanticCache:
+    """Vector index from prompts to response cache keys, scoped per request shape.
+
+    ``directory`` holds ``vectors.f32`` (appended rows, memory-mapped),
+    ``entries.jsonl`` (cache key and scope per row) and ``index.json`` (dim
+    and embedder); without it the index lives in memory only. Switching to
+    an embedder of another name or dimension starts a fresh index. Without
+    ``fcntl`` (Windows) only one process may write to a directory.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        embedder: Optional[Embedder] = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        ivf_lists: int = 0,
+        nprobe: int = 8,
+    ) -> None:
+        self.directory = Path(directory) if directory else None
+        self.embedder = embedder if embedder is not None else OpenAIEmbedder()
+        self.embedder_name = getattr(self.embedder, "name", type(self.embedder).__name__)
+        self.threshold = threshold
+        self.ivf_lists = ivf_lists
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._memo: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._keys: List[str] = []
+        self._scopes = np.zeros(0, dtype=np.uint64)
+        self._matrix: Optional[np.ndarray] = None
+        self._buffer: Optional[np.ndarray] = None
+        self._ivf: Optional[_InvertedFile] = None
+        # Bytes of entries.jsonl read so far, and the row width they were written with.
+        self._entries_read = 0
+        self._dim: Optional[int] = None
+        self.lookups = 0
+        self.hits = 0
+        if self.directory is not None:
+            self._open()
+
+    def _paths(self) -> Tuple[Path, Path, Path]:
+        assert self.directory is not None
+        return self.directory / "vectors.f32", self.directory / "entries.jsonl", self.directory / "index.json"
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive lock on the directory across processes, held while appending."""
+        assert self.directory is not None
+        if fcntl is None:
+            yield
+            return
+        with open(self.directory / "lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _open(self) -> None:
+        vectors_path, entries_path, info_path = self._paths()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._file_lock():
+            info = json.loads(info_path.read_text()) if info_path.exists() else None
+            if info is not None and info.get("embedder") != self.embedder_name:
+                LOGGER.warning("Semantic cache %s was built with %s; starting a new index", self.directory, info)
+                info = None
+            if info is None:
+                for path in (vectors_path, entries_path, info_path):
+                    path.unlink(missing_ok=True)
+                return
+            self._dim = info["dim"]
+            self._refresh()
+
+    def _refresh(self) -> None:
+        """Take in rows appended since the last read, by this or any other process.
+
+        Each process keeps its own key list, so this must run before mapping
+        or appending, or rows and keys drift apart. Rows are written before
+        their entries; only complete entry lines whose row exists are taken.
+        """
+        if self.directory is None:
+            return
+        vectors_path, entries_path, info_path = self._paths()
+        if self._dim is None:
+            # Another process may have started the index since this one opened it.
+            if not info_path.exists():
+                return
+            self._dim = json.loads(info_path.read_text())["dim"]
+        try:
+            size = entries_path.stat().st_size
+            rows = vectors_path.stat().st_size // (4 * self._dim)
+        except FileNotFoundError:
+            return
+        if size <= self._entries_read:
+            return
+        with open(entries_path, "rb") as handle:
+            handle.seek(self._entries_read)
+            data = handle.read(size - self._entries_read)
+        keys, scopes = [], []
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n") or len(self._keys) + len(keys) >= rows:
+                break  # still being written, or torn by a crash
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            keys.append(entry["key"])
+            scopes.append(int(entry["scope"], 16))
+            self._entries_read += len(line)
+        if not keys:
+            return
+        start = len(self._keys)
+        self._keys.extend(keys)
+        self._scopes = np.append(self._scopes, np.array(scopes, dtype=np.uint64))
+        self._map(len(self._keys), self._dim)
+        if self._ivf is not None:
+            for row in range(start, len(self._keys)):
+                self._ivf.add(np.asarray(self._matrix[row]))
+        self._maybe_train()
+
+    def _map(self, count: int, dim: int) -> None:
+        vectors_path = self._paths()[0]
+        self._matrix = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(count, dim)) if count else None
+
+    def _vectors(self) -> Optional[np.ndarray]:
+        if self.directory is None:
+            return self._buffer[:len(self._keys)] if self._buffer is not None else None
+        return self._matrix
+
+    def _embed(self, text: str) -> np.ndarray:
+        normalized = normalize_prompt(text)
+        with self._lock:
+            vector = self._memo.get(normalized)
+            if vector is not None:
+                self._memo.move_to_end(normalized)
+                return vector
+        vector = self.embedder([normalized])[0]
+        with self._lock:
+            self._memo[normalized] = vector
+            while len(self._memo) > EMBEDDING_MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return vector
+
+    def lookup(self, prompt: str, provider: str, params: Mapping[str, Any]) -> Optional[str]:
+        """Response cache key of the most similar earlier prompt in scope, if similar enough."""
+        query = self._embed(prompt)
+        scope = np.uint64(semantic_scope(provider, params))
+        with self._lock:
+            self.lookups += 1
+            self._refresh()
+            vectors = self._vectors()
+            if vectors is None:
+                return None
+            if self._ivf is not None:
+                rows = self._ivf.candidates(query, self.nprobe)
+                rows = rows[self._scopes[rows] == scope]
+            else:
+                rows = np.flatnonzero(self._scopes == scope)
+            if not len(rows):
+                return None
+            scores = np.asarray(vectors[rows]) @ query
+            # Newest wins ties, so a re-added prompt shadows an entry whose response was evicted.
+            best = len(scores) - 1 - int(np.argmax(scores[::-1]))
+            if scores[best] < self.threshold:
+                return None
+            self.hits += 1
+            LOGGER.debug("Semantic cache match with similarity %.3f", scores[best])
+            return self._keys[rows[best]]
+
+    def add(self, prompt: str, provider: str, params: Mapping[str, Any], key: str) -> None:
+        """Index ``prompt`` as answered by the response cached under ``key``."""
+        vector = self._embed(prompt)
+        scope = semantic_scope(provider, params)
+        with self._lock:
+            if self.directory is not None:
+                self._append_file(vector, key, scope)
+                return
+            self._append_memory(vector)
+            self._keys.append(key)
+            self._scopes = np.append(self._scopes, np.uint64(scope))
+            if self._ivf is not None:
+                self._ivf.add(vector)
+            self._maybe_train()
+
+    def _append_memory(self, vector: np.ndarray) -> None:
+        count = len(self._keys)
+        if self._buffer is None or count == len(self._buffer):
+            grown = np.zeros((max(64, 2 * count), len(vector)), dtype=np.float32)
+            if self._buffer is not None:
+                grown[:count] = self._buffer
+            self._buffer = grown
+        self._buffer[count] = vector
+
+    def _append_file(self, vector: np.ndarray, key: str, scope: int) -> None:
+        vectors_path, entries_path, info_path = self._paths()
+        with self._file_lock():
+            if not info_path.exists():
+                info_path.write_text(json.dumps({"dim": len(vector), "embedder": self.embedder_name}))
+            self._refresh()
+            # Cut what a crashed writer left past the last complete row and entry, so ours line up.
+            complete = {vectors_path: len(self._keys) * 4 * len(vector), entries_path: self._entries_read}
+            for path, length in complete.items():
+                if path.exists() and path.stat().st_size > length:
+                    os.truncate(path, length)
+            with open(vectors_path, "ab") as handle:
+                handle.write(np.asarray(vector, dtype=np.float32).tobytes())
+            with open(entries_path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps({"key": key, "scope": f"{scope:016x}"}) + "\n")
+            self._refresh()
+
+    def _maybe_train(self) -> None:
+        count = len(self._keys)
+        if not self.ivf_lists or count < self.ivf_lists * IVF_MIN_POINTS_PER_LIST:
+            return
+        if self._ivf is not None and count < 2 * self._ivf.trained_on:
+            return
+        # Retrain as the index doubles so partitions keep tracking the data.
+        self._ivf = _InvertedFile(self._vectors(), self.ivf_lists)
+        LOGGER.info("Semantic cache: trained %d IVF lists on %d vectors", self.ivf_lists, count)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._keys),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_ratio": round(self.hits / self.lookups, 4) if self.lookups else None,
+                "threshold": self.threshold,
+                "embedder": self.embedder_name,
+                "ivf_lists": len(self._ivf.centroids) if self._ivf is not None else 0,
+            }
+
+
+def open_semantic_cache(cache_dir: str, embedder: Optional[Embedder] = None) -> SemanticCache:
+    """The process-wide semantic cache stored under ``cache_dir``/semantic, shared by all clients.
+
+    ``embedder`` defaults to ``OpenAIEmbedder``, which needs ``OPENAI_API_KEY``.
+    """
+    directory = str((Path(cache_dir) / "semantic").resolve())
+    with _registry_lock:
+        cache = _registry.get(directory)
+        if cache is None:
+            cache = _registry[directory] = SemanticCache(directory, embedder=embedder)
+        return cache
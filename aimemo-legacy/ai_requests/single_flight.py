@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Coalescing of identical in-flight AI requests."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_shared: Optional["SingleFlight"] = None
+_shared_lock = threading.Lock()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs one call per key at a time and hands its outcome to every caller.
+
+    The first caller for a key (the leader) performs the call; callers that
+    arrive while it is running wait for it instead of issuing their own. Every
+    waiter receives a deep copy of the leader's result, so no two callers share
+    a mutable response, or has the leader's exception re-raised. The thread
+    API (``do``) and the asyncio API (``do_async``) keep separate tables, and
+    async calls are only coalesced within one event loop.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[Tuple[int, str], "asyncio.Future[Any]"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            LOGGER.debug("Coalesced request %s onto in-flight call", key[:12])
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        table_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(table_key)
+            if task is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                task = self._tasks[table_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._tasks.pop(table_key, None))
+                self.leaders += 1
+                leader = True
+        # Shielded so a caller that gives up does not cancel the call for the others.
+        result = await asyncio.shield(task)
+        return result if leader else copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._tasks),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
+
+
+def shared_single_flight() -> SingleFlight:
+    """The process-wide ``SingleFlight`` used by the AI request clients."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SingleFlight()
+        return _shared
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Latency statistics for streamed completions."""
+
+from __future__ import annotations
+
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+DEFAULT_WINDOW = 256
+
+_shared: Optional["StreamStats"] = None
+_shared_lock = threading.Lock()
+
+
+class StreamTimer:
+    """Times one streamed completion from request to first token to last token."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def mark_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    def tokens_per_second(self, tokens: int) -> Optional[float]:
+        """Generation rate after the first token, which excludes queueing and prompt processing."""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        return tokens / elapsed if elapsed > 0 and tokens > 1 else None
+
+
+class _ModelWindow:
+    __slots__ = ("streams", "ttft", "rate")
+
+    def __init__(self, window: int) -> None:
+        self.streams = 0
+        self.ttft: Deque[float] = deque(maxlen=window)
+        self.rate: Deque[float] = deque(maxlen=window)
+
+
+def _quantile(values: Deque[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q * 100) - 1]
+
+
+class StreamStats:
+    """Rolling time-to-first-token and tokens/second per (provider, model).
+
+    Keeps the last ``window`` streams of each model, so percentiles follow
+    recent behaviour rather than the whole process lifetime.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW) -> None:
+        self._window = window
+        self._models: Dict[Tuple[str, str], _ModelWindow] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, model: str, timer: StreamTimer, tokens: int) -> None:
+        ttft = timer.time_to_first_token
+        rate = timer.tokens_per_second(tokens)
+        with self._lock:
+            entry = self._models.get((provider, model))
+            if entry is None:
+                entry = self._models[(provider, model)] = _ModelWindow(self._window)
+            entry.streams += 1
+            if ttft is not None:
+                entry.ttft.append(ttft)
+            if rate is not None:
+                entry.rate.append(rate)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        with self._lock:
+            report = {}
+            for (provider, model), entry in self._models.items():
+                rate = _quantile(entry.rate, 0.5)
+                report[f"{provider}/{model}"] = {
+                    "streams": entry.streams,
+                    "ttft_ms_p50": ms(_quantile(entry.ttft, 0.5)),
+                    "ttft_ms_p90": ms(_quantile(entry.ttft, 0.9)),
+                    "tokens_per_second_p50": round(rate, 1) if rate is not None else None,
+                }
+            return report
+
+
+def shared_stream_stats() -> StreamStats:
+    """The process-wide ``StreamStats`` the AI request clients record into."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = StreamStats()
+        return _shared
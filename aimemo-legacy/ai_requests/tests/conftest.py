@@ -0,0 +1,15 @@
+"""Shared test setup."""
+
+import os
+import sys
+import types
+from pathlib import Path
+
+# The clients import their helpers as ``echomind.*``; point that package at this directory.
+if "echomind" not in sys.modules:
+    package = types.ModuleType("echomind")
+    package.__path__ = [str(Path(__file__).resolve().parent.parent)]
+    sys.modules["echomind"] = package
+
+# The OpenAI SDK refuses to build a client without a key, even one that never leaves the test.
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
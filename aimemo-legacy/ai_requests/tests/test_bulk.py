@@ -0,0 +1,209 @@
+"""send_many over a real OpenAI client talking to an in-process fake API."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+from echomind.ai_cache import SQLiteResponseCache
+from echomind.openai_request import AsyncOpenAIRequestJSONBase, OpenAIRequestJSONBase
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"echo": {"type": "string"}},
+    "required": ["echo"],
+    "additionalProperties": False,
+}
+BASE_URL = "http://fake-openai.test/v1"
+
+
+def completion(content: str) -> dict:
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content, "refusal": None},
+            }
+        ],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+class FakeOpenAI:
+    """Chat completions echo the prompt; a prompt containing "bad" gets a 400.
+
+    Chat requests for "slow <n>" sleep n/100 seconds, so they complete out of order.
+    The files and batches endpoints run a batch to completion on creation.
+    """
+
+    def __init__(self) -> None:
+        self.chat_prompts: list[str] = []
+        self.batch_inputs: list[list[dict]] = []
+        self.files: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.removeprefix("/v1")
+        if path == "/chat/completions":
+            return self._chat(json.loads(request.content))
+        if path == "/files" and request.method == "POST":
+            lines = [line for line in request.content.decode().splitlines() if line.startswith('{"custom_id"')]
+            self.batch_inputs.append([json.loads(line) for line in lines])
+            return httpx.Response(200, json=self._file("file-in", "\n".join(lines)))
+        if path == "/batches" and request.method == "POST":
+            return httpx.Response(200, json=self._run_batch(self.batch_inputs[-1]))
+        if path.startswith("/files/") and path.endswith("/content"):
+            return httpx.Response(200, text=self.files[path.split("/")[2]])
+        return httpx.Response(404, json={"error": {"message": f"no route {path}"}})
+
+    def _chat(self, body: dict) -> httpx.Response:
+        prompt = body["messages"][-1]["content"]
+        with self._lock:
+            self.chat_prompts.append(prompt)
+        if prompt.startswith("slow "):
+            time.sleep(int(prompt.split()[1]) / 100)
+        if "bad" in prompt:
+            return httpx.Response(400, json={"error": {"message": "bad prompt", "type": "invalid_request_error"}})
+        return httpx.Response(200, json=completion(json.dumps({"echo": prompt})))
+
+    def _file(self, file_id: str, text: str) -> dict:
+        self.files[file_id] = text
+        return {"id": file_id, "object": "file", "bytes": len(text), "created_at": 0,
+                "filename": file_id, "purpose": "batch", "status": "processed"}
+
+    def _run_batch(self, lines: list[dict]) -> dict:
+        output, errors = [], []
+        for line in lines:
+            custom_id = line["custom_id"]
+            prompt = line["body"]["messages"][-1]["content"]
+            if prompt == "lost":
+                continue
+            if "bad" in prompt:
+                errors.append({"id": f"r{custom_id}", "custom_id": custom_id, "response": None,
+                               "error": {"code": "invalid_prompt", "message": "bad prompt"}})
+            elif prompt == "overloaded":
+                output.append({"id": f"r{custom_id}", "custom_id": custom_id, "error": None,
+                               "response": {"status_code": 500, "body": {"error": "overloaded"}}})
+            else:
+                body = completion(json.dumps({"echo": prompt}))
+                output.append({"id": f"r{custom_id}", "custom_id": custom_id, "error": None,
+                               "response": {"status_code": 200, "body": body}})
+        self._file("file-out", "\n".join(json.dumps(entry) for entry in output))
+        self._file("file-err", "\n".join(json.dumps(entry) for entry in errors))
+        return {"id": "batch-1", "object": "batch", "endpoint": "/v1/chat/completions",
+                "input_file_id": "file-in", "completion_window": "24h", "status": "completed",
+                "created_at": 0, "output_file_id": "file-out", "error_file_id": "file-err"}
+
+
+@pytest.fixture
+def fake_api() -> FakeOpenAI:
+    return FakeOpenAI()
+
+
+@pytest.fixture
+def client(tmp_path, fake_api) -> OpenAIRequestJSONBase:
+    # A private backend: the shared one puts every test behind the same in-memory tier.
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"))
+    requests = OpenAIRequestJSONBase(cache_dir=str(tmp_path), cache_backend=cache, coalesce=False)
+    requests.client = OpenAI(
+        base_url=BASE_URL, max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(fake_api.handler))
+    )
+    return requests
+
+
+@pytest.fixture
+def async_client(tmp_path, fake_api) -> AsyncOpenAIRequestJSONBase:
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"))
+    requests = AsyncOpenAIRequestJSONBase(cache_dir=str(tmp_path), cache_backend=cache, coalesce=False)
+    requests.client = AsyncOpenAI(
+        base_url=BASE_URL,
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(fake_api.handler)),
+    )
+    return requests
+
+
+def items(*prompts: str) -> list[dict]:
+    return [{"prompt": prompt, "json_schema": SCHEMA} for prompt in prompts]
+
+
+def test_send_many_keeps_input_order(client):
+    results = client.send_many(items("slow 20", "slow 10", "slow 0"), concurrency=3)
+
+    assert [result.index for result in results] == [0, 1, 2]
+    assert [result.value for result in results] == [{"echo": "slow 20"}, {"echo": "slow 10"}, {"echo": "slow 0"}]
+
+
+def test_send_many_fails_only_the_bad_item(client):
+    results = client.send_many(items("one", "bad two", "three"))
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[1].value is None
+    assert "bad prompt" in str(results[1].error)
+    assert results[2].value == {"echo": "three"}
+
+
+def test_send_many_serves_cached_items_without_a_request(client, fake_api):
+    client.send_many(items("one", "two"))
+    results = client.send_many(items("one", "two", "three"))
+
+    assert [result.value["echo"] for result in results] == ["one", "two", "three"]
+    assert fake_api.chat_prompts.count("one") == 1
+    assert fake_api.chat_prompts.count("three") == 1
+
+
+@pytest.mark.asyncio
+async def test_async_send_many_keeps_order_and_per_item_errors(async_client):
+    results = await async_client.send_many(items("slow 20", "bad", "slow 0"), concurrency=3)
+
+    assert [result.index for result in results] == [0, 1, 2]
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[0].value == {"echo": "slow 20"}
+
+
+def test_batch_collects_output_and_error_files(client, fake_api):
+    results = client.send_many(items("one", "bad two", "overloaded", "lost", "five"), batch_api=True)
+
+    assert [result.index for result in results] == [0, 1, 2, 3, 4]
+    assert results[0].value == {"echo": "one"}
+    assert results[4].value == {"echo": "five"}
+    assert "bad prompt" in str(results[1].error)
+    assert "status 500" in str(results[2].error)
+    assert "without a result" in str(results[3].error)
+    assert fake_api.chat_prompts == []
+
+
+def test_batch_caches_successes_and_skips_cached_items(client, fake_api):
+    client.send_many(items("one", "bad two"), batch_api=True)
+    results = client.send_many(items("one", "three"), batch_api=True)
+
+    assert [result.value for result in results] == [{"echo": "one"}, {"echo": "three"}]
+    second_batch = fake_api.batch_inputs[-1]
+    assert [line["body"]["messages"][-1]["content"] for line in second_batch] == ["three"]
+    assert [line["custom_id"] for line in second_batch] == ["1"]
+
+
+def test_batch_with_everything_cached_submits_nothing(client, fake_api):
+    client.send_many(items("one"))
+    results = client.send_many(items("one"), batch_api=True)
+
+    assert results[0].value == {"echo": "one"}
+    assert fake_api.batch_inputs == []
+
+
+@pytest.mark.asyncio
+async def test_async_batch_collects_results(async_client):
+    results = await async_client.send_many(items("one", "bad two"), batch_api=True)
+
+    assert results[0].value == {"echo": "one"}
+    assert "bad prompt" in str(results[1].error)
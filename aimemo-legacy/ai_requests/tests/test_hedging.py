@@ -0,0 +1,179 @@
+"""Hedged requests raced across two fake providers with controllable delays."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from echomind.instrumentation import record_cache_hit
+from echomind.mixed_ai_request import AsyncMixedAIRequestJSONBase, MixedAIRequestJSONBase
+from echomind.provider_health import HALF_OPEN, CircuitBreaker, ProviderHealth
+from echomind.retry_policy import RetryPolicy
+
+
+class FakeProvider:
+    """Answers ``"<name>:<prompt>"`` after ``delays[name]`` seconds.
+
+    Prompts starting with "cached" are answered at once and recorded as cache hits.
+    """
+
+    name = ""
+    delays: dict[str, float] = {}
+
+    def __init__(self, **kwargs) -> None:
+        self.retry_policy = RetryPolicy()
+        self.calls = 0
+        self.cancelled = 0
+
+    def _cached(self, prompt) -> str | None:
+        if not prompt.startswith("cached"):
+            return None
+        record_cache_hit(self.name, "fake", "chat", "memory", time.perf_counter())
+        return f"{self.name}:{prompt}"
+
+    def send_simple_request(self, prompt, **kwargs):
+        self.calls += 1
+        cached = self._cached(prompt)
+        if cached:
+            return cached
+        time.sleep(self.delays[self.name])
+        return f"{self.name}:{prompt}"
+
+
+class AsyncFakeProvider(FakeProvider):
+    async def send_simple_request(self, prompt, **kwargs):
+        self.calls += 1
+        cached = self._cached(prompt)
+        if cached:
+            return cached
+        try:
+            await asyncio.sleep(self.delays[self.name])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"{self.name}:{prompt}"
+
+
+def mixed(base: type, provider: type, delays: dict[str, float], hedge_delay: float = 0.05):
+    """A hedging client over fake "openai" and "deepseek" providers."""
+    primary = type("Primary", (provider,), {"name": "openai", "delays": delays})
+    secondary = type("Secondary", (provider,), {"name": "deepseek", "delays": delays})
+    client_class = type("FakeMixed", (base,), {"_openai_class": primary, "_deepseek_class": secondary})
+    return client_class(hedge=True, hedge_delay=hedge_delay)
+
+
+def half_open(client, provider: str) -> ProviderHealth:
+    """Trip ``provider``'s circuit so its next call is the single half-open probe."""
+    health = ProviderHealth(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+    health.record(False)
+    client._health[provider] = health
+    return health
+
+
+def test_no_hedge_when_primary_answers_in_time():
+    delays = {"openai": 0.0, "deepseek": 0.0}
+    client = mixed(MixedAIRequestJSONBase, FakeProvider, delays, hedge_delay=0.5)
+
+    assert client.send_simple_request("hi") == "openai:hi"
+    assert client._clients["deepseek"].calls == 0
+    assert client.hedging_stats()["hedged"] == 0
+
+
+def test_hedge_fires_after_delay_and_faster_provider_wins():
+    delays = {"openai": 0.5, "deepseek": 0.01}
+    client = mixed(MixedAIRequestJSONBase, FakeProvider, delays, hedge_delay=0.05)
+
+    started = time.perf_counter()
+    assert client.send_simple_request("hi") == "deepseek:hi"
+    elapsed = time.perf_counter() - started
+
+    assert 0.05 <= elapsed < 0.4
+    stats = client.hedging_stats()
+    assert (stats["calls"], stats["hedged"], stats["hedge_wins"]) == (1, 1, 1)
+    # The beaten primary finishes on its thread and is timed against the hedge.
+    deadline = time.monotonic() + 2
+    while client.hedging_stats()["gain_samples"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.hedging_stats()["latency_gain_ms_p50"] > 300
+
+
+def test_hedge_rates_across_calls():
+    delays = {"openai": 0.0, "deepseek": 0.3}
+    client = mixed(MixedAIRequestJSONBase, FakeProvider, delays, hedge_delay=0.05)
+
+    client.send_simple_request("fast")
+    delays["openai"] = 0.1
+    assert client.send_simple_request("slow") == "openai:slow"
+    delays["openai"], delays["deepseek"] = 0.3, 0.0
+    client.send_simple_request("hedged")
+    client.send_simple_request("again")
+
+    stats = client.hedging_stats()
+    assert (stats["calls"], stats["hedged"], stats["hedge_wins"]) == (4, 3, 2)
+    assert stats["hedge_rate"] == 0.75
+    assert stats["win_rate"] == 0.667
+
+
+def test_sync_loser_still_settles_its_half_open_probe():
+    delays = {"openai": 0.2, "deepseek": 0.0}
+    client = mixed(MixedAIRequestJSONBase, FakeProvider, delays, hedge_delay=0.05)
+    health = half_open(client, "openai")
+
+    assert client.send_simple_request("hi") == "deepseek:hi"
+    deadline = time.monotonic() + 2
+    while health.breaker.state == HALF_OPEN and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.provider_health()["openai"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_async_hedge_cancels_loser_and_frees_its_probe():
+    delays = {"openai": 5.0, "deepseek": 0.01}
+    client = mixed(AsyncMixedAIRequestJSONBase, AsyncFakeProvider, delays, hedge_delay=0.05)
+    health = half_open(client, "openai")
+
+    assert await client.send_simple_request("hi") == "deepseek:hi"
+    await asyncio.sleep(0)
+
+    assert client._clients["openai"].cancelled == 1
+    assert health.breaker.state == HALF_OPEN
+    # The cancelled probe gave no verdict, so the next call may probe again.
+    delays["openai"] = 0.0
+    assert await client.send_simple_request("again") == "openai:again"
+    assert health.breaker.state == "closed"
+    stats = client.hedging_stats()
+    assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+
+
+@pytest.mark.parametrize("hedge", [False, True])
+def test_cache_hits_count_as_successes_without_latency(hedge):
+    delays = {"openai": 0.05, "deepseek": 0.0}
+    client = mixed(MixedAIRequestJSONBase, FakeProvider, delays, hedge_delay=1.0)
+    client.hedge = hedge
+
+    client.send_simple_request("sent")
+    for _ in range(5):
+        client.send_simple_request("cached")
+
+    health = client.provider_health()["openai"]
+    assert health["calls"] == 6
+    # Only the sent request is timed, so instant cache hits do not drag the median down.
+    assert health["latency_ms_p50"] >= 50
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hedge", [False, True])
+async def test_async_cache_hits_count_as_successes_without_latency(hedge):
+    delays = {"openai": 0.05, "deepseek": 0.0}
+    client = mixed(AsyncMixedAIRequestJSONBase, AsyncFakeProvider, delays, hedge_delay=1.0)
+    client.hedge = hedge
+
+    await client.send_simple_request("sent")
+    for _ in range(5):
+        await client.send_simple_request("cached")
+
+    health = client.provider_health()["openai"]
+    assert health["calls"] == 6
+    assert health["latency_ms_p50"] >= 50
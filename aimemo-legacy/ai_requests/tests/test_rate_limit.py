@@ -0,0 +1,114 @@
+"""Streamed requests keep the rate limiter in step with the provider."""
+
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, OpenAI, RateLimitError
+
+from echomind.ai_cache import SQLiteResponseCache
+from echomind.openai_request import AsyncOpenAIRequestJSONBase, OpenAIRequestJSONBase
+from echomind.rate_limit import estimate_tokens, limiter_for
+
+BASE_URL = "http://fake-openai.test/v1"
+# 100 tokens a second, so refills during a test stay within the tolerance below.
+HEADERS = {"x-ratelimit-limit-tokens": "6000", "x-ratelimit-remaining-tokens": "1000"}
+
+
+def chunk(model: str, delta: dict | None = None, usage: dict | None = None) -> str:
+    body = {
+        "id": "chatcmpl-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": None}] if delta else [],
+        "usage": usage,
+    }
+    return f"data: {json.dumps(body)}\n\n"
+
+
+def stream_handler(request: httpx.Request) -> httpx.Response:
+    """Streams "hel", "lo" and a final usage chunk of 7 tokens; "busy" prompts get a 429."""
+    body = json.loads(request.content)
+    assert body["stream_options"] == {"include_usage": True}
+    if body["messages"][-1]["content"] == "busy":
+        return httpx.Response(
+            429,
+            headers={"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"},
+            json={"error": {"message": "slow down", "type": "requests"}},
+        )
+    model = body["model"]
+    events = [
+        chunk(model, {"role": "assistant", "content": "hel"}),
+        chunk(model, {"content": "lo"}),
+        chunk(model, usage={"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}),
+        "data: [DONE]\n\n",
+    ]
+    return httpx.Response(
+        200, headers={"content-type": "text/event-stream", **HEADERS}, content="".join(events).encode()
+    )
+
+
+def params(client, prompt: str, model: str) -> dict:
+    return client._prepare_simple_request(prompt, "You are a helpful AI assistant.", model)[0]
+
+
+@pytest.fixture
+def client(tmp_path) -> OpenAIRequestJSONBase:
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"))
+    requests = OpenAIRequestJSONBase(cache_dir=str(tmp_path), cache_backend=cache, use_cache=False)
+    requests.client = OpenAI(
+        base_url=BASE_URL, max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(stream_handler))
+    )
+    return requests
+
+
+@pytest.fixture
+def async_client(tmp_path) -> AsyncOpenAIRequestJSONBase:
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"))
+    requests = AsyncOpenAIRequestJSONBase(cache_dir=str(tmp_path), cache_backend=cache, use_cache=False)
+    requests.client = AsyncOpenAI(
+        base_url=BASE_URL,
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(stream_handler)),
+    )
+    return requests
+
+
+def test_stream_observes_headers_and_settles_with_final_usage(client):
+    # A model name of its own gives this test a fresh process-wide limiter.
+    model = "stream-settle-sync"
+    estimated = estimate_tokens(params(client, "hi", model))
+
+    assert "".join(client.stream_simple_request("hi", model=model)) == "hello"
+
+    tokens = limiter_for("openai", model).tokens
+    assert tokens.per_minute == 6000
+    # Clamped to the reported 1000 remaining, then refunded the unused estimate.
+    assert tokens.level == pytest.approx(1000 + estimated - 7, abs=10)
+
+
+@pytest.mark.asyncio
+async def test_async_stream_observes_headers_and_settles_with_final_usage(async_client):
+    model = "stream-settle-async"
+    estimated = estimate_tokens(params(async_client, "hi", model))
+
+    parts = [text async for text in async_client.stream_simple_request("hi", model=model)]
+
+    assert "".join(parts) == "hello"
+    tokens = limiter_for("openai", model).tokens
+    assert tokens.per_minute == 6000
+    assert tokens.level == pytest.approx(1000 + estimated - 7, abs=10)
+
+
+def test_rate_limited_stream_is_recorded(client):
+    model = "stream-429"
+
+    with pytest.raises(RateLimitError):
+        client._open_stream(params(client, "busy", model))
+
+    limiter = limiter_for("openai", model)
+    assert limiter.stats()["rate_limited"] == 1
+    assert limiter.requests.level < 0
@@ -0,0 +1,129 @@
+"""Compiled schema validators and memoized schema conversions."""
+
+from __future__ import annotations
+
+import pytest
+
+from echomind.schema_validation import CompiledSchema, compiled_schema, memoized_conversion
+
+TREE = {
+    "$defs": {
+        "node": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "children": {"type": "array", "items": {"$ref": "#/$defs/node"}},
+            },
+            "required": ["name"],
+            "additionalProperties": False,
+        }
+    },
+    "$ref": "#/$defs/node",
+}
+
+
+@pytest.mark.parametrize(
+    ("schema", "value", "valid"),
+    [
+        ({"enum": [1, 2]}, 1, True),
+        ({"enum": [1, 2]}, 1.0, True),
+        ({"enum": [1, 2]}, True, False),
+        ({"enum": [0, "off"]}, False, False),
+        ({"enum": [True, "yes"]}, 1, False),
+        ({"enum": [False]}, False, True),
+        ({"const": 0}, False, False),
+        ({"const": 1.0}, True, False),
+        ({"const": True}, 1, False),
+        ({"const": [1, {"on": True}]}, [1, {"on": True}], True),
+        ({"const": [1, {"on": True}]}, [True, {"on": True}], False),
+        ({"const": [1, {"on": True}]}, [1, {"on": 1}], False),
+        ({"const": {"a": 1}}, {"a": 1, "b": 2}, False),
+    ],
+)
+def test_enum_and_const_do_not_mix_booleans_and_numbers(schema, value, valid):
+    assert (CompiledSchema(schema).errors(value) == []) is valid
+
+
+def test_errors_carry_json_paths():
+    schema = {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string", "minLength": 2},
+            "score": {"type": "number", "minimum": 0},
+            "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 2},
+        },
+        "required": ["name", "score"],
+        "additionalProperties": False,
+    }
+
+    errors = CompiledSchema(schema).errors({"name": "x", "tags": ["a", 1, "c"], "extra": None})
+
+    assert errors == [
+        "$: missing required property 'score'",
+        "$.name: shorter than 2 characters",
+        "$.tags: expected at most 2 items, got 3",
+        "$.tags[1]: expected string, got int",
+        "$: unexpected property 'extra'",
+    ]
+
+
+def test_recursive_ref():
+    validator = CompiledSchema(TREE)
+    tree = {"name": "root", "children": [{"name": "a", "children": [{"name": "b"}]}]}
+
+    assert validator.errors(tree) == []
+    tree["children"][0]["children"].append({"children": [], "kind": "leaf"})
+    assert validator.errors(tree) == [
+        "$.children[0].children[1]: missing required property 'name'",
+        "$.children[0].children[1]: unexpected property 'kind'",
+    ]
+
+
+def test_any_of_and_one_of():
+    any_of = CompiledSchema({"anyOf": [{"type": "string"}, {"type": "integer", "minimum": 0}]})
+    one_of = CompiledSchema({"oneOf": [{"type": "integer"}, {"type": "number", "maximum": 10}]})
+
+    assert any_of.errors("x") == [] and any_of.errors(3) == []
+    assert any_of.errors(-1) == ["$: value must match at least one of 2 alternatives"]
+    assert any_of.errors(True) == ["$: value must match at least one of 2 alternatives"]
+    assert one_of.errors(20) == [] and one_of.errors(2.5) == []
+    # 3 is an integer and a number up to 10.
+    assert one_of.errors(3) == ["$: value must match exactly one of 2 alternatives"]
+
+
+def test_compiled_schemas_are_shared_across_key_order():
+    first = compiled_schema({"type": "object", "required": ["a"]})
+
+    assert compiled_schema({"required": ["a"], "type": "object"}) is first
+    assert compiled_schema({"type": "object", "required": ["b"]}) is not first
+
+
+class Converter:
+    calls = 0
+
+    @memoized_conversion
+    def example(self, schema):
+        Converter.calls += 1
+        return {"value": schema.get("const"), "tags": []}
+
+    @memoized_conversion
+    def text(self, schema):
+        Converter.calls += 1
+        return f"type={schema['type']}"
+
+
+def test_memoized_conversion_keys_on_canonical_json_and_returns_copies():
+    converter = Converter()
+    Converter.calls = 0
+
+    first = converter.example({"const": 1, "type": "integer"})
+    first["tags"].append("mutated")
+    second = converter.example({"type": "integer", "const": 1})
+
+    assert second == {"value": 1, "tags": []}
+    assert Converter.calls == 1
+    # true and 1 have different canonical JSON, so they are converted separately.
+    assert converter.example({"const": True, "type": "integer"}) == {"value": True, "tags": []}
+    assert Converter.calls == 2
+    assert converter.text({"type": "string"}) == converter.text({"type": "string"}) == "type=string"
+    assert Converter.calls == 3
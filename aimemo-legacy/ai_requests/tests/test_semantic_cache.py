@@ -0,0 +1,121 @@
+"""SemanticCache thresholds and sharing an index directory between processes."""
+
+from __future__ import annotations
+
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from echomind.semantic_cache import HashingEmbedder, OpenAIEmbedder, SemanticCache
+
+PARAMS = {"model": "gpt-4o-mini", "messages": [{"role": "system", "content": "You are an AI."}]}
+
+
+class FixedSimilarityEmbedder:
+    """Embeds each known prompt at a chosen cosine similarity to its anchor prompt.
+
+    Stands in for a trained model, which places paraphrases close together
+    and prompts that need a different answer further apart.
+    """
+
+    name = "fixed-similarity"
+
+    def __init__(self, anchors: dict[str, tuple[str, ...]], similarity: dict[str, float]) -> None:
+        prompts = list(anchors) + list(similarity)
+        self.axes = {prompt: axis for axis, prompt in enumerate(prompts)}
+        self.anchors = anchors
+        self.similarity = similarity
+
+    def __call__(self, texts):
+        vectors = np.zeros((len(texts), len(self.axes)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            if text in self.anchors:
+                vectors[row, self.axes[text]] = 1.0
+                continue
+            anchor = next(prompt for prompt, members in self.anchors.items() if text in members)
+            score = self.similarity[text]
+            vectors[row, self.axes[anchor]] = score
+            vectors[row, self.axes[text]] = np.sqrt(1 - score**2)
+        return vectors
+
+
+def test_threshold_rejects_near_misses_that_need_other_answers():
+    anchors = {
+        "i will attend the meeting": ("i'll attend the meeting", "i will not attend the meeting"),
+        "what did bob say": ("what was bob saying", "what did alice say"),
+    }
+    similarity = {
+        "i'll attend the meeting": 0.96,
+        "i will not attend the meeting": 0.89,
+        "what was bob saying": 0.95,
+        "what did alice say": 0.88,
+    }
+    cache = SemanticCache(embedder=FixedSimilarityEmbedder(anchors, similarity), threshold=0.92)
+    cache.add("I will attend the meeting.", "openai", PARAMS, "key-attend")
+    cache.add("What did Bob say?", "openai", PARAMS, "key-bob")
+
+    assert cache.lookup("I'll attend the meeting", "openai", PARAMS) == "key-attend"
+    assert cache.lookup("What was Bob saying", "openai", PARAMS) == "key-bob"
+    assert cache.lookup("I will not attend the meeting", "openai", PARAMS) is None
+    assert cache.lookup("What did Alice say", "openai", PARAMS) is None
+
+
+def test_default_embedder_is_a_trained_model():
+    assert isinstance(SemanticCache().embedder, OpenAIEmbedder)
+
+
+def test_instances_sharing_a_directory_see_each_others_rows(tmp_path):
+    first = SemanticCache(str(tmp_path), embedder=HashingEmbedder())
+    second = SemanticCache(str(tmp_path), embedder=HashingEmbedder())
+
+    first.add("alpha request", "openai", PARAMS, "key-alpha")
+    second.add("beta request", "openai", PARAMS, "key-beta")
+    first.add("gamma request", "openai", PARAMS, "key-gamma")
+
+    for cache in (first, second, SemanticCache(str(tmp_path), embedder=HashingEmbedder())):
+        assert cache.lookup("alpha request", "openai", PARAMS) == "key-alpha"
+        assert cache.lookup("beta request", "openai", PARAMS) == "key-beta"
+        assert cache.lookup("gamma request", "openai", PARAMS) == "key-gamma"
+        assert cache.stats()["entries"] == 3
+
+
+def test_append_after_a_torn_write_stays_aligned(tmp_path):
+    writer = SemanticCache(str(tmp_path), embedder=HashingEmbedder())
+    writer.add("alpha request", "openai", PARAMS, "key-alpha")
+    # A writer that died between the vector row and its entry line.
+    with open(tmp_path / "vectors.f32", "ab") as handle:
+        handle.write(HashingEmbedder()(["stray"])[0].tobytes())
+    with open(tmp_path / "entries.jsonl", "a", encoding="utf-8") as handle:
+        handle.write('{"key": "key-str')
+
+    other = SemanticCache(str(tmp_path), embedder=HashingEmbedder())
+    other.add("beta request", "openai", PARAMS, "key-beta")
+
+    reopened = SemanticCache(str(tmp_path), embedder=HashingEmbedder())
+    assert reopened.lookup("alpha request", "openai", PARAMS) == "key-alpha"
+    assert reopened.lookup("beta request", "openai", PARAMS) == "key-beta"
+    assert reopened.stats()["entries"] == 2
+
+
+def _add_many(directory: str, prefix: str, count: int) -> None:
+    cache = SemanticCache(directory, embedder=HashingEmbedder())
+    for index in range(count):
+        cache.add(f"{prefix} prompt number {index}", "openai", PARAMS, f"{prefix}-{index}")
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_processes_keep_rows_and_keys_aligned(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_add_many, args=(str(tmp_path), prefix, 40)) for prefix in ("red", "blue")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    cache = SemanticCache(str(tmp_path), embedder=HashingEmbedder())
+    assert cache.stats()["entries"] == 80
+    for prefix in ("red", "blue"):
+        for index in range(40):
+            assert cache.lookup(f"{prefix} prompt number {index}", "openai", PARAMS) == f"{prefix}-{index}"
@@ -0,0 +1,123 @@
+"""Benchmark agenda queries for a heavy calendar.
+
+Seeds a throwaway calendar with 4,800 one-off events and 200 weekly or daily
+series spread over two years, then times "today" and "this week" agenda
+queries with a cold and a warm recurrence cache.
+
+    DATABASE_AI_URL=postgresql+asyncpg://... python scripts/bench_agenda.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import random
+import statistics
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from sqlalchemy import delete
+
+from aisecretary.config import settings
+from aisecretary.models import CalendarEvent
+from aisecretary.services.agenda import AgendaOccurrence, AgendaService
+from aisecretary.storage import Database
+
+CALENDAR_URL = "bench://agenda"
+ONE_OFF_EVENTS = 4800
+RECURRING_SERIES = 200
+ROUNDS = 50
+
+
+def _ical(uid: str, start: dt.datetime, end: dt.datetime, rrule: str | None) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTART:{start:%Y%m%dT%H%M%SZ}",
+        f"DTEND:{end:%Y%m%dT%H%M%SZ}",
+        f"SUMMARY:{uid}",
+    ]
+    if rrule:
+        lines.append(f"RRULE:{rrule}")
+    lines += ["END:VEVENT", "END:VCALENDAR", ""]
+    return "\r\n".join(lines)
+
+
+def _events(now: dt.datetime) -> list[CalendarEvent]:
+    rng = random.Random(7)
+    events = []
+    for index in range(ONE_OFF_EVENTS + RECURRING_SERIES):
+        recurring = index >= ONE_OFF_EVENTS
+        offset = dt.timedelta(minutes=rng.randrange(730 * 24 * 60))
+        start = (now - dt.timedelta(days=365) + offset).replace(second=0, microsecond=0)
+        end = start + dt.timedelta(minutes=rng.choice((15, 30, 60, 90)))
+        rrule = rng.choice(("FREQ=WEEKLY", "FREQ=DAILY;INTERVAL=2")) if recurring else None
+        if recurring:
+            start -= dt.timedelta(days=365)
+            end -= dt.timedelta(days=365)
+        uid = f"bench-{index}"
+        events.append(
+            CalendarEvent(
+                calendar_url=CALENDAR_URL,
+                href=f"/{uid}.ics",
+                etag=uuid.uuid4().hex,
+                uid=uid,
+                summary=uid,
+                starts_at=start,
+                ends_at=end,
+                rrule=rrule,
+                ical=_ical(uid, start, end, rrule),
+            )
+        )
+    return events
+
+
+async def _time(
+    label: str, call: Callable[[], Awaitable[list[AgendaOccurrence]]], rounds: int
+) -> None:
+    samples = []
+    count = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        count = len(await call())
+        samples.append((time.perf_counter() - started) * 1000)
+    print(
+        f"{label:<24} occurrences={count:<5} "
+        f"p50={statistics.median(samples):7.2f}ms max={max(samples):7.2f}ms"
+    )
+
+
+async def main() -> None:
+    db = Database(settings)
+    await db.create_all()
+    now = dt.datetime.now(dt.timezone.utc)
+    async with db.session() as session:
+        await session.execute(
+            delete(CalendarEvent).where(CalendarEvent.calendar_url == CALENDAR_URL)
+        )
+        session.add_all(_events(now))
+
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    windows = {
+        "today": (today, today + dt.timedelta(days=1)),
+        "this week": (today, today + dt.timedelta(days=7)),
+    }
+    try:
+        for label, (start, end) in windows.items():
+            await _time(f"{label} (cold cache)", lambda: AgendaService(db).agenda(start, end), 5)
+            service = AgendaService(db)
+            await service.agenda(start, end)
+            await _time(f"{label} (warm cache)", lambda: service.agenda(start, end), ROUNDS)
+            print(f"{'':<24} cache {service.cache.stats()}")
+    finally:
+        async with db.session() as session:
+            await session.execute(
+                delete(CalendarEvent).where(CalendarEvent.calendar_url == CALENDAR_URL)
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+"""Benchmark the free/busy slot finder.
+
+Generates synthetic busy calendars and times ``find_free_slots`` over a
+four-week window for growing participant counts. No database is needed.
+
+    python scripts/bench_free_slots.py
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+import random
+import statistics
+import time
+
+# Importing the services package loads Settings, which require a JWT secret.
+os.environ.setdefault("JWT_SECRET", "bench")
+
+from aisecretary.services.free_busy import Interval, WorkingHours, find_free_slots
+
+WINDOW_DAYS = 28
+EVENTS_PER_PARTICIPANT = 120
+ROUNDS = 20
+
+
+def _calendar(rng: random.Random, start: dt.datetime) -> list[Interval]:
+    events = []
+    for _ in range(EVENTS_PER_PARTICIPANT):
+        begins = start + dt.timedelta(minutes=15 * rng.randrange(WINDOW_DAYS * 96))
+        events.append((begins, begins + dt.timedelta(minutes=rng.choice((15, 30, 45, 60)))))
+    return events
+
+
+def main() -> None:
+    rng = random.Random(11)
+    start = dt.datetime(2026, 1, 5, tzinfo=dt.timezone.utc)
+    window = (start, start + dt.timedelta(days=WINDOW_DAYS))
+    working_hours = WorkingHours(timezone="Europe/London")
+    for participants in (2, 10, 25, 50):
+        busy = {f"calendar-{index}": _calendar(rng, start) for index in range(participants)}
+        samples = []
+        slots = []
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            slots = find_free_slots(busy, window, dt.timedelta(minutes=30), working_hours)
+            samples.append((time.perf_counter() - started) * 1000)
+        print(
+            f"participants={participants:<3} events={participants * EVENTS_PER_PARTICIPANT:<6} "
+            f"slots={len(slots):<3} p50={statistics.median(samples):7.2f}ms "
+            f"max={max(samples):7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -14,16 +14,27 @@ from tornado.log import enable_pretty_logging
 
 from .config import settings
 from .handlers import get_routes
-from .services import AuthService, CalendarService, EmailService
+from .services import (
+    AuthService,
+    CalendarService,
+    EmailService,
+    PasswordResetDispatcher,
+    StructuredOutputClient,
+    TriagePipeline,
+)
 from .storage import Database
 
 
 def build_application() -> Application:
     """Construct the Tornado application with its dependencies."""
     database = Database(settings)
-    email_service = EmailService(settings)
-    calendar_service = CalendarService(settings)
+    triage_pipeline = None
+    if settings.openai_api_key:
+        triage_pipeline = TriagePipeline(database, settings, StructuredOutputClient(settings))
+    email_service = EmailService(settings, database, triage=triage_pipeline)
+    calendar_service = CalendarService(settings, database)
     auth_service = AuthService(database, settings)
+    password_reset_dispatcher = PasswordResetDispatcher(auth_service, email_service, settings)
 
     routes = get_routes()
 
@@ -33,8 +44,10 @@ def build_application() -> Application:
         app_name=settings.app_name,
         db=database,
         email_service=email_service,
+        triage_pipeline=triage_pipeline,
         calendar_service=calendar_service,
         auth_service=auth_service,
+        password_reset_dispatcher=password_reset_dispatcher,
         cors_allow_origins=settings.cors_allow_origins,
         cors_allow_headers=settings.cors_allow_headers,
         cors_allow_methods=settings.cors_allow_methods,
@@ -46,6 +59,11 @@ async def _run_server() -> None:
     app = build_application()
     database: Database = app.settings["db"]
     await database.create_all()
+    dispatcher: PasswordResetDispatcher = app.settings["password_reset_dispatcher"]
+    dispatcher.start()
+    triage_pipeline: TriagePipeline | None = app.settings["triage_pipeline"]
+    if triage_pipeline is not None:
+        triage_pipeline.start()
     server = HTTPServer(app)
     server.bind(settings.port, address=settings.host)
     server.start()
@@ -2,11 +2,13 @@
 
 from __future__ import annotations
 
+import json
 from functools import lru_cache
 from pathlib import Path
+from typing import Annotated
 
 from pydantic import Field, computed_field, field_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -26,10 +28,21 @@ class Settings(BaseSettings):
     postgres_password: str = Field(default="postgres", alias="POSTGRES_PASSWORD")
 
     database_ai_url: str | None = Field(default=None, alias="DATABASE_AI_URL")
+    database_replica_urls: Annotated[list[str], NoDecode] = Field(
+        default_factory=list, alias="DATABASE_REPLICA_URLS"
+    )
+    database_replica_retry_seconds: float = Field(
+        default=30.0, alias="DATABASE_REPLICA_RETRY_SECONDS"
+    )
+    database_primary_sticky_seconds: float = Field(
+        default=5.0, alias="DATABASE_PRIMARY_STICKY_SECONDS"
+    )
     backend_public_url: str | None = Field(default=None, alias="BACKEND_PUBLIC_URL")
     frontend_public_url: str | None = Field(default=None, alias="FRONTEND_PUBLIC_URL")
 
-    cors_allow_origins: list[str] = Field(default_factory=lambda: ["*"], alias="CORS_ALLOW_ORIGINS")
+    cors_allow_origins: Annotated[list[str], NoDecode] = Field(
+        default_factory=lambda: ["*"], alias="CORS_ALLOW_ORIGINS"
+    )
     cors_allow_headers: str = Field(
         default="Content-Type, Authorization, X-Requested-With", alias="CORS_ALLOW_HEADERS"
     )
@@ -43,6 +56,59 @@ class Settings(BaseSettings):
 
     echo: bool = Field(default=False, alias="SQL_ECHO")
 
+    imap_host: str = Field(default="imap.mail.me.com", alias="IMAP_HOST")
+    imap_port: int = Field(default=993, alias="IMAP_PORT")
+    imap_use_ssl: bool = Field(default=True, alias="IMAP_USE_SSL")
+    imap_username: str | None = Field(default=None, alias="IMAP_USERNAME")
+    imap_password: str | None = Field(default=None, alias="IMAP_PASSWORD")
+    imap_folders: Annotated[list[str], NoDecode] = Field(
+        default_factory=lambda: ["INBOX"], alias="IMAP_FOLDERS"
+    )
+    imap_batch_size: int = Field(default=500, alias="IMAP_BATCH_SIZE")
+    imap_timeout_seconds: float = Field(default=60.0, alias="IMAP_TIMEOUT_SECONDS")
+    mail_store_dir: Path = Field(default=Path("var/mail"), alias="MAIL_STORE_DIR")
+
+    caldav_calendar_urls: Annotated[list[str], NoDecode] = Field(
+        default_factory=list, alias="CALDAV_CALENDAR_URLS"
+    )
+    caldav_username: str | None = Field(default=None, alias="CALDAV_USERNAME")
+    caldav_password: str | None = Field(default=None, alias="CALDAV_PASSWORD")
+    caldav_multiget_batch_size: int = Field(default=100, alias="CALDAV_MULTIGET_BATCH_SIZE")
+    caldav_timeout_seconds: float = Field(default=60.0, alias="CALDAV_TIMEOUT_SECONDS")
+
+    smtp_host: str = Field(default="smtp.mail.me.com", alias="SMTP_HOST")
+    smtp_port: int = Field(default=587, alias="SMTP_PORT")
+    smtp_username: str | None = Field(default=None, alias="SMTP_USERNAME")
+    smtp_password: str | None = Field(default=None, alias="SMTP_PASSWORD")
+    smtp_use_tls: bool = Field(default=False, alias="SMTP_USE_TLS")
+    smtp_start_tls: bool = Field(default=True, alias="SMTP_START_TLS")
+    smtp_from: str | None = Field(default=None, alias="SMTP_FROM")
+    smtp_timeout_seconds: float = Field(default=30.0, alias="SMTP_TIMEOUT_SECONDS")
+    smtp_pool_size: int = Field(default=4, alias="SMTP_POOL_SIZE")
+    smtp_max_messages_per_connection: int = Field(
+        default=100, alias="SMTP_MAX_MESSAGES_PER_CONNECTION"
+    )
+    smtp_idle_timeout_seconds: float = Field(default=60.0, alias="SMTP_IDLE_TIMEOUT_SECONDS")
+
+    openai_api_key: str | None = Field(default=None, alias="OPENAI_API_KEY")
+    openai_base_url: str = Field(default="https://api.openai.com/v1", alias="OPENAI_BASE_URL")
+    openai_model: str = Field(default="gpt-4o-mini", alias="OPENAI_MODEL")
+    openai_timeout_seconds: float = Field(default=60.0, alias="OPENAI_TIMEOUT_SECONDS")
+
+    triage_batch_size: int = Field(default=25, alias="TRIAGE_BATCH_SIZE")
+    triage_concurrency: int = Field(default=4, alias="TRIAGE_CONCURRENCY")
+    triage_priority_senders: Annotated[list[str], NoDecode] = Field(
+        default_factory=list, alias="TRIAGE_PRIORITY_SENDERS"
+    )
+
+    password_reset_ttl_minutes: int = Field(default=30, alias="PASSWORD_RESET_TTL_MINUTES")
+    password_reset_coalesce_seconds: float = Field(
+        default=300.0, alias="PASSWORD_RESET_COALESCE_SECONDS"
+    )
+    password_reset_sweep_seconds: float = Field(
+        default=600.0, alias="PASSWORD_RESET_SWEEP_SECONDS"
+    )
+
     @computed_field  # type: ignore[misc]
     @property
     def database_url(self) -> str:
@@ -53,12 +119,26 @@ class Settings(BaseSettings):
             f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
         )
 
-    @field_validator("cors_allow_origins", mode="before")
+    # List settings take a JSON array or comma-separated values. They are marked NoDecode so
+    # pydantic-settings hands _parse_list the raw string instead of requiring JSON.
+    @field_validator(
+        "cors_allow_origins",
+        "database_replica_urls",
+        "imap_folders",
+        "caldav_calendar_urls",
+        "triage_priority_senders",
+        mode="before",
+    )
     @classmethod
-    def _split_origins(cls, value: str | list[str]) -> list[str]:
+    def _parse_list(cls, value: str | list[str] | None) -> list[str]:
+        if value is None:
+            return []
         if isinstance(value, str):
-            entries = [origin.strip() for origin in value.split(",")]
-            return [origin for origin in entries if origin]
+            raw = value.strip()
+            if raw.startswith("["):
+                return json.loads(raw)
+            entries = [entry.strip() for entry in raw.split(",")]
+            return [entry for entry in entries if entry]
         return value
 
 
@@ -2,7 +2,8 @@
 
 from tornado.web import URLSpec
 
-from .auth import ForgotPasswordHandler, LoginHandler, RegisterHandler
+from .auth import ForgotPasswordHandler, LoginHandler, RegisterHandler, ResetPasswordHandler
+from .calendar import FreeSlotsHandler
 from .health import HealthHandler
 
 
@@ -13,6 +14,8 @@ def get_routes() -> list[URLSpec]:
         URLSpec(r"/auth/register", RegisterHandler),
         URLSpec(r"/auth/login", LoginHandler),
         URLSpec(r"/auth/forgot-password", ForgotPasswordHandler),
+        URLSpec(r"/auth/reset-password", ResetPasswordHandler),
+        URLSpec(r"/calendar/free-slots", FreeSlotsHandler),
     ]
 
 
@@ -6,7 +6,7 @@ from typing import Any
 
 from tornado.web import HTTPError
 
-from ..services import AuthService
+from ..services import AuthService, PasswordResetDispatcher
 from ..services.auth import AuthError, InvalidCredentials
 from .base import BaseHandler
 
@@ -18,6 +18,10 @@ class AuthBaseHandler(BaseHandler):
     def auth_service(self) -> AuthService:
         return self.application.settings["auth_service"]
 
+    @property
+    def password_reset_dispatcher(self) -> PasswordResetDispatcher:
+        return self.application.settings["password_reset_dispatcher"]
+
 
 class RegisterHandler(AuthBaseHandler):
     """POST /auth/register"""
@@ -78,8 +82,29 @@ class ForgotPasswordHandler(AuthBaseHandler):
         if not email:
             raise HTTPError(400, reason="Email is required")
 
-        await self.auth_service.initiate_password_reset(email=email)
+        self.password_reset_dispatcher.enqueue(email)
         self.write_json(
             status=202,
             message="If an account exists for that email, a reset link will be sent.",
         )
+
+
+class ResetPasswordHandler(AuthBaseHandler):
+    """POST /auth/reset-password"""
+
+    async def post(self) -> None:
+        data = self.json_body()
+        token = str(data.get("token", "")).strip()
+        password = str(data.get("password", "")).strip()
+
+        if not token or not password:
+            raise HTTPError(400, reason="Token and password are required")
+        if len(password) < 8:
+            raise HTTPError(400, reason="Password must be at least 8 characters long")
+
+        try:
+            await self.auth_service.reset_password(token=token, password=password)
+        except AuthError as exc:
+            raise HTTPError(400, reason=str(exc)) from exc
+
+        self.write_json(status=200, message="Password has been reset.")
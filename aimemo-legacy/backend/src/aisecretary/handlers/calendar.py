@@ -0,0 +1,122 @@
+"""Calendar HTTP handlers."""
+
+from __future__ import annotations
+
+import datetime as dt
+import uuid
+from typing import Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import jwt
+from tornado.web import HTTPError
+
+from ..services import AuthService, CalendarService
+from ..services.free_busy import WorkingHours
+from .base import BaseHandler
+
+MAX_PARTICIPANTS = 50
+MAX_WINDOW = dt.timedelta(days=31)
+
+
+class CalendarBaseHandler(BaseHandler):
+    """Shared helpers for calendar handlers."""
+
+    current_user_id: uuid.UUID
+
+    @property
+    def calendar_service(self) -> CalendarService:
+        return self.application.settings["calendar_service"]
+
+    @property
+    def auth_service(self) -> AuthService:
+        return self.application.settings["auth_service"]
+
+    def prepare(self) -> None:
+        super().prepare()
+        header = self.request.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise HTTPError(401, reason="Missing bearer token")
+        try:
+            payload = self.auth_service.decode_token(token)
+            self.current_user_id = uuid.UUID(str(payload["sub"]))
+        except (jwt.PyJWTError, KeyError, ValueError) as exc:
+            raise HTTPError(401, reason="Invalid or expired token") from exc
+
+
+def _parse_datetime(value: Any, field: str) -> dt.datetime:
+    try:
+        parsed = dt.datetime.fromisoformat(str(value))
+    except ValueError as exc:
+        raise HTTPError(400, reason=f"{field} must be an ISO 8601 datetime") from exc
+    if parsed.tzinfo is None:
+        raise HTTPError(400, reason=f"{field} must include a UTC offset")
+    return parsed.astimezone(dt.timezone.utc)
+
+
+def _parse_time(value: Any, field: str) -> dt.time:
+    try:
+        return dt.time.fromisoformat(str(value))
+    except ValueError as exc:
+        raise HTTPError(400, reason=f"{field} must be HH:MM") from exc
+
+
+def _parse_working_hours(data: dict[str, Any]) -> WorkingHours:
+    defaults = WorkingHours()
+    timezone = str(data.get("timezone", defaults.timezone))
+    try:
+        ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise HTTPError(400, reason="working_hours.timezone is not a known time zone") from exc
+    try:
+        weekdays = frozenset(int(day) for day in data.get("weekdays", defaults.weekdays))
+    except (TypeError, ValueError) as exc:
+        raise HTTPError(400, reason="working_hours.weekdays must be integers 0-6") from exc
+    return WorkingHours(
+        start=_parse_time(data.get("start", "09:00"), "working_hours.start"),
+        end=_parse_time(data.get("end", "17:00"), "working_hours.end"),
+        timezone=timezone,
+        weekdays=weekdays,
+    )
+
+
+class FreeSlotsHandler(CalendarBaseHandler):
+    """POST /calendar/free-slots
+
+    Participants are calendar collection URLs the caller owns or is shared on;
+    busy times of any other calendar are not disclosed.
+    """
+
+    async def post(self) -> None:
+        data = self.json_body()
+        participants = list(dict.fromkeys(str(url) for url in data.get("participants") or []))
+        if not participants:
+            raise HTTPError(400, reason="At least one participant is required")
+        if len(participants) > MAX_PARTICIPANTS:
+            raise HTTPError(400, reason=f"At most {MAX_PARTICIPANTS} participants are allowed")
+        readable = await self.calendar_service.readable_calendars(
+            self.current_user_id, participants
+        )
+        if len(readable) < len(participants):
+            raise HTTPError(403, reason="Not allowed to read every participant's calendar")
+
+        start = _parse_datetime(data.get("start"), "start")
+        end = _parse_datetime(data.get("end"), "end")
+        if not start < end <= start + MAX_WINDOW:
+            raise HTTPError(400, reason="end must be after start and within 31 days of it")
+        try:
+            duration = dt.timedelta(minutes=int(data.get("duration_minutes", 30)))
+            limit = int(data.get("limit", 10))
+        except (TypeError, ValueError) as exc:
+            raise HTTPError(400, reason="duration_minutes and limit must be integers") from exc
+        if duration <= dt.timedelta(0) or limit <= 0:
+            raise HTTPError(400, reason="duration_minutes and limit must be positive")
+
+        slots = await self.calendar_service.find_free_slots(
+            participants,
+            (start, end),
+            duration,
+            _parse_working_hours(data.get("working_hours") or {}),
+            limit=limit,
+        )
+        self.write_json(status=200, slots=[slot.as_dict() for slot in slots])
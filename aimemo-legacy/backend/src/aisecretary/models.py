@@ -5,8 +5,23 @@ from __future__ import annotations
 import datetime as dt
 import uuid
 
-from sqlalchemy import DateTime, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Sequence,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+    literal_column,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSTZRANGE, UUID, Range
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -14,6 +29,11 @@ class Base(DeclarativeBase):
     """Declarative base for SQLAlchemy models."""
 
 
+thread_change_seq = Sequence("mail_thread_change_seq", metadata=Base.metadata)
+# 64-bit id of the writing transaction; see ThreadIndex.changed_since.
+CURRENT_XACT_ID = "pg_current_xact_id()::text::bigint"
+
+
 class User(Base):
     """Application user record."""
 
@@ -28,3 +48,186 @@ class User(Base):
     updated_at: Mapped[dt.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
     )
+
+
+class PasswordResetToken(Base):
+    """Password reset token, stored as a SHA-256 hash."""
+
+    __tablename__ = "password_reset_tokens"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
+    token_hash: Mapped[str] = mapped_column(unique=True, index=True)
+    expires_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), index=True, nullable=False
+    )
+    created_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class MailFolderState(Base):
+    """IMAP sync checkpoint for one folder."""
+
+    __tablename__ = "mail_folder_states"
+
+    folder: Mapped[str] = mapped_column(String(255), primary_key=True)
+    uidvalidity: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    uidnext: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1)
+    highestmodseq: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    synced_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
+class MailThread(Base):
+    """A conversation; messages point at it through ``MailMessage.thread_id``."""
+
+    __tablename__ = "mail_threads"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    subject_key: Mapped[str] = mapped_column(String(512), index=True, nullable=False, default="")
+    last_message_at: Mapped[dt.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Set when this thread was folded into another; kept so clients can follow the merge.
+    merged_into_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("mail_threads.id"), nullable=True
+    )
+    # Bumped on every change so "threads changed since cursor" is an index range scan.
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=thread_change_seq.next_value(),
+        onupdate=thread_change_seq.next_value(),
+        index=True,
+        nullable=False,
+    )
+    change_xid: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=text(CURRENT_XACT_ID),
+        onupdate=literal_column(CURRENT_XACT_ID),
+        index=True,
+        nullable=False,
+    )
+
+
+class MailThreadRef(Base):
+    """Maps every Message-ID seen or referenced so far to its thread."""
+
+    __tablename__ = "mail_thread_refs"
+
+    message_id: Mapped[str] = mapped_column(String(998), primary_key=True)
+    thread_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("mail_threads.id"), index=True, nullable=False
+    )
+
+
+class MailMessage(Base):
+    """Header-level index entry for a message; bodies live on disk and load on demand."""
+
+    __tablename__ = "mail_messages"
+    __table_args__ = (
+        UniqueConstraint("folder", "uid", name="uq_mail_messages_folder_uid"),
+        Index("ix_mail_messages_thread_sent", "thread_id", "sent_at"),
+        # Keeps "what still needs threading" cheap however large the mailbox grows.
+        Index("ix_mail_messages_unthreaded", "sent_at", postgresql_where=text("thread_id IS NULL")),
+        Index(
+            "ix_mail_messages_untriaged",
+            "received_at",
+            postgresql_where=text("triage_label IS NULL"),
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    folder: Mapped[str] = mapped_column(String(255), nullable=False)
+    uid: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    message_id: Mapped[str | None] = mapped_column(String(998), index=True, nullable=True)
+    in_reply_to: Mapped[str | None] = mapped_column(String(998), nullable=True)
+    references: Mapped[str | None] = mapped_column(Text, nullable=True)
+    subject: Mapped[str | None] = mapped_column(Text, nullable=True)
+    from_addr: Mapped[str | None] = mapped_column(String(998), nullable=True)
+    to_addrs: Mapped[str | None] = mapped_column(Text, nullable=True)
+    sent_at: Mapped[dt.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    received_at: Mapped[dt.datetime | None] = mapped_column(
+        DateTime(timezone=True), index=True, nullable=True
+    )
+    size: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    flags: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    thread_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("mail_threads.id"), nullable=True
+    )
+    parent_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("mail_messages.id", ondelete="SET NULL"), nullable=True
+    )
+    # One of services.triage.TRIAGE_LABELS once the message has been classified.
+    triage_label: Mapped[str | None] = mapped_column(String(16), nullable=True)
+
+
+class CalendarAccess(Base):
+    """A user's right to read a calendar collection, as its owner or a sharee."""
+
+    __tablename__ = "calendar_access"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    calendar_url: Mapped[str] = mapped_column(String(1024), primary_key=True)
+    # "owner" or "shared"
+    role: Mapped[str] = mapped_column(String(16), nullable=False, default="owner")
+    created_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class CalendarCollectionState(Base):
+    """CalDAV sync checkpoint for one calendar collection."""
+
+    __tablename__ = "calendar_collection_states"
+
+    url: Mapped[str] = mapped_column(String(1024), primary_key=True)
+    sync_token: Mapped[str | None] = mapped_column(Text, nullable=True)
+    ctag: Mapped[str | None] = mapped_column(Text, nullable=True)
+    synced_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
+class CalendarEvent(Base):
+    """Locally persisted copy of a CalDAV event resource."""
+
+    __tablename__ = "calendar_events"
+    __table_args__ = (
+        UniqueConstraint("calendar_url", "href", name="uq_calendar_events_calendar_href"),
+        Index("ix_calendar_events_span", "span", postgresql_using="gist"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    calendar_url: Mapped[str] = mapped_column(String(1024), nullable=False)
+    href: Mapped[str] = mapped_column(String(1024), nullable=False)
+    etag: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    uid: Mapped[str | None] = mapped_column(String(1024), index=True, nullable=True)
+    summary: Mapped[str | None] = mapped_column(Text, nullable=True)
+    starts_at: Mapped[dt.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    ends_at: Mapped[dt.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    all_day: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    rrule: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # False for TRANSP:TRANSPARENT and cancelled events, which do not block free/busy time.
+    busy: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=True, server_default=text("true")
+    )
+    # Occupied time of a one-off event; GiST-indexed so window queries are range lookups.
+    # Zero-length events get '[]': an empty '[)' range overlaps nothing and would never match.
+    span: Mapped[Range[dt.datetime] | None] = mapped_column(
+        TSTZRANGE,
+        Computed(
+            "tstzrange(starts_at, ends_at, CASE WHEN starts_at = ends_at THEN '[]' ELSE '[)' END)",
+            persisted=True,
+        ),
+        nullable=True,
+    )
+    ical: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
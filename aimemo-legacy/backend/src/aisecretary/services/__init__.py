@@ -1,7 +1,18 @@
 """Service layer abstractions for external integrations."""
 
 from .auth import AuthService
-from .email import EmailService
+from .email import EmailService, OutgoingEmail
 from .calendar import CalendarService
+from .llm import StructuredOutputClient
+from .password_reset import PasswordResetDispatcher
+from .triage import TriagePipeline
 
-__all__ = ["EmailService", "CalendarService", "AuthService"]
+__all__ = [
+    "EmailService",
+    "OutgoingEmail",
+    "CalendarService",
+    "AuthService",
+    "PasswordResetDispatcher",
+    "StructuredOutputClient",
+    "TriagePipeline",
+]
@@ -0,0 +1,360 @@
+"""Agenda queries over locally synced calendar events."""
+
+from __future__ import annotations
+
+import datetime as dt
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Generic, Hashable, Sequence, TypeVar
+
+import structlog
+from dateutil.rrule import rruleset, rrulestr
+from icalendar import Calendar
+from sqlalchemy import func, select
+
+from ..models import CalendarEvent
+from ..storage import Database
+from .caldav_sync import blocks_time
+
+logger = structlog.get_logger(__name__)
+
+# Expansions are cached per fixed UTC week so "today" and "this week" share entries.
+BUCKET = dt.timedelta(days=7)
+_EPOCH = dt.datetime(1970, 1, 5, tzinfo=dt.timezone.utc)  # a Monday
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_Override = tuple[dt.datetime, dt.datetime, str | None, bool]
+
+
+@dataclass(frozen=True)
+class AgendaOccurrence:
+    """One concrete appearance of an event inside a query window."""
+
+    event_id: uuid.UUID
+    calendar_url: str
+    summary: str | None
+    starts_at: dt.datetime
+    ends_at: dt.datetime
+    all_day: bool
+    recurring: bool
+    # False when the event is transparent or cancelled and leaves the time free.
+    busy: bool = True
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "event_id": str(self.event_id),
+            "calendar_url": self.calendar_url,
+            "summary": self.summary,
+            "starts_at": self.starts_at.isoformat(),
+            "ends_at": self.ends_at.isoformat(),
+            "all_day": self.all_day,
+            "recurring": self.recurring,
+            "busy": self.busy,
+        }
+
+
+class _LRU(Generic[K, V]):
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[K, V] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> V | None:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+def _to_utc(value: dt.date | dt.datetime) -> dt.datetime:
+    if not isinstance(value, dt.datetime):
+        return dt.datetime.combine(value, dt.time.min, tzinfo=dt.timezone.utc)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=dt.timezone.utc)
+    return value.astimezone(dt.timezone.utc)
+
+
+def _overlaps(
+    starts_at: dt.datetime, ends_at: dt.datetime, start: dt.datetime, end: dt.datetime
+) -> bool:
+    # Zero-length events count when they sit inside the window.
+    return starts_at < end and (ends_at > start or starts_at >= start)
+
+
+def _property_dates(component: Any, name: str) -> list[dt.datetime]:
+    values = component.get(name)
+    if values is None:
+        return []
+    if not isinstance(values, list):
+        values = [values]
+    dates = []
+    for value in values:
+        for entry in getattr(value, "dts", []):
+            if isinstance(entry.dt, (dt.date, dt.datetime)):
+                dates.append(entry.dt)
+    return dates
+
+
+class RecurringSeries:
+    """A parsed recurring VEVENT that can be expanded over any window."""
+
+    def __init__(self, event_id: uuid.UUID, calendar_url: str, ical: str) -> None:
+        calendar = Calendar.from_ical(ical)
+        events = list(calendar.walk("VEVENT"))
+        master = next(event for event in events if "RECURRENCE-ID" not in event)
+        start = master.decoded("DTSTART")
+        self.event_id = event_id
+        self.calendar_url = calendar_url
+        self.summary = str(master.get("SUMMARY")) if master.get("SUMMARY") else None
+        self.all_day = not isinstance(start, dt.datetime)
+        self.busy = blocks_time(master)
+        if "DTEND" in master:
+            self.duration = _to_utc(master.decoded("DTEND")) - _to_utc(start)
+        elif "DURATION" in master:
+            self.duration = master.decoded("DURATION")
+        else:
+            self.duration = dt.timedelta(days=1) if self.all_day else dt.timedelta()
+
+        # Expand in the series' own zone so DST shifts land correctly. All-day and
+        # floating series carry no zone; they are expanded naive and read as UTC.
+        self._floating = not isinstance(start, dt.datetime) or start.tzinfo is None
+        self._rules = rruleset()
+        rule = master.get("RRULE")
+        if rule is not None:
+            self._rules.rrule(
+                rrulestr(rule.to_ical().decode("utf-8"), dtstart=self._rule_time(start))
+            )
+        for value in _property_dates(master, "RDATE"):
+            self._rules.rdate(self._rule_time(value))
+        for value in _property_dates(master, "EXDATE"):
+            self._rules.exdate(self._rule_time(value))
+
+        # Detached instances (RECURRENCE-ID) replace the occurrence they point at.
+        self._overrides: dict[dt.datetime, _Override | None] = {}
+        for event in events:
+            if "RECURRENCE-ID" not in event:
+                continue
+            recurrence_id = _to_utc(event.decoded("RECURRENCE-ID"))
+            if str(event.get("STATUS", "")).upper() == "CANCELLED":
+                self._overrides[recurrence_id] = None
+                continue
+            override_start = _to_utc(event.decoded("DTSTART", recurrence_id))
+            if "DTEND" in event:
+                override_end = _to_utc(event.decoded("DTEND"))
+            else:
+                override_end = override_start + self.duration
+            summary = str(event.get("SUMMARY")) if event.get("SUMMARY") else self.summary
+            busy = blocks_time(event) if "TRANSP" in event else self.busy
+            self._overrides[recurrence_id] = (override_start, override_end, summary, busy)
+
+    def _rule_time(self, value: dt.date | dt.datetime) -> dt.datetime:
+        if self._floating:
+            return _to_utc(value).replace(tzinfo=None)
+        if isinstance(value, dt.datetime) and value.tzinfo is not None:
+            return value
+        return _to_utc(value)
+
+    def expand(self, start: dt.datetime, end: dt.datetime) -> list[AgendaOccurrence]:
+        """Return occurrences overlapping ``[start, end)``."""
+        occurrences = []
+        candidates = self._rules.between(
+            self._rule_time(start - self.duration), self._rule_time(end), inc=True
+        )
+        for occurrence in candidates:
+            occurrence_start = _to_utc(occurrence)
+            if occurrence_start in self._overrides:
+                continue
+            occurrence_end = occurrence_start + self.duration
+            if _overlaps(occurrence_start, occurrence_end, start, end):
+                occurrences.append(
+                    AgendaOccurrence(
+                        self.event_id,
+                        self.calendar_url,
+                        self.summary,
+                        occurrence_start,
+                        occurrence_end,
+                        self.all_day,
+                        True,
+                        self.busy,
+                    )
+                )
+        for override in self._overrides.values():
+            if override is None:
+                continue
+            override_start, override_end, summary, busy = override
+            if _overlaps(override_start, override_end, start, end):
+                occurrences.append(
+                    AgendaOccurrence(
+                        self.event_id,
+                        self.calendar_url,
+                        summary,
+                        override_start,
+                        override_end,
+                        self.all_day,
+                        True,
+                        busy,
+                    )
+                )
+        return occurrences
+
+
+def _buckets(start: dt.datetime, end: dt.datetime) -> list[int]:
+    first = (start - _EPOCH) // BUCKET
+    last = (end - _EPOCH - dt.timedelta(microseconds=1)) // BUCKET
+    return list(range(first, last + 1))
+
+
+class RecurrenceCache:
+    """Caches parsed series and their per-week expansions.
+
+    Keys include the event's etag, so an edited series misses naturally and its
+    stale entries age out of the LRU.
+    """
+
+    def __init__(self, max_series: int = 2048, max_expansions: int = 32768) -> None:
+        self._series: _LRU[tuple[uuid.UUID, str | None], RecurringSeries] = _LRU(max_series)
+        self._expansions: _LRU[tuple[uuid.UUID, str | None, int], list[AgendaOccurrence]] = _LRU(
+            max_expansions
+        )
+
+    def series(self, event_id: uuid.UUID, etag: str | None) -> RecurringSeries | None:
+        return self._series.get((event_id, etag))
+
+    def add_series(self, etag: str | None, series: RecurringSeries) -> None:
+        self._series.put((series.event_id, etag), series)
+
+    def expand(
+        self, series: RecurringSeries, etag: str | None, start: dt.datetime, end: dt.datetime
+    ) -> list[AgendaOccurrence]:
+        occurrences: dict[tuple[dt.datetime, dt.datetime], AgendaOccurrence] = {}
+        for bucket in _buckets(start, end):
+            key = (series.event_id, etag, bucket)
+            expanded = self._expansions.get(key)
+            if expanded is None:
+                bucket_start = _EPOCH + bucket * BUCKET
+                expanded = series.expand(bucket_start, bucket_start + BUCKET)
+                self._expansions.put(key, expanded)
+            for occurrence in expanded:
+                if _overlaps(occurrence.starts_at, occurrence.ends_at, start, end):
+                    occurrences[(occurrence.starts_at, occurrence.ends_at)] = occurrence
+        return list(occurrences.values())
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "series_hits": self._series.hits,
+            "series_misses": self._series.misses,
+            "expansion_hits": self._expansions.hits,
+            "expansion_misses": self._expansions.misses,
+        }
+
+
+class AgendaService:
+    """Answers "what is on between start and end" from the local event table.
+
+    One-off events come from a GiST range lookup on ``calendar_events.span``.
+    Recurring series are expanded lazily for the requested window only, through
+    ``RecurrenceCache``.
+    """
+
+    def __init__(self, db: Database, cache: RecurrenceCache | None = None) -> None:
+        self._db = db
+        self.cache = cache or RecurrenceCache()
+
+    async def agenda(
+        self,
+        start: dt.datetime,
+        end: dt.datetime,
+        *,
+        calendar_urls: Sequence[str] | None = None,
+    ) -> list[AgendaOccurrence]:
+        """Return every occurrence overlapping ``[start, end)``, ordered by start.
+
+        ``calendar_urls`` restricts the query to those collections.
+        """
+        start, end = _to_utc(start), _to_utc(end)
+        window = func.tstzrange(start, end, "[)")
+        scope = [] if calendar_urls is None else [CalendarEvent.calendar_url.in_(calendar_urls)]
+        async with self._db.read_session() as session:
+            single_rows = (
+                await session.execute(
+                    select(
+                        CalendarEvent.id,
+                        CalendarEvent.calendar_url,
+                        CalendarEvent.summary,
+                        CalendarEvent.starts_at,
+                        CalendarEvent.ends_at,
+                        CalendarEvent.all_day,
+                        CalendarEvent.busy,
+                    ).where(
+                        CalendarEvent.rrule.is_(None),
+                        CalendarEvent.span.op("&&")(window),
+                        *scope,
+                    )
+                )
+            ).all()
+            series_rows = (
+                await session.execute(
+                    select(CalendarEvent.id, CalendarEvent.etag).where(
+                        CalendarEvent.rrule.is_not(None), CalendarEvent.starts_at < end, *scope
+                    )
+                )
+            ).all()
+            series: dict[uuid.UUID, tuple[str | None, RecurringSeries]] = {}
+            missing = []
+            for row in series_rows:
+                cached = self.cache.series(row.id, row.etag)
+                if cached is None:
+                    missing.append(row.id)
+                else:
+                    series[row.id] = (row.etag, cached)
+            if missing:
+                # Only pull the raw iCalendar text for series we have not parsed yet.
+                ical_rows = await session.execute(
+                    select(
+                        CalendarEvent.id,
+                        CalendarEvent.calendar_url,
+                        CalendarEvent.etag,
+                        CalendarEvent.ical,
+                    ).where(CalendarEvent.id.in_(missing))
+                )
+                for row in ical_rows:
+                    try:
+                        parsed = RecurringSeries(row.id, row.calendar_url, row.ical)
+                    except (ValueError, StopIteration, KeyError) as exc:
+                        logger.warning(
+                            "agenda.series.unparseable", event_id=str(row.id), error=str(exc)
+                        )
+                        continue
+                    self.cache.add_series(row.etag, parsed)
+                    series[row.id] = (row.etag, parsed)
+
+        occurrences = [
+            AgendaOccurrence(
+                row.id,
+                row.calendar_url,
+                row.summary,
+                row.starts_at,
+                row.ends_at,
+                row.all_day,
+                False,
+                row.busy,
+            )
+            for row in single_rows
+        ]
+        for etag, parsed in series.values():
+            occurrences.extend(self.cache.expand(parsed, etag, start, end))
+        occurrences.sort(key=lambda occurrence: (occurrence.starts_at, occurrence.ends_at))
+        return occurrences
@@ -3,16 +3,18 @@
 from __future__ import annotations
 
 import datetime as dt
+import hashlib
+import secrets
 from typing import Any
 
 import jwt
 import structlog
 from passlib.context import CryptContext
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.exc import IntegrityError
 
 from ..config import Settings
-from ..models import User
+from ..models import PasswordResetToken, User
 from ..storage import Database
 
 LOGGER = structlog.get_logger(__name__)
@@ -35,6 +37,7 @@ class AuthService:
         self._jwt_secret = settings.jwt_secret
         self._jwt_algorithm = "HS256"
         self._jwt_exp_minutes = settings.jwt_exp_minutes
+        self._reset_ttl = dt.timedelta(minutes=settings.password_reset_ttl_minutes)
 
     async def register_user(self, *, email: str, password: str) -> User:
         """Create a new user record with hashed password."""
@@ -54,7 +57,7 @@ class AuthService:
     async def authenticate(self, *, email: str, password: str) -> User:
         """Validate credentials and return the matching user."""
         normalized_email = email.strip().lower()
-        async with self._db.session() as session:
+        async with self._db.read_session() as session:
             statement = select(User).where(User.email == normalized_email)
             result = await session.execute(statement)
             user = result.scalar_one_or_none()
@@ -81,15 +84,69 @@ class AuthService:
         """Decode and validate a JWT token."""
         return jwt.decode(token, self._jwt_secret, algorithms=[self._jwt_algorithm])
 
-    async def initiate_password_reset(self, *, email: str) -> None:
-        """Placeholder flow for forgot-password."""
+    @staticmethod
+    def _hash_reset_token(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    async def initiate_password_reset(self, *, email: str) -> str | None:
+        """Issue a reset token for ``email``; return it, or None for unknown accounts.
+
+        Only the token's SHA-256 hash is stored, so a database leak does not expose
+        usable reset links.
+        """
         normalized_email = email.strip().lower()
-        async with self._db.session() as session:
+        async with self._db.read_session() as session:
             statement = select(User).where(User.email == normalized_email)
             result = await session.execute(statement)
             user = result.scalar_one_or_none()
             if not user:
                 LOGGER.info("auth.forgot_password.unknown_email", email=normalized_email)
-                return
+                return None
 
+        token = secrets.token_urlsafe(32)
+        async with self._db.session() as session:
+            session.add(
+                PasswordResetToken(
+                    user_id=user.id,
+                    token_hash=self._hash_reset_token(token),
+                    expires_at=dt.datetime.now(dt.timezone.utc) + self._reset_ttl,
+                )
+            )
         LOGGER.info("auth.forgot_password.requested", email=normalized_email)
+        return token
+
+    async def reset_password(self, *, token: str, password: str) -> User:
+        """Consume a reset token and set a new password for its user."""
+        now = dt.datetime.now(dt.timezone.utc)
+        async with self._db.session() as session:
+            statement = (
+                select(PasswordResetToken)
+                .where(
+                    PasswordResetToken.token_hash == self._hash_reset_token(token),
+                    PasswordResetToken.expires_at > now,
+                )
+                .with_for_update()
+            )
+            result = await session.execute(statement)
+            reset_token = result.scalar_one_or_none()
+            if reset_token is None:
+                raise AuthError("Invalid or expired reset token")
+            user = await session.get(User, reset_token.user_id)
+            if user is None:
+                raise AuthError("Invalid or expired reset token")
+            user.password_hash = self._pwd_context.hash(password)
+            # Consuming one token invalidates every outstanding link for the user.
+            await session.execute(
+                delete(PasswordResetToken).where(PasswordResetToken.user_id == user.id)
+            )
+            LOGGER.info("auth.reset_password.completed", user_id=str(user.id))
+            return user
+
+    async def purge_expired_reset_tokens(self) -> int:
+        """Delete expired reset tokens and return how many were removed."""
+        now = dt.datetime.now(dt.timezone.utc)
+        async with self._db.session() as session:
+            result = await session.execute(
+                delete(PasswordResetToken).where(PasswordResetToken.expires_at <= now)
+            )
+            return result.rowcount or 0
@@ -0,0 +1,406 @@
+"""Incremental CalDAV synchronisation into the local event table."""
+
+from __future__ import annotations
+
+import datetime as dt
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator
+from xml.sax.saxutils import escape
+
+import httpx
+import structlog
+from icalendar import Calendar
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from ..config import Settings
+from ..models import CalendarCollectionState, CalendarEvent
+from ..storage import Database
+
+logger = structlog.get_logger(__name__)
+
+DAV = "DAV:"
+CALDAV = "urn:ietf:params:xml:ns:caldav"
+CALSERVER = "http://calendarserver.org/ns/"
+
+_SYNC_COLLECTION = """<?xml version="1.0" encoding="utf-8"?>
+<d:sync-collection xmlns:d="DAV:">
+  <d:sync-token>{token}</d:sync-token>
+  <d:sync-level>1</d:sync-level>
+  <d:prop><d:getetag/><d:resourcetype/></d:prop>
+</d:sync-collection>"""
+
+_PROPFIND_CTAG = """<?xml version="1.0" encoding="utf-8"?>
+<d:propfind xmlns:d="DAV:" xmlns:cs="http://calendarserver.org/ns/">
+  <d:prop><cs:getctag/></d:prop>
+</d:propfind>"""
+
+_PROPFIND_ETAGS = """<?xml version="1.0" encoding="utf-8"?>
+<d:propfind xmlns:d="DAV:">
+  <d:prop><d:getetag/><d:resourcetype/></d:prop>
+</d:propfind>"""
+
+_MULTIGET = """<?xml version="1.0" encoding="utf-8"?>
+<c:calendar-multiget xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+  <d:prop><d:getetag/><c:calendar-data/></d:prop>
+  {hrefs}
+</c:calendar-multiget>"""
+
+
+class CalDavSyncError(Exception):
+    """Raised when the CalDAV server returns an unexpected response."""
+
+
+class _SyncTokenUnsupported(Exception):
+    """sync-collection is unavailable or the stored token was rejected."""
+
+    def __init__(self, token_invalid: bool) -> None:
+        super().__init__("sync-collection unavailable")
+        self.token_invalid = token_invalid
+
+
+@dataclass
+class _DavResponse:
+    href: str
+    status: int
+    props: dict[str, str | None] = field(default_factory=dict)
+
+
+@dataclass
+class CalendarSyncResult:
+    """What changed in one calendar during a sync pass."""
+
+    calendar_url: str
+    changed_hrefs: list[str] = field(default_factory=list)
+    deleted_hrefs: list[str] = field(default_factory=list)
+    mode: str = "sync-token"
+    round_trips: int = 0
+
+
+def _status_code(text: str | None) -> int:
+    # "HTTP/1.1 200 OK" -> 200
+    parts = (text or "").split()
+    return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+
+def _parse_multistatus(body: bytes) -> tuple[list[_DavResponse], str | None]:
+    root = ET.fromstring(body)
+    responses: list[_DavResponse] = []
+    for node in root.iter(f"{{{DAV}}}response"):
+        href = node.findtext(f"{{{DAV}}}href") or ""
+        direct_status = node.findtext(f"{{{DAV}}}status")
+        if direct_status is not None:
+            responses.append(_DavResponse(href=href, status=_status_code(direct_status)))
+            continue
+        props: dict[str, str | None] = {}
+        status = 0
+        for propstat in node.iter(f"{{{DAV}}}propstat"):
+            code = _status_code(propstat.findtext(f"{{{DAV}}}status"))
+            if code != 200:
+                continue
+            status = 200
+            for prop in propstat.iter(f"{{{DAV}}}prop"):
+                for child in prop:
+                    if child.tag == f"{{{DAV}}}resourcetype":
+                        props[child.tag] = ",".join(grand.tag for grand in child)
+                    else:
+                        props[child.tag] = child.text
+        responses.append(_DavResponse(href=href, status=status, props=props))
+    return responses, root.findtext(f"{{{DAV}}}sync-token")
+
+
+def _is_collection(member: _DavResponse) -> bool:
+    return f"{{{DAV}}}collection" in (member.props.get(f"{{{DAV}}}resourcetype") or "")
+
+
+def _batches(values: list[str], size: int) -> Iterator[list[str]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _as_utc(value: dt.date | dt.datetime) -> tuple[dt.datetime, bool]:
+    if not isinstance(value, dt.datetime):
+        return dt.datetime.combine(value, dt.time.min, tzinfo=dt.timezone.utc), True
+    if value.tzinfo is None:
+        # Floating time; treat as UTC until per-user time zones exist.
+        return value.replace(tzinfo=dt.timezone.utc), False
+    return value.astimezone(dt.timezone.utc), False
+
+
+def blocks_time(event: Any) -> bool:
+    """Whether a VEVENT makes its attendee busy, per its TRANSP and STATUS."""
+    transparent = str(event.get("TRANSP", "")).upper() == "TRANSPARENT"
+    return not transparent and str(event.get("STATUS", "")).upper() != "CANCELLED"
+
+
+def parse_event(ical: str) -> dict[str, Any]:
+    """Extract the master VEVENT's indexed fields from an iCalendar payload."""
+    calendar = Calendar.from_ical(ical)
+    events = list(calendar.walk("VEVENT"))
+    master = next((event for event in events if "RECURRENCE-ID" not in event), None)
+    master = master or (events[0] if events else None)
+    if master is None:
+        return {
+            "uid": None,
+            "summary": None,
+            "starts_at": None,
+            "ends_at": None,
+            "all_day": False,
+            "rrule": None,
+            "busy": True,
+        }
+
+    starts_at = ends_at = None
+    all_day = False
+    if "DTSTART" in master:
+        starts_at, all_day = _as_utc(master.decoded("DTSTART"))
+    if "DTEND" in master:
+        ends_at, _ = _as_utc(master.decoded("DTEND"))
+    elif starts_at is not None and "DURATION" in master:
+        ends_at = starts_at + master.decoded("DURATION")
+    elif starts_at is not None:
+        ends_at = starts_at + (dt.timedelta(days=1) if all_day else dt.timedelta())
+    if starts_at is not None and ends_at is not None and ends_at < starts_at:
+        ends_at = starts_at
+
+    rrule = master.get("RRULE")
+    return {
+        "uid": str(master.get("UID")) if master.get("UID") else None,
+        "summary": str(master.get("SUMMARY")) if master.get("SUMMARY") else None,
+        "starts_at": starts_at,
+        "ends_at": ends_at,
+        "all_day": all_day,
+        "rrule": rrule.to_ical().decode("utf-8") if rrule else None,
+        "busy": blocks_time(master),
+    }
+
+
+class CalDavSyncEngine:
+    """Mirrors CalDAV collections into ``calendar_events`` fetching only changes.
+
+    Each pass first tries the RFC 6578 ``sync-collection`` REPORT with the stored
+    sync-token, which lists changed and deleted members since the last pass. When
+    a server lacks it, the collection's ctag is compared and, only if it moved,
+    member etags are diffed against the local table. Changed events are then
+    downloaded with ``calendar-multiget`` in batches of
+    ``CALDAV_MULTIGET_BATCH_SIZE`` hrefs, so round trips grow with the number of
+    changes rather than the size of the calendar.
+
+    Radicale (``python -m radicale``) works as a local stand-in server.
+    """
+
+    def __init__(self, db: Database, settings: Settings) -> None:
+        self._db = db
+        self._settings = settings
+
+    def _client(self) -> httpx.AsyncClient:
+        auth = None
+        if self._settings.caldav_username:
+            auth = (self._settings.caldav_username, self._settings.caldav_password or "")
+        return httpx.AsyncClient(auth=auth, timeout=self._settings.caldav_timeout_seconds)
+
+    async def sync(self, calendar_urls: Iterable[str] | None = None) -> list[CalendarSyncResult]:
+        """Sync each configured calendar collection and report what changed."""
+        results = []
+        async with self._client() as client:
+            for url in calendar_urls or self._settings.caldav_calendar_urls:
+                results.append(await self._sync_collection(client, url))
+        return results
+
+    async def _sync_collection(self, client: httpx.AsyncClient, url: str) -> CalendarSyncResult:
+        async with self._db.read_session() as session:
+            state = await session.get(CalendarCollectionState, url)
+        result = CalendarSyncResult(calendar_url=url)
+        sync_token = state.sync_token if state else None
+        ctag = state.ctag if state else None
+
+        try:
+            changed, deleted, sync_token = await self._changes_by_sync_token(
+                client, url, sync_token, result
+            )
+        except _SyncTokenUnsupported as exc:
+            if exc.token_invalid:
+                # RFC 6578 3.8: start over with a full listing. It reports no deletions, so
+                # whatever is stored locally but no longer listed was deleted meanwhile.
+                logger.info("calendar.sync.token_invalid", url=url)
+                changed, _, sync_token = await self._changes_by_sync_token(
+                    client, url, None, result
+                )
+                listed = set(changed)
+                deleted = [href for href in await self._local_etags(url) if href not in listed]
+            else:
+                result.mode = "etag"
+                sync_token = None
+                changed, deleted, ctag = await self._changes_by_etag(client, url, ctag, result)
+
+        for batch in _batches(changed, self._settings.caldav_multiget_batch_size):
+            await self._store_events(url, await self._multiget(client, url, batch, result))
+        await self._delete_events(url, deleted)
+        await self._save_state(url, sync_token, ctag)
+
+        result.changed_hrefs, result.deleted_hrefs = changed, deleted
+        logger.info(
+            "calendar.sync.collection",
+            url=url,
+            mode=result.mode,
+            changed=len(changed),
+            deleted=len(deleted),
+            round_trips=result.round_trips,
+        )
+        return result
+
+    async def _request(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        body: str,
+        depth: str,
+        result: CalendarSyncResult,
+    ) -> httpx.Response:
+        result.round_trips += 1
+        return await client.request(
+            method,
+            url,
+            content=body.encode("utf-8"),
+            headers={"Depth": depth, "Content-Type": "application/xml; charset=utf-8"},
+        )
+
+    async def _changes_by_sync_token(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        token: str | None,
+        result: CalendarSyncResult,
+    ) -> tuple[list[str], list[str], str | None]:
+        changed: dict[str, None] = {}
+        deleted: dict[str, None] = {}
+        while True:
+            body = _SYNC_COLLECTION.format(token=escape(token or ""))
+            response = await self._request(client, "REPORT", url, body, "1", result)
+            if response.status_code != 207:
+                raise _SyncTokenUnsupported(
+                    token_invalid=bool(token) and b"valid-sync-token" in response.content
+                )
+            members, new_token = _parse_multistatus(response.content)
+            truncated = False
+            for member in members:
+                if member.status == 507:
+                    truncated = True
+                elif member.status == 404:
+                    changed.pop(member.href, None)
+                    deleted[member.href] = None
+                elif member.status == 200 and not _is_collection(member):
+                    deleted.pop(member.href, None)
+                    changed[member.href] = None
+            token = new_token or token
+            if not truncated:
+                return list(changed), list(deleted), token
+
+    async def _changes_by_etag(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        ctag: str | None,
+        result: CalendarSyncResult,
+    ) -> tuple[list[str], list[str], str | None]:
+        response = await self._request(client, "PROPFIND", url, _PROPFIND_CTAG, "0", result)
+        if response.status_code != 207:
+            raise CalDavSyncError(f"PROPFIND {url} returned {response.status_code}")
+        members, _ = _parse_multistatus(response.content)
+        new_ctag = next(
+            (m.props.get(f"{{{CALSERVER}}}getctag") for m in members if m.status == 200), None
+        )
+        if ctag is not None and new_ctag == ctag:
+            return [], [], ctag
+
+        response = await self._request(client, "PROPFIND", url, _PROPFIND_ETAGS, "1", result)
+        if response.status_code != 207:
+            raise CalDavSyncError(f"PROPFIND {url} returned {response.status_code}")
+        members, _ = _parse_multistatus(response.content)
+        remote = {
+            m.href: m.props.get(f"{{{DAV}}}getetag")
+            for m in members
+            if m.status == 200 and not _is_collection(m)
+        }
+        local = await self._local_etags(url)
+        changed = [href for href, etag in remote.items() if local.get(href) != etag]
+        deleted = [href for href in local if href not in remote]
+        return changed, deleted, new_ctag
+
+    async def _local_etags(self, url: str) -> dict[str, str | None]:
+        async with self._db.read_session() as session:
+            rows = await session.execute(
+                select(CalendarEvent.href, CalendarEvent.etag).where(
+                    CalendarEvent.calendar_url == url
+                )
+            )
+            return dict(rows.tuples().all())
+
+    async def _multiget(
+        self, client: httpx.AsyncClient, url: str, hrefs: list[str], result: CalendarSyncResult
+    ) -> list[dict[str, Any]]:
+        body = _MULTIGET.format(
+            hrefs="\n  ".join(f"<d:href>{escape(href)}</d:href>" for href in hrefs)
+        )
+        response = await self._request(client, "REPORT", url, body, "1", result)
+        if response.status_code != 207:
+            raise CalDavSyncError(f"calendar-multiget {url} returned {response.status_code}")
+        members, _ = _parse_multistatus(response.content)
+        records = []
+        for member in members:
+            ical = member.props.get(f"{{{CALDAV}}}calendar-data")
+            if member.status != 200 or not ical:
+                continue
+            try:
+                fields = parse_event(ical)
+            except ValueError as exc:
+                logger.warning("calendar.sync.unparseable", href=member.href, error=str(exc))
+                continue
+            records.append(
+                {
+                    "calendar_url": url,
+                    "href": member.href,
+                    "etag": member.props.get(f"{{{DAV}}}getetag"),
+                    "ical": ical,
+                    **fields,
+                }
+            )
+        return records
+
+    async def _store_events(self, url: str, records: list[dict[str, Any]]) -> None:
+        if not records:
+            return
+        statement = insert(CalendarEvent).values(records)
+        updates: dict[str, Any] = {
+            column: getattr(statement.excluded, column)
+            for column in records[0]
+            if column not in ("calendar_url", "href")
+        }
+        statement = statement.on_conflict_do_update(
+            constraint="uq_calendar_events_calendar_href",
+            set_={**updates, "updated_at": func.now()},
+        )
+        async with self._db.session() as session:
+            await session.execute(statement)
+
+    async def _delete_events(self, url: str, hrefs: list[str]) -> None:
+        if not hrefs:
+            return
+        async with self._db.session() as session:
+            for batch in _batches(hrefs, 1000):
+                await session.execute(
+                    delete(CalendarEvent).where(
+                        CalendarEvent.calendar_url == url, CalendarEvent.href.in_(batch)
+                    )
+                )
+
+    async def _save_state(self, url: str, sync_token: str | None, ctag: str | None) -> None:
+        values = {"sync_token": sync_token, "ctag": ctag}
+        statement = insert(CalendarCollectionState).values(url=url, **values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CalendarCollectionState.url], set_={**values, "synced_at": func.now()}
+        )
+        async with self._db.session() as session:
+            await session.execute(statement)
@@ -1,25 +1,125 @@
-"""Calendar integration skeleton."""
+"""Calendar integration."""
 
 from __future__ import annotations
 
+import datetime as dt
+import uuid
+from collections import defaultdict
+from typing import Iterable, Sequence
+
 import structlog
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 
 from ..config import Settings
+from ..models import CalendarAccess
+from ..storage import Database
+from .agenda import AgendaOccurrence, AgendaService
+from .caldav_sync import CalDavSyncEngine, CalendarSyncResult
+from .free_busy import FreeSlot, Interval, WorkingHours, find_free_slots
 
 logger = structlog.get_logger(__name__)
 
 
 class CalendarService:
-    """Placeholder service for CalDAV calendar access."""
+    """Service for CalDAV calendar access."""
 
-    def __init__(self, settings: Settings) -> None:
+    def __init__(self, settings: Settings, db: Database) -> None:
         self._settings = settings
+        self._db = db
+        self._sync_engine = CalDavSyncEngine(db, settings)
+        self._agenda = AgendaService(db)
 
-    async def sync_events(self) -> None:
-        """Fetch calendar events and persist locally."""
+    async def sync_events(self) -> list[CalendarSyncResult]:
+        """Fetch changed calendar events and persist them locally."""
         logger.info("calendar.sync.start")
-        # TODO: integrate with CalDAV via caldav library
-        logger.info("calendar.sync.end")
+        results = await self._sync_engine.sync()
+        logger.info(
+            "calendar.sync.end",
+            changed=sum(len(result.changed_hrefs) for result in results),
+            deleted=sum(len(result.deleted_hrefs) for result in results),
+        )
+        return results
+
+    async def agenda(
+        self,
+        user_id: uuid.UUID,
+        start: dt.datetime,
+        end: dt.datetime,
+        *,
+        calendar_urls: Iterable[str] | None = None,
+    ) -> list[AgendaOccurrence]:
+        """Return occurrences overlapping ``[start, end)`` on calendars ``user_id`` can read.
+
+        Recurrences are expanded. ``calendar_urls`` narrows the result further;
+        collections the user was not granted are left out.
+        """
+        readable = await self.readable_calendars(user_id, calendar_urls)
+        if not readable:
+            return []
+        return await self._agenda.agenda(start, end, calendar_urls=sorted(readable))
+
+    async def grant_access(
+        self, user_id: uuid.UUID, calendar_url: str, *, role: str = "owner"
+    ) -> None:
+        """Let ``user_id`` read ``calendar_url``, as its ``owner`` or as ``shared``."""
+        if role not in ("owner", "shared"):
+            raise ValueError("role must be 'owner' or 'shared'")
+        statement = insert(CalendarAccess).values(
+            user_id=user_id, calendar_url=calendar_url, role=role
+        )
+        async with self._db.session() as session:
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[CalendarAccess.user_id, CalendarAccess.calendar_url],
+                    set_={"role": statement.excluded.role},
+                )
+            )
+
+    async def readable_calendars(
+        self, user_id: uuid.UUID, calendar_urls: Iterable[str] | None = None
+    ) -> set[str]:
+        """Return the calendars ``user_id`` owns or is shared on.
+
+        With ``calendar_urls``, only the readable subset of those is returned.
+        """
+        statement = select(CalendarAccess.calendar_url).where(CalendarAccess.user_id == user_id)
+        if calendar_urls is not None:
+            urls = set(calendar_urls)
+            if not urls:
+                return set()
+            statement = statement.where(CalendarAccess.calendar_url.in_(urls))
+        async with self._db.read_session() as session:
+            return set((await session.scalars(statement)).all())
+
+    async def find_free_slots(
+        self,
+        participants: Sequence[str],
+        window: Interval,
+        duration: dt.timedelta,
+        working_hours: WorkingHours,
+        *,
+        limit: int = 10,
+    ) -> list[FreeSlot]:
+        """Propose slots when every participant's calendar is free.
+
+        Participants are identified by their CalDAV collection URL. All-day,
+        transparent and cancelled events are treated as free time, as calendar
+        clients do by default.
+        """
+        occurrences = await self._agenda.agenda(*window, calendar_urls=participants)
+        busy: dict[str, list[Interval]] = defaultdict(list)
+        for occurrence in occurrences:
+            if occurrence.busy and not occurrence.all_day:
+                busy[occurrence.calendar_url].append((occurrence.starts_at, occurrence.ends_at))
+        slots = find_free_slots(busy, window, duration, working_hours, limit=limit)
+        logger.info(
+            "calendar.free_slots",
+            participants=len(participants),
+            busy_intervals=sum(len(intervals) for intervals in busy.values()),
+            slots=len(slots),
+        )
+        return slots
 
     async def create_event(self, *, title: str, start: str, end: str) -> None:
         """Create an event on the remote calendar."""
@@ -2,26 +2,109 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Any, Sequence
+from uuid import UUID
+
 import structlog
 
 from ..config import Settings
+from ..models import MailMessage
+from ..storage import Database
+from .mail_sync import FolderSyncResult, ImapSyncEngine
+from .mail_threads import ThreadChanges, ThreadIndex
+from .smtp_pool import SmtpPool
+from .triage import TriagePipeline
 
 logger = structlog.get_logger(__name__)
 
 
+@dataclass(frozen=True)
+class OutgoingEmail:
+    """A plain-text message queued for delivery."""
+
+    to: str
+    subject: str
+    body: str
+
+
 class EmailService:
-    """Placeholder service for iCloud email access."""
+    """Service for iCloud email access."""
 
-    def __init__(self, settings: Settings) -> None:
+    def __init__(
+        self, settings: Settings, db: Database, triage: TriagePipeline | None = None
+    ) -> None:
         self._settings = settings
+        self._sync_engine = ImapSyncEngine(db, settings)
+        self._thread_index = ThreadIndex(db)
+        self._triage = triage
+        self._smtp_pool = SmtpPool(settings)
 
-    async def pull_inbox(self) -> None:
-        """Fetch new messages from the configured provider."""
+    async def pull_inbox(self) -> list[FolderSyncResult]:
+        """Index new and changed messages in the configured IMAP folders, then thread them."""
         logger.info("email.pull_inbox.start")
-        # TODO: integrate with icloud IMAP using app-specific password
-        logger.info("email.pull_inbox.end")
+        results = await self._sync_engine.sync()
+        threads = await self._thread_index.update()
+        queued = await self._triage.enqueue_pending() if self._triage is not None else 0
+        logger.info(
+            "email.pull_inbox.end",
+            new=sum(len(result.new_uids) for result in results),
+            threads_changed=len(threads.changed_thread_ids),
+            triage_queued=queued,
+        )
+        return results
+
+    async def thread_messages(self, thread_id: UUID) -> list[MailMessage]:
+        """Return the messages in a thread, oldest first."""
+        return await self._thread_index.thread_messages(thread_id)
+
+    async def threads_changed_since(
+        self, cursor: tuple[int, int] = (0, 0), limit: int = 200
+    ) -> ThreadChanges:
+        """Return threads that changed after ``cursor`` and the cursor to resume from."""
+        return await self._thread_index.changed_since(cursor, limit)
+
+    async def fetch_body(self, *, folder: str, uid: int) -> Path:
+        """Return the on-disk path of a message body, downloading it if needed."""
+        return await self._sync_engine.fetch_body(folder, uid)
+
+    def _build_message(self, *, to: str, subject: str, body: str) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self._settings.smtp_from or self._settings.smtp_username or ""
+        message["To"] = to
+        message["Subject"] = subject
+        message.set_content(body)
+        return message
 
     async def send_message(self, *, to: str, subject: str, body: str) -> None:
-        """Send an outbound email."""
+        """Send an outbound email over a pooled SMTP session."""
+        await self._smtp_pool.send(self._build_message(to=to, subject=subject, body=body))
         logger.info("email.send", to=to, subject=subject)
-        # TODO: integrate with SMTP
+
+    async def send_many(self, emails: Sequence[OutgoingEmail]) -> list[Exception | None]:
+        """Send a batch over shared SMTP sessions; return each message's error or None."""
+        messages = [
+            self._build_message(to=email.to, subject=email.subject, body=email.body)
+            for email in emails
+        ]
+        results = await self._smtp_pool.send_many(messages)
+        logger.info(
+            "email.send_many",
+            total=len(results),
+            failed=sum(1 for error in results if error is not None),
+        )
+        return results
+
+    def triage_metrics(self) -> dict[str, Any] | None:
+        """Return triage throughput and token usage, or None when triage is off."""
+        return self._triage.metrics.snapshot() if self._triage is not None else None
+
+    def smtp_metrics(self) -> dict[str, Any]:
+        """Return delivery counters and latency percentiles for outbound mail."""
+        return self._smtp_pool.metrics.snapshot()
+
+    async def close(self) -> None:
+        """Close pooled SMTP sessions."""
+        await self._smtp_pool.close()
@@ -0,0 +1,86 @@
+"""Minimal async client for OpenAI-compatible structured outputs."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+import structlog
+
+from ..config import Settings
+
+logger = structlog.get_logger(__name__)
+
+
+class LLMError(Exception):
+    """Raised when the model call fails or returns unusable output."""
+
+
+@dataclass(frozen=True)
+class StructuredResponse:
+    """Parsed JSON output plus the token usage the provider reported."""
+
+    data: Any
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class StructuredOutputClient:
+    """Calls ``/chat/completions`` with a strict JSON schema response format.
+
+    Mirrors ``send_request_with_json_schema`` from the ``ai_requests`` helpers,
+    but is async and reports token usage so callers can account for cost.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self._settings = settings
+        self._client = httpx.AsyncClient(
+            base_url=settings.openai_base_url,
+            headers={"Authorization": f"Bearer {settings.openai_api_key}"},
+            timeout=settings.openai_timeout_seconds,
+        )
+
+    async def send_request_with_json_schema(
+        self,
+        prompt: str,
+        json_schema: dict[str, Any],
+        *,
+        system_content: str = "You are an AI.",
+        schema_name: str = "response",
+        model: str | None = None,
+    ) -> StructuredResponse:
+        payload = {
+            "model": model or self._settings.openai_model,
+            "messages": [
+                {"role": "system", "content": system_content},
+                {"role": "user", "content": prompt},
+            ],
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": schema_name, "strict": True, "schema": json_schema},
+            },
+        }
+        try:
+            response = await self._client.post("/chat/completions", json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise LLMError(f"completion request failed: {exc}") from exc
+        body = response.json()
+        message = body["choices"][0]["message"]
+        if message.get("refusal"):
+            raise LLMError(f"request was refused: {message['refusal']}")
+        try:
+            data = json.loads(message["content"])
+        except (TypeError, json.JSONDecodeError) as exc:
+            raise LLMError(f"response was not valid JSON: {exc}") from exc
+        usage = body.get("usage") or {}
+        return StructuredResponse(
+            data=data,
+            prompt_tokens=int(usage.get("prompt_tokens", 0)),
+            completion_tokens=int(usage.get("completion_tokens", 0)),
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
@@ -0,0 +1,435 @@
+"""Incremental IMAP synchronisation into the local message index."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import hashlib
+import imaplib
+import os
+import re
+from dataclasses import dataclass, field
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import structlog
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from ..config import Settings
+from ..models import MailFolderState, MailMessage
+from ..storage import Database
+
+logger = structlog.get_logger(__name__)
+
+HEADER_FIELDS = "MESSAGE-ID IN-REPLY-TO REFERENCES SUBJECT FROM TO CC DATE"
+BODY_CHUNK_BYTES = 1024 * 1024
+
+_UID_RE = re.compile(rb"UID (\d+)")
+_FLAGS_RE = re.compile(rb"FLAGS \(([^)]*)\)")
+_SIZE_RE = re.compile(rb"RFC822\.SIZE (\d+)")
+_INTERNALDATE_RE = re.compile(rb'INTERNALDATE "([^"]+)"')
+
+
+class MailSyncError(Exception):
+    """Raised when the IMAP server rejects a sync command."""
+
+
+@dataclass
+class FolderSyncResult:
+    """What changed in one folder during a sync pass."""
+
+    folder: str
+    new_uids: list[int] = field(default_factory=list)
+    flag_changed_uids: list[int] = field(default_factory=list)
+    expunged_uids: list[int] = field(default_factory=list)
+    full_resync: bool = False
+
+
+@dataclass
+class _FolderStatus:
+    exists: int
+    uidvalidity: int
+    uidnext: int
+    highestmodseq: int | None
+
+
+def _quote(folder: str) -> str:
+    return '"' + folder.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _decode(value: str | None) -> str | None:
+    if not value:
+        return None
+    try:
+        return str(make_header(decode_header(value))).strip()
+    except Exception:  # noqa: BLE001 - keep the raw header if it is malformed
+        return value.strip()
+
+
+def _parse_date(value: str | None) -> dt.datetime | None:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _chunks(values: list[int], size: int) -> Iterator[list[int]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _uid_set(uids: Iterable[int]) -> str:
+    """Compress sorted UIDs into an IMAP sequence set such as ``1:4,7,9:12``."""
+    ranges: list[str] = []
+    run_start = run_end = None
+    for uid in uids:
+        if run_end is not None and uid == run_end + 1:
+            run_end = uid
+            continue
+        if run_start is not None:
+            ranges.append(f"{run_start}:{run_end}" if run_start != run_end else str(run_start))
+        run_start = run_end = uid
+    if run_start is not None:
+        ranges.append(f"{run_start}:{run_end}" if run_start != run_end else str(run_start))
+    return ",".join(ranges)
+
+
+class _ImapMailbox:
+    """Blocking imaplib wrapper; every method is meant to run in a worker thread."""
+
+    def __init__(self, settings: Settings) -> None:
+        self._settings = settings
+        self._conn: imaplib.IMAP4 | None = None
+        self.condstore = False
+
+    def connect(self) -> None:
+        settings = self._settings
+        conn_cls = imaplib.IMAP4_SSL if settings.imap_use_ssl else imaplib.IMAP4
+        conn = conn_cls(
+            settings.imap_host, settings.imap_port, timeout=settings.imap_timeout_seconds
+        )
+        conn.login(settings.imap_username or "", settings.imap_password or "")
+        if "CONDSTORE" in conn.capabilities and "ENABLE" in conn.capabilities:
+            typ, _ = conn.enable("CONDSTORE")
+            self.condstore = typ == "OK"
+        self._conn = conn
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.logout()
+        except (imaplib.IMAP4.error, OSError):
+            pass
+        self._conn = None
+
+    @property
+    def conn(self) -> imaplib.IMAP4:
+        assert self._conn is not None, "connect() first"
+        return self._conn
+
+    def _check(self, typ: str, data: list[Any], command: str) -> list[Any]:
+        if typ != "OK":
+            raise MailSyncError(f"{command} failed: {data!r}")
+        return data
+
+    def _response_int(self, code: str) -> int | None:
+        _, values = self.conn.response(code)
+        if not values or values[0] is None:
+            return None
+        return int(values[-1])
+
+    def examine(self, folder: str) -> _FolderStatus:
+        data = self._check(*self.conn.select(_quote(folder), readonly=True), "EXAMINE")
+        exists = int(data[0] or 0)
+        uidvalidity = self._response_int("UIDVALIDITY")
+        if uidvalidity is None:
+            raise MailSyncError(f"EXAMINE {folder} returned no UIDVALIDITY")
+        uidnext = self._response_int("UIDNEXT")
+        if uidnext is None:
+            uids = self.search_uids(1)
+            uidnext = (uids[-1] + 1) if uids else 1
+        highestmodseq = self._response_int("HIGHESTMODSEQ") if self.condstore else None
+        return _FolderStatus(exists, uidvalidity, uidnext, highestmodseq)
+
+    def search_uids(self, start: int) -> list[int]:
+        data = self._check(*self.conn.uid("SEARCH", "UID", f"{start}:*"), "UID SEARCH")
+        uids = sorted(int(uid) for uid in (data[0] or b"").split())
+        # "n:*" always matches the highest UID, even when it is below n.
+        return [uid for uid in uids if uid >= start]
+
+    def fetch_headers(self, uids: list[int]) -> list[dict[str, Any]]:
+        items = f"(UID FLAGS RFC822.SIZE INTERNALDATE BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])"
+        data = self._check(*self.conn.uid("FETCH", _uid_set(uids), items), "UID FETCH")
+        parser = BytesHeaderParser()
+        records = []
+        for entry in data:
+            if not isinstance(entry, tuple):
+                continue
+            meta, raw_headers = entry
+            uid_match = _UID_RE.search(meta)
+            if not uid_match:
+                continue
+            headers = parser.parsebytes(raw_headers)
+            internal = _INTERNALDATE_RE.search(meta)
+            records.append(
+                {
+                    "uid": int(uid_match.group(1)),
+                    "flags": self._flags(meta),
+                    "size": int(m.group(1)) if (m := _SIZE_RE.search(meta)) else 0,
+                    "received_at": (
+                        dt.datetime.strptime(internal.group(1).decode(), "%d-%b-%Y %H:%M:%S %z")
+                        if internal
+                        else None
+                    ),
+                    "message_id": _decode(headers.get("Message-ID")),
+                    "in_reply_to": _decode(headers.get("In-Reply-To")),
+                    "references": _decode(headers.get("References")),
+                    "subject": _decode(headers.get("Subject")),
+                    "from_addr": _decode(headers.get("From")),
+                    "to_addrs": _decode(
+                        ", ".join(headers.get_all("To", []) + headers.get_all("Cc", []))
+                    ),
+                    "sent_at": _parse_date(headers.get("Date")),
+                }
+            )
+        return records
+
+    def fetch_changed_flags(self, last_uid: int, modseq: int) -> dict[int, str]:
+        data = self._check(
+            *self.conn.uid("FETCH", f"1:{last_uid}", "(UID FLAGS)", f"(CHANGEDSINCE {modseq})"),
+            "UID FETCH CHANGEDSINCE",
+        )
+        changed: dict[int, str] = {}
+        for entry in data:
+            meta = entry[0] if isinstance(entry, tuple) else entry
+            if not isinstance(meta, bytes) or not (uid_match := _UID_RE.search(meta)):
+                continue
+            changed[int(uid_match.group(1))] = self._flags(meta)
+        return changed
+
+    def fetch_body_chunk(self, uid: int, offset: int, length: int) -> bytes:
+        data = self._check(
+            *self.conn.uid("FETCH", str(uid), f"(BODY.PEEK[]<{offset}.{length}>)"),
+            "UID FETCH BODY",
+        )
+        for entry in data:
+            if isinstance(entry, tuple):
+                return entry[1] or b""
+        return b""
+
+    @staticmethod
+    def _flags(meta: bytes) -> str:
+        match = _FLAGS_RE.search(meta)
+        return match.group(1).decode("utf-8", "replace") if match else ""
+
+
+class ImapSyncEngine:
+    """Keeps ``mail_messages`` in step with the IMAP server without refetching.
+
+    Each folder stores its UIDVALIDITY, UIDNEXT and, when the server supports
+    CONDSTORE, HIGHESTMODSEQ. A pass fetches headers only for UIDs at or above
+    the stored UIDNEXT, in batches of ``IMAP_BATCH_SIZE``, and with CONDSTORE
+    refreshes flags changed since the stored MODSEQ. It looks for expunged UIDs
+    only when the server's message count disagrees with the index. A UIDVALIDITY
+    change discards the folder's index and bodies. Bodies are not fetched here;
+    ``fetch_body`` streams one to ``MAIL_STORE_DIR`` the first time it is needed.
+
+    Point ``IMAP_HOST``/``IMAP_PORT`` at a local server (e.g. Dovecot or GreenMail
+    with ``IMAP_USE_SSL=false``) to exercise it without a real mailbox.
+    """
+
+    def __init__(self, db: Database, settings: Settings) -> None:
+        self._db = db
+        self._settings = settings
+        self._lock = asyncio.Lock()
+
+    async def sync(self, folders: Iterable[str] | None = None) -> list[FolderSyncResult]:
+        """Sync each folder and report what changed."""
+        async with self._lock:
+            mailbox = _ImapMailbox(self._settings)
+            await asyncio.to_thread(mailbox.connect)
+            try:
+                results = []
+                for folder in folders or self._settings.imap_folders:
+                    results.append(await self._sync_folder(mailbox, folder))
+                return results
+            finally:
+                await asyncio.to_thread(mailbox.close)
+
+    async def _sync_folder(self, mailbox: _ImapMailbox, folder: str) -> FolderSyncResult:
+        status = await asyncio.to_thread(mailbox.examine, folder)
+        result = FolderSyncResult(folder=folder)
+
+        async with self._db.read_session() as session:
+            state = await session.get(MailFolderState, folder)
+            local_count = await session.scalar(
+                select(func.count()).select_from(MailMessage).where(MailMessage.folder == folder)
+            )
+        start_uid = 1
+        if state is not None and state.uidvalidity == status.uidvalidity:
+            start_uid = state.uidnext
+        elif state is not None or local_count:
+            logger.warning(
+                "email.sync.uidvalidity_changed",
+                folder=folder,
+                old=state.uidvalidity if state else None,
+                new=status.uidvalidity,
+            )
+            await self._discard_folder(folder)
+            local_count = 0
+            result.full_resync = True
+
+        if start_uid < status.uidnext:
+            new_uids = await asyncio.to_thread(mailbox.search_uids, start_uid)
+            for batch in _chunks(new_uids, self._settings.imap_batch_size):
+                records = await asyncio.to_thread(mailbox.fetch_headers, batch)
+                await self._store_headers(folder, records)
+                result.new_uids.extend(record["uid"] for record in records)
+            local_count = (local_count or 0) + len(result.new_uids)
+            if result.new_uids:
+                # Mail that arrived after EXAMINE is already indexed; do not refetch it.
+                status.uidnext = max(status.uidnext, max(result.new_uids) + 1)
+
+        if (
+            state is not None
+            and not result.full_resync
+            and status.highestmodseq is not None
+            and state.highestmodseq is not None
+            and status.highestmodseq > state.highestmodseq
+            and start_uid > 1
+        ):
+            changed = await asyncio.to_thread(
+                mailbox.fetch_changed_flags, start_uid - 1, state.highestmodseq
+            )
+            await self._store_flags(folder, changed)
+            result.flag_changed_uids = sorted(changed)
+
+        if (local_count or 0) > status.exists:
+            server_uids = set(await asyncio.to_thread(mailbox.search_uids, 1))
+            result.expunged_uids = await self._remove_expunged(folder, server_uids)
+
+        await self._save_state(folder, status)
+        logger.info(
+            "email.sync.folder",
+            folder=folder,
+            new=len(result.new_uids),
+            flags=len(result.flag_changed_uids),
+            expunged=len(result.expunged_uids),
+            full_resync=result.full_resync,
+        )
+        return result
+
+    async def _store_headers(self, folder: str, records: list[dict[str, Any]]) -> None:
+        if not records:
+            return
+        statement = insert(MailMessage).values([{"folder": folder, **record} for record in records])
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            constraint="uq_mail_messages_folder_uid",
+            set_={
+                column: getattr(excluded, column)
+                for column in records[0]
+                if column != "uid"
+            },
+        )
+        async with self._db.session() as session:
+            await session.execute(statement)
+
+    async def _store_flags(self, folder: str, changed: dict[int, str]) -> None:
+        if not changed:
+            return
+        table = MailMessage.__table__
+        statement = (
+            update(table)
+            .where(table.c.folder == folder, table.c.uid == bindparam("b_uid"))
+            .values(flags=bindparam("b_flags"))
+        )
+        async with self._db.session() as session:
+            await session.execute(
+                statement, [{"b_uid": uid, "b_flags": flags} for uid, flags in changed.items()]
+            )
+
+    async def _remove_expunged(self, folder: str, server_uids: set[int]) -> list[int]:
+        async with self._db.session() as session:
+            local_uids = (
+                await session.scalars(select(MailMessage.uid).where(MailMessage.folder == folder))
+            ).all()
+            gone = sorted(set(local_uids) - server_uids)
+            for batch in _chunks(gone, 1000):
+                await session.execute(
+                    delete(MailMessage).where(
+                        MailMessage.folder == folder, MailMessage.uid.in_(batch)
+                    )
+                )
+        for uid in gone:
+            for path in self._folder_dir(folder).glob(f"*/{uid}.eml"):
+                path.unlink(missing_ok=True)
+        return gone
+
+    async def _discard_folder(self, folder: str) -> None:
+        async with self._db.session() as session:
+            await session.execute(delete(MailMessage).where(MailMessage.folder == folder))
+            await session.execute(delete(MailFolderState).where(MailFolderState.folder == folder))
+        for path in self._folder_dir(folder).glob("*/*.eml"):
+            path.unlink(missing_ok=True)
+
+    async def _save_state(self, folder: str, status: _FolderStatus) -> None:
+        values = {
+            "uidvalidity": status.uidvalidity,
+            "uidnext": status.uidnext,
+            "highestmodseq": status.highestmodseq,
+        }
+        statement = insert(MailFolderState).values(folder=folder, **values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[MailFolderState.folder], set_={**values, "synced_at": func.now()}
+        )
+        async with self._db.session() as session:
+            await session.execute(statement)
+
+    def _folder_dir(self, folder: str) -> Path:
+        digest = hashlib.sha1(folder.encode("utf-8")).hexdigest()[:16]
+        return Path(self._settings.mail_store_dir) / digest
+
+    async def fetch_body(self, folder: str, uid: int) -> Path:
+        """Return the path of the raw message, downloading it in chunks on first use."""
+        async with self._db.read_session() as session:
+            state = await session.get(MailFolderState, folder)
+        if state is None:
+            raise MailSyncError(f"Folder {folder} has not been synced")
+        path = self._folder_dir(folder) / str(state.uidvalidity) / f"{uid}.eml"
+        if path.exists():
+            return path
+
+        async with self._lock:
+            # A concurrent caller may have downloaded it while we waited for the lock.
+            if path.exists():
+                return path
+            mailbox = _ImapMailbox(self._settings)
+            await asyncio.to_thread(mailbox.connect)
+            try:
+                await asyncio.to_thread(mailbox.examine, folder)
+                await asyncio.to_thread(self._download, mailbox, uid, path)
+            finally:
+                await asyncio.to_thread(mailbox.close)
+        return path
+
+    @staticmethod
+    def _download(mailbox: _ImapMailbox, uid: int, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(".part")
+        offset = 0
+        with partial.open("wb") as handle:
+            while True:
+                chunk = mailbox.fetch_body_chunk(uid, offset, BODY_CHUNK_BYTES)
+                handle.write(chunk)
+                offset += len(chunk)
+                if len(chunk) < BODY_CHUNK_BYTES:
+                    break
+        os.replace(partial, path)
@@ -0,0 +1,352 @@
+"""Incremental conversation threading over the local message index."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+import structlog
+from sqlalchemy import BigInteger, func, literal_column, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import MailMessage, MailThread, MailThreadRef, thread_change_seq
+from ..storage import Database
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+# Subject-only matches further apart than this start a new conversation.
+SUBJECT_MATCH_WINDOW = dt.timedelta(days=30)
+
+_MESSAGE_ID_RE = re.compile(r"<([^<>\s]+)>")
+_REPLY_PREFIX_RE = re.compile(r"^\s*((re|fwd?|aw|sv|wg)(\[\d+\])?\s*:\s*)+", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+# Oldest transaction still running; every transaction below it has finished.
+_SNAPSHOT_XMIN = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+def _message_ids(value: str | None) -> list[str]:
+    return _MESSAGE_ID_RE.findall(value or "")
+
+
+def normalize_subject(subject: str | None) -> tuple[str, bool]:
+    """Return the subject with reply/forward prefixes removed, and whether any were."""
+    subject = subject or ""
+    stripped = _REPLY_PREFIX_RE.sub("", subject)
+    key = _WHITESPACE_RE.sub(" ", stripped).strip().lower()
+    return key[:512], stripped != subject
+
+
+@dataclass
+class _Headers:
+    own: str | None
+    parent: str | None
+    ancestors: list[str]
+
+    @classmethod
+    def of(cls, message: MailMessage) -> _Headers:
+        own = _message_ids(message.message_id)
+        references = _message_ids(message.references)
+        in_reply_to = _message_ids(message.in_reply_to)
+        parent = in_reply_to[0] if in_reply_to else (references[-1] if references else None)
+        ancestors = references + [ref for ref in in_reply_to if ref not in references]
+        return cls(own=own[0] if own else None, parent=parent, ancestors=ancestors)
+
+    @property
+    def keys(self) -> list[str]:
+        return ([self.own] if self.own else []) + self.ancestors
+
+
+def _thread_age(thread: MailThread) -> tuple[bool, dt.datetime, str]:
+    started = thread.last_message_at or dt.datetime.max.replace(tzinfo=dt.timezone.utc)
+    return thread.last_message_at is None, started, str(thread.id)
+
+
+@dataclass
+class ThreadIndexResult:
+    """What one ``ThreadIndex.update`` pass did."""
+
+    threaded: int = 0
+    merged: int = 0
+    changed_thread_ids: set[uuid.UUID] = field(default_factory=set)
+
+
+@dataclass
+class ThreadChanges:
+    """A page of the thread change feed."""
+
+    threads: list[dict[str, Any]]
+    cursor: tuple[int, int]
+
+
+class ThreadIndex:
+    """Assigns messages to threads as they are indexed, without rethreading the mailbox.
+
+    Each message stores only ``thread_id`` and ``parent_id``. ``mail_thread_refs``
+    remembers which thread every Message-ID seen so far (including ones only
+    referenced, whose message has not arrived) belongs to, so placing a new
+    message is a single keyed lookup of its Message-ID, In-Reply-To and
+    References. When those link two existing threads, one is folded into
+    the other. Messages with no known references fall back to the normalised
+    subject when the subject carries a reply prefix. A parent that arrives after
+    its replies adopts them.
+
+    Every thread touched gets a new ``change_seq`` and ``change_xid``, which
+    together are the cursor for ``changed_since``.
+    """
+
+    def __init__(self, db: Database, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self._db = db
+        self._batch_size = batch_size
+        self._lock = asyncio.Lock()
+
+    async def update(self) -> ThreadIndexResult:
+        """Thread every message that has not been placed yet."""
+        result = ThreadIndexResult()
+        async with self._lock:
+            while True:
+                async with self._db.session() as session:
+                    placed = await self._thread_batch(session, result)
+                if placed < self._batch_size:
+                    break
+        logger.info(
+            "email.threads.update",
+            threaded=result.threaded,
+            merged=result.merged,
+            threads=len(result.changed_thread_ids),
+        )
+        return result
+
+    async def _thread_batch(self, session: AsyncSession, result: ThreadIndexResult) -> int:
+        messages = (
+            await session.scalars(
+                select(MailMessage)
+                .where(MailMessage.thread_id.is_(None))
+                .order_by(MailMessage.sent_at.asc().nulls_last(), MailMessage.id)
+                .limit(self._batch_size)
+            )
+        ).all()
+        if not messages:
+            return 0
+        headers = {message.id: _Headers.of(message) for message in messages}
+        keys = {key for entry in headers.values() for key in entry.keys}
+        thread_by_ref: dict[str, uuid.UUID] = dict(
+            (
+                await session.execute(
+                    select(MailThreadRef.message_id, MailThreadRef.thread_id).where(
+                        MailThreadRef.message_id.in_(keys)
+                    )
+                )
+            ).all()
+        )
+        parents = {entry.parent for entry in headers.values() if entry.parent}
+        message_by_ref: dict[str, uuid.UUID] = {}
+        if parents:
+            rows = await session.execute(
+                select(MailMessage.message_id, MailMessage.id).where(
+                    MailMessage.message_id.in_([f"<{ref}>" for ref in parents])
+                )
+            )
+            for raw, message_id in rows:
+                for ref in _message_ids(raw):
+                    message_by_ref[ref] = message_id
+
+        threads: dict[uuid.UUID, MailThread] = {}
+
+        async def load(thread_id: uuid.UUID) -> MailThread:
+            if thread_id not in threads:
+                thread = await session.get(MailThread, thread_id)
+                assert thread is not None
+                threads[thread_id] = thread
+            return threads[thread_id]
+
+        for message in messages:
+            entry = headers[message.id]
+            subject_key, is_reply = normalize_subject(message.subject)
+            sent_at = message.sent_at or message.received_at
+            candidates = sorted({thread_by_ref[key] for key in entry.keys if key in thread_by_ref})
+            thread: MailThread | None = None
+            if candidates:
+                loaded = [await load(candidate) for candidate in candidates]
+                # Fold into one deterministic survivor: the least recently active thread.
+                loaded.sort(key=_thread_age)
+                thread = loaded[0]
+                for other in loaded[1:]:
+                    await self._merge(session, other, thread, thread_by_ref)
+                    threads.pop(other.id, None)
+                    result.changed_thread_ids.add(other.id)
+                    result.merged += 1
+            elif is_reply and subject_key:
+                thread = await self._thread_by_subject(session, subject_key, sent_at)
+                if thread is not None:
+                    threads[thread.id] = thread
+            if thread is None:
+                thread = MailThread(id=uuid.uuid4(), subject_key=subject_key)
+                session.add(thread)
+                threads[thread.id] = thread
+
+            # A Message-ID that was already mapped was referenced by earlier replies.
+            adopts_orphans = entry.own is not None and entry.own in thread_by_ref
+            for key in entry.keys:
+                if key not in thread_by_ref:
+                    session.add(MailThreadRef(message_id=key, thread_id=thread.id))
+                thread_by_ref[key] = thread.id
+
+            message.thread_id = thread.id
+            if entry.parent is not None:
+                message.parent_id = message_by_ref.get(entry.parent)
+            if entry.own is not None:
+                message_by_ref.setdefault(entry.own, message.id)
+            if sent_at is not None and (
+                thread.last_message_at is None or sent_at > thread.last_message_at
+            ):
+                thread.last_message_at = sent_at
+            if not thread.subject_key:
+                thread.subject_key = subject_key
+            if adopts_orphans:
+                await self._adopt_orphans(session, thread.id, entry.own, message.id)
+            result.threaded += 1
+            result.changed_thread_ids.add(thread.id)
+        # Adding a message does not always change a thread column, so bump explicitly.
+        await session.execute(
+            update(MailThread)
+            .where(MailThread.id.in_(list(threads)))
+            .values(change_seq=thread_change_seq.next_value())
+            .execution_options(synchronize_session=False)
+        )
+        return len(messages)
+
+    @staticmethod
+    async def _thread_by_subject(
+        session: AsyncSession, subject_key: str, sent_at: dt.datetime | None
+    ) -> MailThread | None:
+        statement = (
+            select(MailThread)
+            .where(MailThread.subject_key == subject_key, MailThread.merged_into_id.is_(None))
+            .order_by(MailThread.last_message_at.desc().nulls_last())
+            .limit(1)
+        )
+        if sent_at is not None:
+            statement = statement.where(
+                MailThread.last_message_at >= sent_at - SUBJECT_MATCH_WINDOW
+            )
+        return await session.scalar(statement)
+
+    @staticmethod
+    async def _merge(
+        session: AsyncSession,
+        loser: MailThread,
+        survivor: MailThread,
+        thread_by_ref: dict[str, uuid.UUID],
+    ) -> None:
+        await session.flush()
+        await session.execute(
+            update(MailMessage)
+            .where(MailMessage.thread_id == loser.id)
+            .values(thread_id=survivor.id)
+        )
+        await session.execute(
+            update(MailThreadRef)
+            .where(MailThreadRef.thread_id == loser.id)
+            .values(thread_id=survivor.id)
+        )
+        for key, thread_id in thread_by_ref.items():
+            if thread_id == loser.id:
+                thread_by_ref[key] = survivor.id
+        loser.merged_into_id = survivor.id
+        if loser.last_message_at is not None and (
+            survivor.last_message_at is None or loser.last_message_at > survivor.last_message_at
+        ):
+            survivor.last_message_at = loser.last_message_at
+        logger.info("email.threads.merge", thread=str(loser.id), into=str(survivor.id))
+
+    @staticmethod
+    async def _adopt_orphans(
+        session: AsyncSession, thread_id: uuid.UUID, ref: str, parent_id: uuid.UUID
+    ) -> None:
+        orphans = (
+            await session.scalars(
+                select(MailMessage).where(
+                    MailMessage.thread_id == thread_id,
+                    MailMessage.parent_id.is_(None),
+                    MailMessage.id != parent_id,
+                )
+            )
+        ).all()
+        for orphan in orphans:
+            if _Headers.of(orphan).parent == ref:
+                orphan.parent_id = parent_id
+
+    async def thread_messages(self, thread_id: uuid.UUID) -> list[MailMessage]:
+        """Return a thread's messages, oldest first."""
+        async with self._db.read_session() as session:
+            thread = await session.get(MailThread, thread_id)
+            while thread is not None and thread.merged_into_id is not None:
+                thread = await session.get(MailThread, thread.merged_into_id)
+            if thread is None:
+                return []
+            return list(
+                (
+                    await session.scalars(
+                        select(MailMessage)
+                        .where(MailMessage.thread_id == thread.id)
+                        .order_by(MailMessage.sent_at.asc().nulls_last(), MailMessage.id)
+                    )
+                ).all()
+            )
+
+    async def changed_since(
+        self, cursor: tuple[int, int] = (0, 0), limit: int = 200
+    ) -> ThreadChanges:
+        """Return threads changed after ``cursor``, plus the next cursor.
+
+        The cursor is ``(change_xid, change_seq)`` of the last thread returned. Only
+        threads written by transactions older than every running one are returned:
+        ``change_seq`` is drawn before commit, so ordering by it alone could step past
+        a thread whose transaction commits late.
+        """
+        async with self._db.read_session() as session:
+            horizon = (await session.execute(select(_SNAPSHOT_XMIN))).scalar_one()
+            threads = (
+                await session.scalars(
+                    select(MailThread)
+                    .where(
+                        tuple_(MailThread.change_xid, MailThread.change_seq)
+                        > tuple_(*cursor, types=(BigInteger, BigInteger)),
+                        MailThread.change_xid < horizon,
+                    )
+                    .order_by(MailThread.change_xid, MailThread.change_seq)
+                    .limit(limit)
+                )
+            ).all()
+            live = [thread.id for thread in threads if thread.merged_into_id is None]
+            counts: dict[uuid.UUID, int] = {}
+            if live:
+                counts = dict(
+                    (
+                        await session.execute(
+                            select(MailMessage.thread_id, func.count())
+                            .where(MailMessage.thread_id.in_(live))
+                            .group_by(MailMessage.thread_id)
+                        )
+                    ).all()
+                )
+        return ThreadChanges(
+            threads=[
+                {
+                    "id": str(thread.id),
+                    "subject_key": thread.subject_key,
+                    "last_message_at": (
+                        thread.last_message_at.isoformat() if thread.last_message_at else None
+                    ),
+                    "message_count": counts.get(thread.id, 0),
+                    "merged_into": str(thread.merged_into_id) if thread.merged_into_id else None,
+                }
+                for thread in threads
+            ],
+            cursor=(threads[-1].change_xid, threads[-1].change_seq) if threads else cursor,
+        )
@@ -0,0 +1,123 @@
+"""Background delivery of password-reset emails."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import structlog
+
+from ..config import Settings
+from .auth import AuthService
+from .email import EmailService
+
+logger = structlog.get_logger(__name__)
+
+
+class PasswordResetDispatcher:
+    """Issues reset tokens and sends reset mail off the request path.
+
+    ``enqueue`` only touches memory, so ``/auth/forgot-password`` latency does not
+    depend on the database or SMTP. Repeat requests for the same address within
+    ``PASSWORD_RESET_COALESCE_SECONDS`` are dropped. A sweeper task deletes expired
+    tokens every ``PASSWORD_RESET_SWEEP_SECONDS``.
+    """
+
+    def __init__(
+        self,
+        auth_service: AuthService,
+        email_service: EmailService,
+        settings: Settings,
+        *,
+        max_pending: int = 1000,
+    ) -> None:
+        self._auth_service = auth_service
+        self._email_service = email_service
+        self._settings = settings
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_pending)
+        self._recent: dict[str, float] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        """Start the delivery worker and the expired-token sweeper."""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._deliver_forever(), name="password-reset-dispatch"),
+            asyncio.create_task(self._sweep_forever(), name="password-reset-sweep"),
+        ]
+
+    async def stop(self) -> None:
+        """Cancel background tasks and close the SMTP connection."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._email_service.close()
+
+    def enqueue(self, email: str) -> bool:
+        """Queue a reset for ``email``; return False if it was coalesced or dropped."""
+        normalized_email = email.strip().lower()
+        now = time.monotonic()
+        self._forget_before(now - self._settings.password_reset_coalesce_seconds)
+        last = self._recent.get(normalized_email)
+        if last is not None and now - last < self._settings.password_reset_coalesce_seconds:
+            logger.info("password_reset.coalesced", email=normalized_email)
+            return False
+        try:
+            self._queue.put_nowait(normalized_email)
+        except asyncio.QueueFull:
+            logger.warning("password_reset.queue_full", email=normalized_email)
+            return False
+        # Re-insert so ``_recent`` stays ordered oldest first.
+        self._recent.pop(normalized_email, None)
+        self._recent[normalized_email] = now
+        return True
+
+    def _forget_before(self, cutoff: float) -> None:
+        while self._recent:
+            email, seen = next(iter(self._recent.items()))
+            if seen >= cutoff:
+                break
+            del self._recent[email]
+
+    def _reset_link(self, token: str) -> str:
+        base = (self._settings.frontend_public_url or "").rstrip("/")
+        return f"{base}/reset-password?token={token}"
+
+    async def _deliver(self, email: str) -> None:
+        token = await self._auth_service.initiate_password_reset(email=email)
+        if token is None:
+            return
+        minutes = self._settings.password_reset_ttl_minutes
+        await self._email_service.send_message(
+            to=email,
+            subject=f"Reset your {self._settings.app_name} password",
+            body=(
+                "We received a request to reset your password.\n\n"
+                f"Open this link within {minutes} minutes to choose a new one:\n"
+                f"{self._reset_link(token)}\n\n"
+                "If you did not ask for this, you can ignore this email."
+            ),
+        )
+
+    async def _deliver_forever(self) -> None:
+        while True:
+            email = await self._queue.get()
+            try:
+                await self._deliver(email)
+            except Exception:  # noqa: BLE001 - keep the worker alive
+                logger.exception("password_reset.delivery_failed", email=email)
+            finally:
+                self._queue.task_done()
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._settings.password_reset_sweep_seconds)
+            self._forget_before(time.monotonic() - self._settings.password_reset_coalesce_seconds)
+            try:
+                removed = await self._auth_service.purge_expired_reset_tokens()
+            except Exception:  # noqa: BLE001 - retry on the next tick
+                logger.exception("password_reset.sweep_failed")
+                continue
+            logger.info("password_reset.swept", removed=removed)
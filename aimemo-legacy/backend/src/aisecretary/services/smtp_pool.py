@@ -0,0 +1,219 @@
+"""Pooled SMTP delivery with per-message metrics."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from typing import Any, AsyncIterator, Sequence
+
+import aiosmtplib
+import structlog
+
+from ..config import Settings
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class SmtpMetrics:
+    """Counters and a rolling latency window for outbound mail."""
+
+    sent: int = 0
+    failed: int = 0
+    connections_opened: int = 0
+    errors: Counter[str] = field(default_factory=Counter)
+    latencies_ms: deque[float] = field(default_factory=lambda: deque(maxlen=1024))
+
+    def record(self, latency_ms: float | None, error: BaseException | None) -> None:
+        if latency_ms is not None:
+            self.latencies_ms.append(latency_ms)
+        if error is None:
+            self.sent += 1
+        else:
+            self.failed += 1
+            self.errors[type(error).__name__] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        ordered = sorted(self.latencies_ms)
+
+        def percentile(fraction: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "connections_opened": self.connections_opened,
+            "errors": dict(self.errors),
+            "latency_ms_p50": percentile(0.5),
+            "latency_ms_p95": percentile(0.95),
+        }
+
+
+@dataclass
+class _PooledConnection:
+    client: aiosmtplib.SMTP
+    messages_sent: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    broken: bool = False
+
+
+class SmtpPool:
+    """Reuses authenticated SMTP sessions across messages.
+
+    At most ``SMTP_POOL_SIZE`` sessions are open at once. Each is retired after
+    ``SMTP_MAX_MESSAGES_PER_CONNECTION`` messages or ``SMTP_IDLE_TIMEOUT_SECONDS``
+    of idleness, which keeps providers from throttling or silently dropping it.
+    A session the server closed under us is replaced and the message retried once.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self._settings = settings
+        self._slots = asyncio.Semaphore(settings.smtp_pool_size)
+        self._idle: list[_PooledConnection] = []
+        self.metrics = SmtpMetrics()
+
+    async def _open(self) -> _PooledConnection:
+        settings = self._settings
+        client = aiosmtplib.SMTP(
+            hostname=settings.smtp_host,
+            port=settings.smtp_port,
+            username=settings.smtp_username,
+            password=settings.smtp_password,
+            use_tls=settings.smtp_use_tls,
+            start_tls=settings.smtp_start_tls and not settings.smtp_use_tls,
+            timeout=settings.smtp_timeout_seconds,
+        )
+        await client.connect()
+        self.metrics.connections_opened += 1
+        return _PooledConnection(client=client)
+
+    @staticmethod
+    async def _retire(connection: _PooledConnection) -> None:
+        if not connection.client.is_connected:
+            return
+        try:
+            await connection.client.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            connection.client.close()
+
+    def _reusable(self, connection: _PooledConnection) -> bool:
+        idle_for = time.monotonic() - connection.last_used
+        return (
+            not connection.broken
+            and connection.client.is_connected
+            and connection.messages_sent < self._settings.smtp_max_messages_per_connection
+            and idle_for < self._settings.smtp_idle_timeout_seconds
+        )
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[_PooledConnection]:
+        """Check out a live session, opening one if none is idle."""
+        async with self._slots:
+            connection: _PooledConnection | None = None
+            while self._idle:
+                candidate = self._idle.pop()
+                if self._reusable(candidate):
+                    connection = candidate
+                    break
+                await self._retire(candidate)
+            if connection is None:
+                connection = await self._open()
+            try:
+                yield connection
+            finally:
+                connection.last_used = time.monotonic()
+                if self._reusable(connection):
+                    self._idle.append(connection)
+                else:
+                    await self._retire(connection)
+
+    async def _send_on(self, connection: _PooledConnection, message: EmailMessage) -> None:
+        await connection.client.send_message(message)
+        connection.messages_sent += 1
+        connection.last_used = time.monotonic()
+
+    async def send(self, message: EmailMessage) -> None:
+        """Deliver one message, retrying once on a dropped session."""
+        started = time.perf_counter()
+        error: BaseException | None = None
+        try:
+            for attempt in range(2):
+                async with self.connection() as connection:
+                    try:
+                        await self._send_on(connection, message)
+                        return
+                    except aiosmtplib.SMTPServerDisconnected:
+                        connection.broken = True
+                        if attempt:
+                            raise
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self.metrics.record((time.perf_counter() - started) * 1000, error)
+
+    async def send_many(self, messages: Sequence[EmailMessage]) -> list[Exception | None]:
+        """Deliver a batch over shared sessions; return each message's error or None.
+
+        Up to ``SMTP_POOL_SIZE`` workers each hold one session and drain a shared
+        queue, so a batch costs one connect-and-login per worker rather than per
+        message. A failed message does not stop the rest of the batch.
+        """
+        results: list[Exception | None] = [None] * len(messages)
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for index in range(len(messages)):
+            queue.put_nowait(index)
+        retried: set[int] = set()
+
+        async def drain(connection: _PooledConnection) -> None:
+            while not queue.empty() and self._reusable(connection):
+                index = queue.get_nowait()
+                started = time.perf_counter()
+                error: Exception | None = None
+                try:
+                    await self._send_on(connection, messages[index])
+                except aiosmtplib.SMTPServerDisconnected as exc:
+                    connection.broken = True
+                    if index not in retried:
+                        # Give it one more go on a fresh session.
+                        retried.add(index)
+                        queue.put_nowait(index)
+                        return
+                    error = exc
+                except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused) as exc:
+                    # The server refused this message; the session itself is fine.
+                    error = exc
+                except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as exc:
+                    # The session may be half-way through a transaction; do not reuse it.
+                    connection.broken = True
+                    error = exc
+                results[index] = error
+                self.metrics.record((time.perf_counter() - started) * 1000, error)
+
+        async def worker() -> None:
+            while not queue.empty():
+                try:
+                    async with self.connection() as connection:
+                        await drain(connection)
+                except (aiosmtplib.SMTPException, OSError) as exc:
+                    # Could not open a session; fail what is left rather than spin.
+                    logger.warning("email.send_many.connect_failed", error=str(exc))
+                    while not queue.empty():
+                        results[queue.get_nowait()] = exc
+                        self.metrics.record(None, exc)
+
+        workers = min(self._settings.smtp_pool_size, len(messages))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def close(self) -> None:
+        """Quit every idle session."""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._retire(connection)
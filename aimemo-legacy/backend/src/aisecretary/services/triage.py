@@ -0,0 +1,243 @@
+"""Batched LLM triage of newly indexed mail."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import itertools
+import time
+import uuid
+from dataclasses import dataclass
+from email.utils import parseaddr
+from typing import Any, Iterable
+
+import structlog
+from sqlalchemy import bindparam, select, update
+
+from ..config import Settings
+from ..models import MailMessage
+from ..storage import Database
+from .llm import LLMError, StructuredOutputClient
+
+logger = structlog.get_logger(__name__)
+
+TRIAGE_LABELS = ("urgent", "needs_reply", "fyi", "spam")
+
+SYSTEM_PROMPT = (
+    "You triage a user's incoming email. For each numbered message decide one label: "
+    "urgent (needs attention today), needs_reply (expects a response, not urgent), "
+    "fyi (informational, no action) or spam (unsolicited or bulk). "
+    "Return exactly one item per message, using its number as id."
+)
+
+TRIAGE_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "label": {"type": "string", "enum": list(TRIAGE_LABELS)},
+                },
+                "required": ["id", "label"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["items"],
+    "additionalProperties": False,
+}
+
+
+@dataclass(frozen=True)
+class _TriageItem:
+    message_id: uuid.UUID
+    sender: str
+    subject: str
+    received_at: dt.datetime | None
+
+    def summary(self, index: int) -> str:
+        received = self.received_at.isoformat() if self.received_at else "unknown"
+        return f"[{index}] From: {self.sender} | Date: {received} | Subject: {self.subject}"
+
+
+@dataclass
+class TriageMetrics:
+    """Running totals for the triage stage."""
+
+    emails: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    busy_seconds: float = 0.0
+    _active: int = 0
+    _active_since: float = 0.0
+
+    def batch_started(self) -> None:
+        if self._active == 0:
+            self._active_since = time.monotonic()
+        self._active += 1
+
+    def batch_finished(self) -> None:
+        self._active -= 1
+        if self._active == 0:
+            self.busy_seconds += time.monotonic() - self._active_since
+
+    def snapshot(self) -> dict[str, Any]:
+        tokens = self.prompt_tokens + self.completion_tokens
+        return {
+            "emails": self.emails,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            # Measured over wall time with at least one batch running, so idle gaps
+            # between syncs do not dilute it.
+            "emails_per_minute": (
+                round(self.emails * 60 / self.busy_seconds, 1) if self.busy_seconds else None
+            ),
+            "tokens_per_email": round(tokens / self.emails, 1) if self.emails else None,
+        }
+
+
+class TriagePipeline:
+    """Labels new mail urgent / needs_reply / fyi / spam in batched model calls.
+
+    Inbox sync feeds it through ``enqueue_pending``. Messages wait in a priority
+    queue ordered by sender priority (``TRIAGE_PRIORITY_SENDERS``) and then
+    recency. Up to ``TRIAGE_BATCH_SIZE`` header summaries are packed into one
+    structured-output request that returns an array of labels, and at most
+    ``TRIAGE_CONCURRENCY`` requests are in flight. Messages missing from a reply,
+    or in a failed batch, stay unlabelled and are picked up again by the next
+    ``enqueue_pending``.
+    """
+
+    def __init__(self, db: Database, settings: Settings, client: StructuredOutputClient) -> None:
+        self._db = db
+        self._settings = settings
+        self._client = client
+        self._queue: asyncio.PriorityQueue[tuple[int, float, int, _TriageItem]] = (
+            asyncio.PriorityQueue()
+        )
+        self._order = itertools.count()
+        self._pending: set[uuid.UUID] = set()
+        self._slots = asyncio.Semaphore(settings.triage_concurrency)
+        self._dispatcher: asyncio.Task[None] | None = None
+        self._inflight: set[asyncio.Task[None]] = set()
+        self.metrics = TriageMetrics()
+
+    def _sender_rank(self, sender: str) -> int:
+        address = parseaddr(sender)[1].lower()
+        domain = address.rpartition("@")[2]
+        for entry in self._settings.triage_priority_senders:
+            entry = entry.lower()
+            if address == entry or (entry.startswith("@") and domain == entry[1:]):
+                return 0
+        return 1
+
+    def submit(self, messages: Iterable[MailMessage]) -> int:
+        """Queue messages for triage; returns how many were not already queued."""
+        queued = 0
+        for message in messages:
+            if message.id in self._pending:
+                continue
+            received_at = message.received_at or message.sent_at
+            item = _TriageItem(
+                message_id=message.id,
+                sender=message.from_addr or "",
+                subject=message.subject or "",
+                received_at=received_at,
+            )
+            newest_first = -received_at.timestamp() if received_at else 0.0
+            self._pending.add(message.id)
+            self._queue.put_nowait(
+                (self._sender_rank(item.sender), newest_first, next(self._order), item)
+            )
+            queued += 1
+        return queued
+
+    async def enqueue_pending(self, limit: int = 5000) -> int:
+        """Queue the newest messages that have no triage label yet."""
+        async with self._db.read_session() as session:
+            messages = (
+                await session.scalars(
+                    select(MailMessage)
+                    .where(MailMessage.triage_label.is_(None))
+                    .order_by(MailMessage.received_at.desc().nulls_last())
+                    .limit(limit)
+                )
+            ).all()
+        return self.submit(messages)
+
+    def start(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _dispatch(self) -> None:
+        while True:
+            # Take a slot first so a batch is cut from the best items available
+            # when it can actually run, not while it waits behind other batches.
+            await self._slots.acquire()
+            batch = [(await self._queue.get())[3]]
+            while len(batch) < self._settings.triage_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait()[3])
+            task = asyncio.create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: list[_TriageItem]) -> None:
+        self.metrics.batch_started()
+        try:
+            labels = await self._classify(batch)
+            await self._store(labels)
+            self.metrics.emails += len(labels)
+            self.metrics.batches += 1
+        except LLMError as exc:
+            self.metrics.failed_batches += 1
+            logger.warning("email.triage.batch_failed", size=len(batch), error=str(exc))
+        except Exception:  # noqa: BLE001 - keep the pipeline alive
+            self.metrics.failed_batches += 1
+            logger.exception("email.triage.batch_failed", size=len(batch))
+        finally:
+            self.metrics.batch_finished()
+            for item in batch:
+                self._pending.discard(item.message_id)
+            self._slots.release()
+
+    async def _classify(self, batch: list[_TriageItem]) -> dict[uuid.UUID, str]:
+        prompt = "\n".join(item.summary(index) for index, item in enumerate(batch))
+        response = await self._client.send_request_with_json_schema(
+            prompt, TRIAGE_SCHEMA, system_content=SYSTEM_PROMPT, schema_name="triage"
+        )
+        self.metrics.prompt_tokens += response.prompt_tokens
+        self.metrics.completion_tokens += response.completion_tokens
+        labels = {}
+        for entry in response.data.get("items", []):
+            index, label = entry.get("id"), entry.get("label")
+            if isinstance(index, int) and 0 <= index < len(batch) and label in TRIAGE_LABELS:
+                labels[batch[index].message_id] = label
+        if len(labels) < len(batch):
+            logger.info("email.triage.partial", expected=len(batch), labelled=len(labels))
+        return labels
+
+    async def _store(self, labels: dict[uuid.UUID, str]) -> None:
+        if not labels:
+            return
+        table = MailMessage.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(triage_label=bindparam("b_label"))
+        )
+        async with self._db.session() as session:
+            await session.execute(
+                statement, [{"b_id": key, "b_label": label} for key, label in labels.items()]
+            )
@@ -2,14 +2,54 @@
 
 from __future__ import annotations
 
+import contextvars
+import itertools
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
 
+import structlog
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import ORMExecuteState, Session
 
 from ..config import Settings
 from ..models import Base
 
+LOGGER = structlog.get_logger(__name__)
+
+# Monotonic deadline until which reads in the current task stay on the primary, so a
+# request that just wrote does not read stale rows from a lagging replica.
+_primary_pinned_until: contextvars.ContextVar[float] = contextvars.ContextVar(
+    "primary_pinned_until", default=0.0
+)
+
+
+class _TrackingSession(Session):
+    """Sync session that records whether it flushed or executed any writes."""
+
+
+@event.listens_for(_TrackingSession, "after_flush")
+def _mark_written(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(_TrackingSession, "do_orm_execute")
+def _mark_statement_written(state: ORMExecuteState) -> None:
+    # Core insert/update/delete run through session.execute() never flush.
+    if not state.is_select:
+        state.session.info["wrote"] = True
+
+
+@dataclass
+class _Replica:
+    url: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    unhealthy_until: float = 0.0
+
 
 class Database:
     """Wraps the async SQLAlchemy engine and sessions."""
@@ -18,17 +58,42 @@ class Database:
         self._settings = settings
         self._engine: AsyncEngine | None = None
         self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._read_session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._replicas: list[_Replica] = []
+        self._replica_cycle: itertools.cycle[int] | None = None
+
+    def _make_session_factory(
+        self, engine: AsyncEngine, *, read_only: bool = False
+    ) -> async_sessionmaker[AsyncSession]:
+        if read_only:
+            engine = engine.execution_options(postgresql_readonly=True)
+        return async_sessionmaker(
+            engine,
+            expire_on_commit=False,
+            autoflush=False,
+            sync_session_class=_TrackingSession,
+        )
 
     def _ensure_engine(self) -> None:
         if self._engine is None:
             self._engine = create_async_engine(
                 self._settings.database_url, echo=self._settings.echo, future=True
             )
-            self._session_factory = async_sessionmaker(
-                self._engine,
-                expire_on_commit=False,
-                autoflush=False,
-            )
+            self._session_factory = self._make_session_factory(self._engine)
+            self._read_session_factory = self._make_session_factory(self._engine, read_only=True)
+            for url in self._settings.database_replica_urls:
+                engine = create_async_engine(
+                    url, echo=self._settings.echo, future=True, pool_pre_ping=True
+                )
+                self._replicas.append(
+                    _Replica(
+                        url=url,
+                        engine=engine,
+                        session_factory=self._make_session_factory(engine, read_only=True),
+                    )
+                )
+            if self._replicas:
+                self._replica_cycle = itertools.cycle(range(len(self._replicas)))
 
     @property
     def engine(self) -> AsyncEngine:
@@ -49,8 +114,55 @@ class Database:
         try:
             yield session
             await session.commit()
+            if session.sync_session.info.pop("wrote", False):
+                _primary_pinned_until.set(
+                    time.monotonic() + self._settings.database_primary_sticky_seconds
+                )
         except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
+
+    @asynccontextmanager
+    async def read_session(self) -> AsyncIterator[AsyncSession]:
+        """Yield a session in a read-only transaction that is never committed.
+
+        Reads go to the next healthy replica in round-robin order when
+        ``DATABASE_REPLICA_URLS`` is set, and to the primary otherwise. A replica
+        that fails to connect is skipped for ``DATABASE_REPLICA_RETRY_SECONDS``.
+        Tasks that wrote within ``DATABASE_PRIMARY_STICKY_SECONDS`` read from the
+        primary.
+        """
+        session = await self._open_read_session()
+        try:
+            yield session
+        finally:
+            # Returning the connection ends the read-only transaction; there is
+            # nothing to flush or commit.
+            await session.close()
+
+    async def _open_read_session(self) -> AsyncSession:
+        self._ensure_engine()
+        assert self._read_session_factory is not None
+        if self._replicas and time.monotonic() >= _primary_pinned_until.get():
+            for replica in self._healthy_replicas():
+                session = replica.session_factory()
+                try:
+                    await session.connection()
+                except (DBAPIError, OSError, TimeoutError) as exc:
+                    await session.close()
+                    replica.unhealthy_until = (
+                        time.monotonic() + self._settings.database_replica_retry_seconds
+                    )
+                    LOGGER.warning("database.replica.unhealthy", url=replica.url, error=str(exc))
+                    continue
+                return session
+        return self._read_session_factory()
+
+    def _healthy_replicas(self) -> list[_Replica]:
+        assert self._replica_cycle is not None
+        now = time.monotonic()
+        start = next(self._replica_cycle)
+        ordered = self._replicas[start:] + self._replicas[:start]
+        return [replica for replica in ordered if replica.unhealthy_until <= now]
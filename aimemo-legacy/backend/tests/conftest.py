@@ -0,0 +1,6 @@
+"""Shared test setup."""
+
+import os
+
+# Settings are loaded at import time and require a signing secret.
+os.environ.setdefault("JWT_SECRET", "test-secret")
@@ -0,0 +1,147 @@
+"""Recurrence expansion, its cache, and per-user agenda scoping."""
+
+from __future__ import annotations
+
+import datetime as dt
+import uuid
+
+import pytest
+import pytest_asyncio
+
+from aisecretary.config import Settings
+from aisecretary.models import Base, CalendarAccess
+from aisecretary.services.agenda import RecurrenceCache, RecurringSeries
+from aisecretary.services.calendar import CalendarService
+from aisecretary.storage import Database
+
+UTC = dt.timezone.utc
+EVENT_ID = uuid.uuid4()
+
+# Weekly on Mondays 09:00 Berlin time from 4 March 2024: 11 March is excluded, 18 March is
+# moved to 10:00-11:00 and renamed, and 25 March (after the DST switch) is cancelled.
+STANDUP = """BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//test//EN
+BEGIN:VEVENT
+UID:standup
+SUMMARY:Standup
+DTSTART;TZID=Europe/Berlin:20240304T090000
+DTEND;TZID=Europe/Berlin:20240304T093000
+RRULE:FREQ=WEEKLY;BYDAY=MO
+EXDATE;TZID=Europe/Berlin:20240311T090000
+END:VEVENT
+BEGIN:VEVENT
+UID:standup
+RECURRENCE-ID;TZID=Europe/Berlin:20240318T090000
+SUMMARY:Late standup
+DTSTART;TZID=Europe/Berlin:20240318T100000
+DTEND;TZID=Europe/Berlin:20240318T110000
+END:VEVENT
+BEGIN:VEVENT
+UID:standup
+RECURRENCE-ID;TZID=Europe/Berlin:20240325T090000
+STATUS:CANCELLED
+DTSTART;TZID=Europe/Berlin:20240325T090000
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def _utc(*args: int) -> dt.datetime:
+    return dt.datetime(*args, tzinfo=UTC)
+
+
+def test_series_expands_exdates_overrides_and_dst():
+    series = RecurringSeries(EVENT_ID, "cal", STANDUP)
+
+    occurrences = series.expand(_utc(2024, 3, 1), _utc(2024, 4, 6))
+
+    assert sorted((o.starts_at, o.ends_at, o.summary) for o in occurrences) == [
+        (_utc(2024, 3, 4, 8), _utc(2024, 3, 4, 8, 30), "Standup"),
+        (_utc(2024, 3, 18, 9), _utc(2024, 3, 18, 10), "Late standup"),
+        # Still 09:00 in Berlin once summer time starts.
+        (_utc(2024, 4, 1, 7), _utc(2024, 4, 1, 7, 30), "Standup"),
+    ]
+    assert all(o.recurring and not o.all_day for o in occurrences)
+
+
+def test_series_expansion_is_clipped_to_the_window():
+    series = RecurringSeries(EVENT_ID, "cal", STANDUP)
+
+    # Starts mid-occurrence and ends before the next one.
+    occurrences = series.expand(_utc(2024, 3, 4, 8, 15), _utc(2024, 3, 18, 9))
+
+    assert [o.starts_at for o in occurrences] == [_utc(2024, 3, 4, 8)]
+
+
+def test_cache_reuses_weekly_expansions():
+    cache = RecurrenceCache()
+    series = RecurringSeries(EVENT_ID, "cal", STANDUP)
+    cache.add_series('"1"', series)
+
+    today = cache.expand(series, '"1"', _utc(2024, 3, 4), _utc(2024, 3, 5))
+    week = cache.expand(series, '"1"', _utc(2024, 3, 4), _utc(2024, 3, 11))
+
+    assert [o.starts_at for o in today] == [o.starts_at for o in week] == [_utc(2024, 3, 4, 8)]
+    assert cache.stats()["expansion_misses"] == 1
+    assert cache.stats()["expansion_hits"] == 1
+    assert cache.series(EVENT_ID, '"1"') is series
+
+
+def test_cache_misses_after_the_etag_changes():
+    cache = RecurrenceCache()
+    series = RecurringSeries(EVENT_ID, "cal", STANDUP)
+    cache.add_series('"1"', series)
+    cache.expand(series, '"1"', _utc(2024, 3, 4), _utc(2024, 3, 5))
+
+    assert cache.series(EVENT_ID, '"2"') is None
+    edited = RecurringSeries(EVENT_ID, "cal", STANDUP.replace("SUMMARY:Standup", "SUMMARY:Sync"))
+    cache.add_series('"2"', edited)
+    [occurrence] = cache.expand(edited, '"2"', _utc(2024, 3, 4), _utc(2024, 3, 5))
+
+    assert occurrence.summary == "Sync"
+    assert cache.stats()["expansion_misses"] == 2
+
+
+class RecordingAgenda:
+    def __init__(self) -> None:
+        self.calls: list[list[str] | None] = []
+
+    async def agenda(self, start, end, *, calendar_urls=None):
+        self.calls.append(calendar_urls)
+        return []
+
+
+@pytest_asyncio.fixture
+async def calendar_service(tmp_path):
+    settings = Settings(
+        _env_file=None, DATABASE_AI_URL=f"sqlite+aiosqlite:///{tmp_path / 'cal.sqlite3'}"
+    )
+    db = Database(settings)
+    async with db.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[CalendarAccess.__table__])
+    service = CalendarService(settings, db)
+    # AgendaService queries tstzrange columns, which need PostgreSQL.
+    service._agenda = RecordingAgenda()
+    yield service
+    await db.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_agenda_only_reads_granted_calendars(calendar_service):
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    await calendar_service.grant_access(alice, "http://dav.test/alice/")
+    await calendar_service.grant_access(alice, "http://dav.test/team/", role="shared")
+    await calendar_service.grant_access(bob, "http://dav.test/bob/")
+    window = (_utc(2024, 3, 4), _utc(2024, 3, 11))
+
+    await calendar_service.agenda(alice, *window)
+    await calendar_service.agenda(
+        alice, *window, calendar_urls=["http://dav.test/team/", "http://dav.test/bob/"]
+    )
+    assert await calendar_service.agenda(uuid.uuid4(), *window) == []
+
+    assert calendar_service._agenda.calls == [
+        ["http://dav.test/alice/", "http://dav.test/team/"],
+        ["http://dav.test/team/"],
+    ]
@@ -0,0 +1,286 @@
+"""CalDavSyncEngine against an in-process CalDAV server on httpx.MockTransport."""
+
+from __future__ import annotations
+
+import re
+import xml.etree.ElementTree as ET
+from typing import Any
+from xml.sax.saxutils import escape
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from aisecretary.config import Settings
+from aisecretary.models import Base, CalendarCollectionState
+from aisecretary.services.caldav_sync import CalDavSyncEngine
+from aisecretary.storage import Database
+
+CALENDAR_URL = "http://dav.test/cal/"
+COLLECTION_HREF = "/cal/"
+_TOKEN_RE = re.compile(r"<d:sync-token>(.*?)</d:sync-token>")
+_HREF_RE = re.compile(r"<d:href>(.*?)</d:href>")
+
+
+def _ical(uid: str, summary: str) -> str:
+    return (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//EN\r\nBEGIN:VEVENT\r\n"
+        f"UID:{uid}\r\nSUMMARY:{summary}\r\nDTSTART:20240902T100000Z\r\n"
+        "DTEND:20240902T110000Z\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+def _response(href: str, props: str = "", status: str = "200 OK") -> str:
+    if not props:
+        return (
+            f"<d:response><d:href>{href}</d:href>"
+            f"<d:status>HTTP/1.1 {status}</d:status></d:response>"
+        )
+    return (
+        f"<d:response><d:href>{href}</d:href><d:propstat><d:prop>{props}</d:prop>"
+        "<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>"
+    )
+
+
+def _multistatus(responses: list[str], token: str | None = None) -> httpx.Response:
+    body = (
+        '<?xml version="1.0"?><d:multistatus xmlns:d="DAV:" '
+        'xmlns:c="urn:ietf:params:xml:ns:caldav" xmlns:cs="http://calendarserver.org/ns/">'
+        + "".join(responses)
+        + (f"<d:sync-token>{token}</d:sync-token>" if token else "")
+        + "</d:multistatus>"
+    )
+    ET.fromstring(body)  # Fail loudly on a malformed fixture.
+    return httpx.Response(207, content=body.encode())
+
+
+class FakeCalDav:
+    """One calendar collection with a change log behind its sync tokens.
+
+    ``sync_collection=False`` answers the REPORT with 501 as servers without RFC 6578
+    do. ``page_size`` truncates sync-collection replies with a 507 for the collection.
+    """
+
+    def __init__(self, *, sync_collection: bool = True, page_size: int | None = None) -> None:
+        self.sync_collection = sync_collection
+        self.page_size = page_size
+        self.events: dict[str, tuple[str, str]] = {}
+        self.log: list[str] = []
+        self.requests: list[tuple[str, str]] = []
+
+    def put(self, name: str, summary: str) -> None:
+        href = f"{COLLECTION_HREF}{name}.ics"
+        self.log.append(href)
+        self.events[href] = (f'"{len(self.log)}"', _ical(name, summary))
+
+    def remove(self, name: str) -> None:
+        href = f"{COLLECTION_HREF}{name}.ics"
+        self.log.append(href)
+        del self.events[href]
+
+    @property
+    def ctag(self) -> str:
+        return f"ctag-{len(self.log)}"
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = request.content.decode()
+        kind = request.method
+        if "sync-collection" in body:
+            kind = "sync-collection"
+        elif "calendar-multiget" in body:
+            kind = "multiget"
+        elif request.method == "PROPFIND":
+            kind = f"propfind-{request.headers['Depth']}"
+        self.requests.append((kind, body))
+        if kind == "sync-collection":
+            return self._sync(_TOKEN_RE.search(body).group(1))
+        if kind == "multiget":
+            return self._multiget(_HREF_RE.findall(body))
+        if kind == "propfind-0":
+            return _multistatus(
+                [_response(COLLECTION_HREF, f"<cs:getctag>{self.ctag}</cs:getctag>")]
+            )
+        if kind == "propfind-1":
+            return _multistatus(
+                [_response(COLLECTION_HREF, "<d:resourcetype><d:collection/></d:resourcetype>")]
+                + [
+                    _response(href, f"<d:getetag>{escape(etag)}</d:getetag><d:resourcetype/>")
+                    for href, (etag, _) in self.events.items()
+                ]
+            )
+        return httpx.Response(405)
+
+    def _sync(self, token: str) -> httpx.Response:
+        if not self.sync_collection:
+            return httpx.Response(501)
+        if token and not (token.startswith("v") and int(token[1:]) <= len(self.log)):
+            return httpx.Response(
+                403, content=b'<d:error xmlns:d="DAV:"><d:valid-sync-token/></d:error>'
+            )
+        start = int(token[1:]) if token else 0
+        # Servers that list the collection itself use its relative href.
+        responses = [] if token else [
+            _response(COLLECTION_HREF, "<d:resourcetype><d:collection/></d:resourcetype>")
+        ]
+        end = len(self.log)
+        if self.page_size is not None and end - start > self.page_size:
+            end = start + self.page_size
+        for href in dict.fromkeys(self.log[start:end]):
+            if href in self.events:
+                etag = escape(self.events[href][0])
+                responses.append(_response(href, f"<d:getetag>{etag}</d:getetag>"))
+            elif token:
+                responses.append(_response(href, status="404 Not Found"))
+        if end < len(self.log):
+            responses.append(_response(COLLECTION_HREF, status="507 Insufficient Storage"))
+        return _multistatus(responses, token=f"v{end}")
+
+    def _multiget(self, hrefs: list[str]) -> httpx.Response:
+        responses = []
+        for href in hrefs:
+            if href not in self.events:
+                responses.append(_response(href, status="404 Not Found"))
+                continue
+            etag, ical = self.events[href]
+            responses.append(
+                _response(
+                    href,
+                    f"<d:getetag>{escape(etag)}</d:getetag>"
+                    f"<c:calendar-data>{escape(ical)}</c:calendar-data>",
+                )
+            )
+        return _multistatus(responses)
+
+
+class InMemoryEventsEngine(CalDavSyncEngine):
+    """Keeps events in a dict; ``calendar_events`` needs PostgreSQL range types."""
+
+    def __init__(self, db: Database, settings: Settings, server: FakeCalDav) -> None:
+        super().__init__(db, settings)
+        self.server = server
+        self.stored: dict[str, dict[str, Any]] = {}
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.server.handler))
+
+    async def _local_etags(self, url: str) -> dict[str, str | None]:
+        return {href: record["etag"] for href, record in self.stored.items()}
+
+    async def _store_events(self, url: str, records: list[dict[str, Any]]) -> None:
+        self.stored.update((record["href"], record) for record in records)
+
+    async def _delete_events(self, url: str, hrefs: list[str]) -> None:
+        for href in hrefs:
+            self.stored.pop(href, None)
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    settings = Settings(
+        _env_file=None, DATABASE_AI_URL=f"sqlite+aiosqlite:///{tmp_path / 'cal.sqlite3'}"
+    )
+    db = Database(settings)
+    async with db.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[CalendarCollectionState.__table__])
+    yield db
+    await db.engine.dispose()
+
+
+def _engine(db: Database, server: FakeCalDav, batch_size: int = 100) -> InMemoryEventsEngine:
+    settings = Settings(
+        _env_file=None,
+        CALDAV_CALENDAR_URLS=CALENDAR_URL,
+        CALDAV_MULTIGET_BATCH_SIZE=batch_size,
+    )
+    return InMemoryEventsEngine(db, settings, server)
+
+
+def _kinds(server: FakeCalDav) -> list[str]:
+    return [kind for kind, _ in server.requests]
+
+
+@pytest.mark.asyncio
+async def test_sync_token_fetches_only_changes(db):
+    server = FakeCalDav()
+    for name in ("a", "b", "c"):
+        server.put(name, name.upper())
+    engine = _engine(db, server, batch_size=2)
+
+    [first] = await engine.sync()
+    assert first.mode == "sync-token"
+    assert first.changed_hrefs == ["/cal/a.ics", "/cal/b.ics", "/cal/c.ics"]
+    assert _kinds(server) == ["sync-collection", "multiget", "multiget"]
+    assert engine.stored["/cal/b.ics"]["summary"] == "B"
+
+    server.requests.clear()
+    server.put("b", "B2")
+    server.remove("c")
+    [second] = await engine.sync()
+
+    assert second.changed_hrefs == ["/cal/b.ics"]
+    assert second.deleted_hrefs == ["/cal/c.ics"]
+    assert _kinds(server) == ["sync-collection", "multiget"]
+    assert "<d:sync-token>v3</d:sync-token>" in server.requests[0][1]
+    assert sorted(engine.stored) == ["/cal/a.ics", "/cal/b.ics"]
+    assert engine.stored["/cal/b.ics"]["summary"] == "B2"
+
+
+@pytest.mark.asyncio
+async def test_truncated_sync_collection_is_followed(db):
+    server = FakeCalDav(page_size=2)
+    for name in ("a", "b", "c", "d", "e"):
+        server.put(name, name.upper())
+    engine = _engine(db, server)
+
+    [result] = await engine.sync()
+
+    assert result.changed_hrefs == [f"/cal/{name}.ics" for name in "abcde"]
+    assert _kinds(server) == ["sync-collection"] * 3 + ["multiget"]
+    async with db.read_session() as session:
+        state = await session.get(CalendarCollectionState, CALENDAR_URL)
+    assert state.sync_token == "v5"
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_relists_and_drops_missing_events(db):
+    server = FakeCalDav()
+    server.put("a", "A")
+    server.put("b", "B")
+    engine = _engine(db, server)
+    await engine.sync()
+
+    # The server lost its history: old tokens are rejected and "b" is gone.
+    server.log = ["/cal/a.ics"]
+    del server.events["/cal/b.ics"]
+    server.requests.clear()
+    [result] = await engine.sync()
+
+    assert result.deleted_hrefs == ["/cal/b.ics"]
+    assert result.changed_hrefs == ["/cal/a.ics"]
+    assert sorted(engine.stored) == ["/cal/a.ics"]
+
+
+@pytest.mark.asyncio
+async def test_etag_fallback_without_sync_collection(db):
+    server = FakeCalDav(sync_collection=False)
+    server.put("a", "A")
+    server.put("b", "B")
+    engine = _engine(db, server)
+
+    [first] = await engine.sync()
+    assert first.mode == "etag"
+    assert first.changed_hrefs == ["/cal/a.ics", "/cal/b.ics"]
+
+    server.requests.clear()
+    [unchanged] = await engine.sync()
+    assert unchanged.changed_hrefs == [] and unchanged.deleted_hrefs == []
+    assert _kinds(server) == ["sync-collection", "propfind-0"]
+
+    server.requests.clear()
+    server.put("a", "A2")
+    server.remove("b")
+    [changed] = await engine.sync()
+    assert changed.changed_hrefs == ["/cal/a.ics"]
+    assert changed.deleted_hrefs == ["/cal/b.ics"]
+    assert _kinds(server) == ["sync-collection", "propfind-0", "propfind-1", "multiget"]
+    assert engine.stored["/cal/a.ics"]["summary"] == "A2"
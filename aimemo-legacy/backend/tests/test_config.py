@@ -0,0 +1,44 @@
+"""List settings read from the environment and from env files."""
+
+from __future__ import annotations
+
+import pytest
+
+from aisecretary.config import Settings
+
+ORIGINS = ["http://localhost:8092", "http://127.0.0.1:8092"]
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        '["http://localhost:8092","http://127.0.0.1:8092"]',
+        "http://localhost:8092,http://127.0.0.1:8092",
+        " http://localhost:8092 , http://127.0.0.1:8092 ,",
+    ],
+)
+def test_list_settings_accept_json_and_csv(monkeypatch, raw):
+    monkeypatch.setenv("CORS_ALLOW_ORIGINS", raw)
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", raw)
+
+    settings = Settings(_env_file=None)
+
+    assert settings.cors_allow_origins == ORIGINS
+    assert settings.database_replica_urls == ORIGINS
+
+
+def test_list_settings_from_env_file(tmp_path, monkeypatch):
+    for name in ("CORS_ALLOW_ORIGINS", "IMAP_FOLDERS", "DATABASE_REPLICA_URLS"):
+        monkeypatch.delenv(name, raising=False)
+    env_file = tmp_path / ".env"
+    env_file.write_text(
+        "CORS_ALLOW_ORIGINS='[\"http://localhost:8092\",\"http://127.0.0.1:8092\"]'\n"
+        "IMAP_FOLDERS=INBOX,Archive\n"
+        "DATABASE_REPLICA_URLS=\n"
+    )
+
+    settings = Settings(_env_file=env_file)
+
+    assert settings.cors_allow_origins == ORIGINS
+    assert settings.imap_folders == ["INBOX", "Archive"]
+    assert settings.database_replica_urls == []
@@ -0,0 +1,49 @@
+"""Write tracking that pins reads to the primary."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    create_engine,
+    delete,
+    insert,
+    select,
+    update,
+)
+
+from aisecretary.storage.database import _TrackingSession
+
+metadata = MetaData()
+notes = Table("notes", metadata, Column("id", Integer, primary_key=True), Column("n", Integer))
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with _TrackingSession(engine) as session:
+        yield session
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        insert(notes).values(id=1, n=1),
+        update(notes).values(n=2),
+        delete(notes),
+    ],
+)
+def test_core_writes_mark_the_session(session, statement):
+    session.execute(statement)
+
+    assert session.info.get("wrote") is True
+
+
+def test_reads_do_not_mark_the_session(session):
+    session.execute(select(notes))
+
+    assert "wrote" not in session.info
@@ -0,0 +1,106 @@
+"""Free-slot ranking and which events count as busy."""
+
+from __future__ import annotations
+
+import datetime as dt
+import uuid
+
+import pytest
+
+from aisecretary.config import Settings
+from aisecretary.services.agenda import AgendaOccurrence, RecurringSeries
+from aisecretary.services.caldav_sync import parse_event
+from aisecretary.services.calendar import CalendarService
+from aisecretary.services.free_busy import WorkingHours, find_free_slots
+
+UTC = dt.timezone.utc
+HOUR = dt.timedelta(hours=1)
+# Monday 2 September 2024, 09:00-17:00 UTC.
+WINDOW = (dt.datetime(2024, 9, 2, tzinfo=UTC), dt.datetime(2024, 9, 3, tzinfo=UTC))
+
+
+def _at(hour: int, minute: int = 0) -> dt.datetime:
+    return dt.datetime(2024, 9, 2, hour, minute, tzinfo=UTC)
+
+
+def _event(extra: str = "", rrule: str = "") -> str:
+    return (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//EN\r\nBEGIN:VEVENT\r\n"
+        "UID:e\r\nSUMMARY:Event\r\nDTSTART:20240902T100000Z\r\nDTEND:20240902T110000Z\r\n"
+        f"{rrule}{extra}END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+def test_working_hour_edges_count_as_unlimited_buffer():
+    # Free from 09:00 to 12:00, then busy until 17:00.
+    busy = {"cal": [(_at(12), _at(17))]}
+
+    slots = find_free_slots(busy, WINDOW, HOUR, WorkingHours(), limit=3)
+
+    # 09:00 opens the day, so only the room before the 12:00 meeting matters.
+    assert [slot.starts_at for slot in slots] == [_at(9), _at(9, 15), _at(9, 30)]
+    assert slots[0].buffer_before is None
+    assert slots[0].buffer_after == 2 * HOUR
+    assert slots[0].as_dict()["buffer_before_minutes"] is None
+
+
+def test_slots_between_meetings_prefer_room_on_both_sides():
+    busy = {"a": [(_at(9), _at(10))], "b": [(_at(13), _at(17))]}
+
+    [best] = find_free_slots(busy, WINDOW, HOUR, WorkingHours(), limit=1)
+
+    # The first start with at least BUFFER_CAP of room on both sides.
+    assert best.starts_at == _at(10, 30)
+    assert best.buffer_before == dt.timedelta(minutes=30)
+    assert best.buffer_after == dt.timedelta(minutes=90)
+
+
+def test_meeting_ending_at_opening_time_is_back_to_back():
+    # A meeting that ends at 09:00 makes a 09:00 slot back-to-back, not open-ended.
+    busy = {"cal": [(_at(8), _at(9)), (_at(12), _at(17))]}
+
+    slots = find_free_slots(busy, WINDOW, HOUR, WorkingHours(), limit=20)
+
+    nine = next(slot for slot in slots if slot.starts_at == _at(9))
+    assert nine.buffer_before == dt.timedelta(0)
+    assert slots[0].starts_at == _at(9, 30)
+
+
+@pytest.mark.parametrize(
+    ("extra", "busy"),
+    [
+        ("", True),
+        ("TRANSP:OPAQUE\r\n", True),
+        ("TRANSP:TRANSPARENT\r\n", False),
+        ("STATUS:CANCELLED\r\n", False),
+        ("STATUS:CONFIRMED\r\n", True),
+    ],
+)
+def test_transparent_and_cancelled_events_are_not_busy(extra, busy):
+    assert parse_event(_event(extra))["busy"] is busy
+    series = RecurringSeries(uuid.uuid4(), "cal", _event(extra, "RRULE:FREQ=DAILY\r\n"))
+    assert [o.busy for o in series.expand(_at(0), _at(23))] == [busy]
+
+
+class FixedAgenda:
+    def __init__(self, occurrences: list[AgendaOccurrence]) -> None:
+        self.occurrences = occurrences
+
+    async def agenda(self, start, end, *, calendar_urls=None):
+        return self.occurrences
+
+
+@pytest.mark.asyncio
+async def test_free_slots_ignore_events_that_do_not_block_time():
+    def occurrence(start: int, end: int, *, busy: bool) -> AgendaOccurrence:
+        return AgendaOccurrence(uuid.uuid4(), "cal", None, _at(start), _at(end), False, False, busy)
+
+    settings = Settings(_env_file=None)
+    service = CalendarService(settings, db=None)
+    service._agenda = FixedAgenda(
+        [occurrence(9, 12, busy=False), occurrence(12, 17, busy=True)]
+    )
+
+    slots = await service.find_free_slots(["cal"], WINDOW, HOUR, WorkingHours(), limit=1)
+
+    assert slots[0].starts_at == _at(9)
@@ -0,0 +1,253 @@
+"""ImapSyncEngine against an in-process IMAP server and an aiosqlite index."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import socketserver
+import threading
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from aisecretary.config import Settings
+from aisecretary.models import Base, MailFolderState, MailMessage
+from aisecretary.services.mail_sync import ImapSyncEngine
+from aisecretary.storage import Database
+
+_COMMAND_RE = re.compile(r"(\S+) (UID \S+|\S+) ?(.*)")
+_PARTIAL_RE = re.compile(r"BODY\.PEEK\[\]<(\d+)\.(\d+)>")
+
+
+def _message(uid: int) -> bytes:
+    return (
+        f"Message-ID: <m{uid}@example.com>\r\n"
+        f"Subject: Message {uid}\r\n"
+        "From: sender@example.com\r\n"
+        "To: user@example.com\r\n"
+        "Date: Mon, 02 Sep 2024 10:00:00 +0000\r\n"
+        "\r\n"
+        f"Body of message {uid}.\r\n"
+    ).encode()
+
+
+class FakeMailbox:
+    """One folder's worth of server state, shared with the request handler."""
+
+    def __init__(self) -> None:
+        self.uidvalidity = 1
+        self.uidnext = 1
+        self.messages: dict[int, bytes] = {}
+        self.fetched: list[str] = []
+        self.lock = threading.Lock()
+
+    def deliver(self, count: int) -> None:
+        for _ in range(count):
+            self.messages[self.uidnext] = _message(self.uidnext)
+            self.uidnext += 1
+
+    def _uids(self, uid_set: str) -> list[int]:
+        highest = max(self.messages, default=0)
+        uids: set[int] = set()
+        for part in uid_set.split(","):
+            low, _, high = part.partition(":")
+            end = highest if high == "*" else int(high or low)
+            start = int(low)
+            if high == "*" and start > highest:
+                start = highest
+            uids.update(uid for uid in range(start, end + 1) if uid in self.messages)
+        return sorted(uids)
+
+    def handle(self, command: str, args: str) -> list[bytes]:
+        with self.lock:
+            if command == "EXAMINE":
+                return [
+                    f"* {len(self.messages)} EXISTS".encode(),
+                    f"* OK [UIDVALIDITY {self.uidvalidity}] UIDs valid".encode(),
+                    f"* OK [UIDNEXT {self.uidnext}] Predicted next UID".encode(),
+                ]
+            if command == "UID SEARCH":
+                uids = self._uids(args.split()[1])
+                return [("* SEARCH " + " ".join(map(str, uids))).strip().encode()]
+            if command == "UID FETCH":
+                uid_set, items = args.split(" ", 1)
+                self.fetched.append(uid_set)
+                return self._fetch(self._uids(uid_set), items)
+        raise ValueError(command)
+
+    def _fetch(self, uids: list[int], items: str) -> list[bytes]:
+        lines = []
+        positions = sorted(self.messages)
+        for uid in uids:
+            raw = self.messages[uid]
+            if partial := _PARTIAL_RE.search(items):
+                offset, length = int(partial.group(1)), int(partial.group(2))
+                literal = raw[offset : offset + length]
+                section = f"BODY[]<{offset}>"
+            else:
+                literal = raw.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n"
+                section = 'BODY[HEADER.FIELDS ("MESSAGE-ID")]'
+            meta = (
+                f"* {positions.index(uid) + 1} FETCH (UID {uid} FLAGS (\\Seen) "
+                f'RFC822.SIZE {len(raw)} INTERNALDATE "02-Sep-2024 10:00:05 +0000" '
+                f"{section} {{{len(literal)}}}"
+            )
+            lines.append(meta.encode() + b"\r\n" + literal + b")")
+        return lines
+
+
+class ImapHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        mailbox: FakeMailbox = self.server.mailbox  # type: ignore[attr-defined]
+        self.wfile.write(b"* OK [CAPABILITY IMAP4rev1] Fake IMAP ready\r\n")
+        for raw in self.rfile:
+            match = _COMMAND_RE.match(raw.decode().rstrip("\r\n"))
+            if match is None:
+                return
+            tag, command, args = match.groups()
+            command = command.upper()
+            if command == "LOGOUT":
+                self.wfile.write(f"* BYE\r\n{tag} OK LOGOUT completed\r\n".encode())
+                return
+            if command == "CAPABILITY":
+                lines = [b"* CAPABILITY IMAP4rev1"]
+            elif command == "LOGIN":
+                lines = []
+            else:
+                lines = mailbox.handle(command, args)
+            for line in lines:
+                self.wfile.write(line + b"\r\n")
+            self.wfile.write(f"{tag} OK {command} completed\r\n".encode())
+
+
+@pytest.fixture
+def imap_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), ImapHandler)
+    server.daemon_threads = True
+    server.mailbox = FakeMailbox()  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.mailbox, server.server_address[1]  # type: ignore[attr-defined]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path, imap_server):
+    _, port = imap_server
+    settings = Settings(
+        _env_file=None,
+        DATABASE_AI_URL=f"sqlite+aiosqlite:///{tmp_path / 'mail.sqlite3'}",
+        IMAP_HOST="127.0.0.1",
+        IMAP_PORT=port,
+        IMAP_USE_SSL=False,
+        IMAP_FOLDERS="INBOX",
+        IMAP_BATCH_SIZE=2,
+        MAIL_STORE_DIR=str(tmp_path / "mail"),
+    )
+    db = Database(settings)
+    async with db.engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[MailMessage.__table__, MailFolderState.__table__],
+        )
+    yield ImapSyncEngine(db, settings), db
+    await db.engine.dispose()
+
+
+async def _indexed_uids(db: Database) -> list[int]:
+    async with db.read_session() as session:
+        return list((await session.scalars(select(MailMessage.uid).order_by("uid"))).all())
+
+
+@pytest.mark.asyncio
+async def test_sync_fetches_only_new_uids(engine, imap_server):
+    sync, db = engine
+    mailbox, _ = imap_server
+    mailbox.deliver(3)
+
+    [first] = await sync.sync()
+    mailbox.fetched.clear()
+    mailbox.deliver(2)
+    [second] = await sync.sync()
+
+    assert first.new_uids == [1, 2, 3]
+    assert second.new_uids == [4, 5]
+    assert mailbox.fetched == ["4:5"]
+    assert await _indexed_uids(db) == [1, 2, 3, 4, 5]
+    async with db.read_session() as session:
+        message = await session.scalar(select(MailMessage).where(MailMessage.uid == 4))
+        state = await session.get(MailFolderState, "INBOX")
+    assert message.subject == "Message 4"
+    assert message.message_id == "<m4@example.com>"
+    assert message.flags == "\\Seen"
+    assert state.uidnext == 6
+
+
+@pytest.mark.asyncio
+async def test_unchanged_folder_fetches_nothing(engine, imap_server):
+    sync, _ = engine
+    mailbox, _ = imap_server
+    mailbox.deliver(2)
+
+    await sync.sync()
+    mailbox.fetched.clear()
+    [result] = await sync.sync()
+
+    assert result.new_uids == [] and result.expunged_uids == []
+    assert mailbox.fetched == []
+
+
+@pytest.mark.asyncio
+async def test_uidvalidity_change_resyncs_the_folder(engine, imap_server):
+    sync, db = engine
+    mailbox, _ = imap_server
+    mailbox.deliver(3)
+    await sync.sync()
+    body = await sync.fetch_body("INBOX", 2)
+
+    with mailbox.lock:
+        mailbox.uidvalidity = 2
+        mailbox.messages = {10: _message(10), 11: _message(11)}
+        mailbox.uidnext = 12
+    [result] = await sync.sync()
+
+    assert result.full_resync
+    assert result.new_uids == [10, 11]
+    assert await _indexed_uids(db) == [10, 11]
+    assert not body.exists()
+
+
+@pytest.mark.asyncio
+async def test_expunged_messages_are_removed(engine, imap_server):
+    sync, db = engine
+    mailbox, _ = imap_server
+    mailbox.deliver(4)
+    await sync.sync()
+    body = await sync.fetch_body("INBOX", 3)
+
+    with mailbox.lock:
+        del mailbox.messages[1], mailbox.messages[3]
+    [result] = await sync.sync()
+
+    assert result.expunged_uids == [1, 3]
+    assert await _indexed_uids(db) == [2, 4]
+    assert not body.exists()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_body_fetches_download_once(engine, imap_server):
+    sync, _ = engine
+    mailbox, _ = imap_server
+    mailbox.deliver(1)
+    await sync.sync()
+    mailbox.fetched.clear()
+
+    paths = await asyncio.gather(*(sync.fetch_body("INBOX", 1) for _ in range(3)))
+
+    assert len(set(paths)) == 1
+    assert paths[0].read_bytes() == mailbox.messages[1]
+    assert mailbox.fetched == ["1"]
@@ -0,0 +1,153 @@
+"""Password reset tokens and their delivery against a local aiosmtpd server."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import socket
+from email import message_from_bytes
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from aisecretary.config import Settings
+from aisecretary.models import Base, PasswordResetToken, User
+from aisecretary.services.auth import AuthError, AuthService
+from aisecretary.services.email import EmailService
+from aisecretary.services.password_reset import PasswordResetDispatcher
+from aisecretary.storage import Database
+
+EMAIL = "user@example.com"
+TOKEN_RE = re.compile(r"token=([\w-]+)")
+
+
+class InboxHandler:
+    def __init__(self) -> None:
+        self.messages: list[tuple[list[str], str]] = []
+
+    async def handle_DATA(self, server, session, envelope):
+        body = message_from_bytes(envelope.content).get_payload(decode=True).decode()
+        self.messages.append((list(envelope.rcpt_tos), body))
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def inbox():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = InboxHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        yield handler, port
+    finally:
+        controller.stop()
+
+
+def _settings(tmp_path, port: int, **overrides) -> Settings:
+    values = {
+        "DATABASE_AI_URL": f"sqlite+aiosqlite:///{tmp_path / 'app.sqlite3'}",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": port,
+        "SMTP_START_TLS": False,
+        "SMTP_USE_TLS": False,
+        "SMTP_FROM": "assistant@example.com",
+        "FRONTEND_PUBLIC_URL": "http://localhost:8092/",
+        **overrides,
+    }
+    return Settings(_env_file=None, **values)
+
+
+async def _services(settings: Settings) -> tuple[Database, AuthService, PasswordResetDispatcher]:
+    db = Database(settings)
+    async with db.engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all, tables=[User.__table__, PasswordResetToken.__table__]
+        )
+    auth = AuthService(db, settings)
+    await auth.register_user(email=EMAIL, password="old-password")
+    dispatcher = PasswordResetDispatcher(auth, EmailService(settings, db), settings)
+    return db, auth, dispatcher
+
+
+async def _deliver(dispatcher: PasswordResetDispatcher) -> None:
+    dispatcher.start()
+    await asyncio.wait_for(dispatcher._queue.join(), timeout=10)
+
+
+@pytest.mark.asyncio
+async def test_reset_link_is_mailed_and_consumed_once(tmp_path, inbox):
+    handler, port = inbox
+    db, auth, dispatcher = await _services(_settings(tmp_path, port))
+    try:
+        assert dispatcher.enqueue(" User@Example.com ")
+        await _deliver(dispatcher)
+
+        [(recipients, body)] = handler.messages
+        assert recipients == [EMAIL]
+        assert "http://localhost:8092/reset-password?token=" in body
+        token = TOKEN_RE.search(body).group(1)
+
+        user = await auth.reset_password(token=token, password="new-password")
+        assert user.email == EMAIL
+        assert (await auth.authenticate(email=EMAIL, password="new-password")).id == user.id
+        with pytest.raises(AuthError):
+            await auth.reset_password(token=token, password="another-password")
+    finally:
+        await dispatcher.stop()
+        await db.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unknown_address_gets_no_mail(tmp_path, inbox):
+    handler, port = inbox
+    db, _, dispatcher = await _services(_settings(tmp_path, port))
+    try:
+        assert dispatcher.enqueue("stranger@example.com")
+        await _deliver(dispatcher)
+
+        assert handler.messages == []
+    finally:
+        await dispatcher.stop()
+        await db.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_rejected_and_purged(tmp_path, inbox):
+    _, port = inbox
+    db, auth, dispatcher = await _services(
+        _settings(tmp_path, port, PASSWORD_RESET_TTL_MINUTES=0)
+    )
+    try:
+        token = await auth.initiate_password_reset(email=EMAIL)
+
+        with pytest.raises(AuthError):
+            await auth.reset_password(token=token, password="new-password")
+        assert await auth.purge_expired_reset_tokens() == 1
+    finally:
+        await dispatcher.stop()
+        await db.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_requests_within_the_window_are_coalesced(tmp_path, inbox):
+    handler, port = inbox
+    db, _, dispatcher = await _services(
+        _settings(tmp_path, port, PASSWORD_RESET_COALESCE_SECONDS=0.2)
+    )
+    try:
+        assert dispatcher.enqueue(EMAIL)
+        assert not dispatcher.enqueue(EMAIL.upper())
+        assert dispatcher.enqueue("other@example.com")
+        await asyncio.sleep(0.25)
+
+        # Outside the window the address is accepted again, and stale entries are pruned.
+        assert dispatcher.enqueue(EMAIL)
+        assert list(dispatcher._recent) == [EMAIL]
+        await _deliver(dispatcher)
+
+        assert [recipients for recipients, _ in handler.messages] == [[EMAIL], [EMAIL]]
+    finally:
+        await dispatcher.stop()
+        await db.engine.dispose()
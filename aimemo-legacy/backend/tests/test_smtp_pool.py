@@ -0,0 +1,129 @@
+"""SmtpPool against a local aiosmtpd server."""
+
+from __future__ import annotations
+
+import socket
+from email.message import EmailMessage
+
+import aiosmtplib
+import pytest
+from aiosmtpd.controller import Controller
+
+from aisecretary.config import Settings
+from aisecretary.services.smtp_pool import SmtpPool
+
+REJECTED = "nobody@example.com"
+
+
+class RecordingHandler:
+    def __init__(self) -> None:
+        self.delivered: list[str] = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == REJECTED:
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        yield handler, port
+    finally:
+        controller.stop()
+
+
+def _settings(port: int, **overrides) -> Settings:
+    values = {
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": port,
+        "SMTP_START_TLS": False,
+        "SMTP_USE_TLS": False,
+        "SMTP_POOL_SIZE": 2,
+        "SMTP_TIMEOUT_SECONDS": 5,
+        **overrides,
+    }
+    return Settings(_env_file=None, **values)
+
+
+def _message(to: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "assistant@example.com"
+    message["To"] = to
+    message["Subject"] = "Hello"
+    message.set_content("Hi there")
+    return message
+
+
+@pytest.mark.asyncio
+async def test_send_many_reuses_sessions(smtp_server):
+    handler, port = smtp_server
+    pool = SmtpPool(_settings(port))
+    recipients = [f"user{index}@example.com" for index in range(10)]
+
+    results = await pool.send_many([_message(to) for to in recipients])
+    await pool.close()
+
+    assert results == [None] * 10
+    assert sorted(handler.delivered) == sorted(recipients)
+    assert pool.metrics.connections_opened <= 2
+    assert pool.metrics.sent == 10
+
+
+@pytest.mark.asyncio
+async def test_send_many_reports_refused_recipient(smtp_server):
+    handler, port = smtp_server
+    pool = SmtpPool(_settings(port, SMTP_POOL_SIZE=1))
+
+    results = await pool.send_many(
+        [_message("a@example.com"), _message(REJECTED), _message("b@example.com")]
+    )
+    await pool.close()
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], aiosmtplib.SMTPRecipientsRefused)
+    assert handler.delivered == ["a@example.com", "b@example.com"]
+    # A refusal is about the message, not the session.
+    assert pool.metrics.connections_opened == 1
+
+
+class FlakyPool(SmtpPool):
+    """Fails the first send to ``flaky@example.com`` with a socket error."""
+
+    failed = False
+
+    async def _send_on(self, connection, message):
+        if message["To"] == "flaky@example.com" and not self.failed:
+            self.failed = True
+            raise ConnectionResetError("connection reset by peer")
+        await super()._send_on(connection, message)
+
+
+@pytest.mark.asyncio
+async def test_send_many_reports_socket_errors(smtp_server):
+    handler, port = smtp_server
+    pool = FlakyPool(_settings(port, SMTP_POOL_SIZE=1))
+
+    results = await pool.send_many(
+        [_message("a@example.com"), _message("flaky@example.com"), _message("b@example.com")]
+    )
+    await pool.close()
+
+    # The failed message is reported, not mistaken for sent, and the rest still go out.
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], ConnectionResetError)
+    assert handler.delivered == ["a@example.com", "b@example.com"]
+    # The session is dropped after the socket error and a fresh one finishes the batch.
+    assert pool.metrics.connections_opened == 2
+    assert pool.metrics.failed == 1
@@ -0,0 +1,209 @@
+"""TriagePipeline over a StructuredOutputClient talking to httpx.MockTransport."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import json
+import re
+import uuid
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from aisecretary.config import Settings
+from aisecretary.models import Base, MailMessage
+from aisecretary.services.llm import LLMError, StructuredOutputClient
+from aisecretary.services.triage import TriagePipeline
+from aisecretary.storage import Database
+
+BASE_URL = "http://fake-openai.test/v1"
+_LINE_RE = re.compile(r"^\[(\d+)\] From: (.*?) \| Date: .*? \| Subject: (.*)$", re.MULTILINE)
+
+
+class FakeModel:
+    """Labels each summary by its subject's first word.
+
+    Subjects starting with "skip" are left out of the reply, "fail" fails the whole
+    request with a 500 and "garbled" makes the reply invalid JSON.
+    """
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        assert body["response_format"]["json_schema"]["strict"] is True
+        lines = _LINE_RE.findall(body["messages"][-1]["content"])
+        self.batches.append([subject for _, _, subject in lines])
+        subjects = {int(index): subject for index, _, subject in lines}
+        if any(subject.startswith("fail") for subject in subjects.values()):
+            return httpx.Response(500, json={"error": {"message": "overloaded"}})
+        content = json.dumps(
+            {
+                "items": [
+                    {"id": index, "label": subject.split()[0]}
+                    for index, subject in subjects.items()
+                    if not subject.startswith("skip")
+                ]
+            }
+        )
+        if any(subject.startswith("garbled") for subject in subjects.values()):
+            content = content[:-5]
+        return httpx.Response(
+            200,
+            json={
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 10 * len(subjects), "completion_tokens": 5},
+            },
+        )
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    settings = Settings(
+        _env_file=None, DATABASE_AI_URL=f"sqlite+aiosqlite:///{tmp_path / 'mail.sqlite3'}"
+    )
+    db = Database(settings)
+    async with db.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[MailMessage.__table__])
+    yield db
+    await db.engine.dispose()
+
+
+@pytest.fixture
+def model() -> FakeModel:
+    return FakeModel()
+
+
+def _pipeline(db: Database, model: FakeModel, **overrides) -> TriagePipeline:
+    settings = Settings(
+        _env_file=None,
+        OPENAI_API_KEY="test-key",
+        OPENAI_BASE_URL=BASE_URL,
+        TRIAGE_BATCH_SIZE=2,
+        TRIAGE_CONCURRENCY=1,
+        **overrides,
+    )
+    client = StructuredOutputClient(settings)
+    client._client = httpx.AsyncClient(
+        base_url=BASE_URL, transport=httpx.MockTransport(model.handler)
+    )
+    return TriagePipeline(db, settings, client)
+
+
+async def _add_messages(db: Database, *messages: tuple[str, str]) -> None:
+    base = dt.datetime(2024, 9, 2, tzinfo=dt.timezone.utc)
+    async with db.session() as session:
+        for uid, (sender, subject) in enumerate(messages, start=1):
+            session.add(
+                MailMessage(
+                    id=uuid.uuid4(),
+                    folder="INBOX",
+                    uid=uid,
+                    from_addr=sender,
+                    subject=subject,
+                    received_at=base + dt.timedelta(minutes=uid),
+                )
+            )
+
+
+async def _run(pipeline: TriagePipeline, batches: int) -> None:
+    pipeline.start()
+    try:
+        async with asyncio.timeout(5):
+            while pipeline.metrics.batches + pipeline.metrics.failed_batches < batches:
+                await asyncio.sleep(0.01)
+    finally:
+        await pipeline.stop()
+
+
+async def _labels(db: Database) -> dict[str, str | None]:
+    async with db.read_session() as session:
+        rows = await session.execute(select(MailMessage.subject, MailMessage.triage_label))
+        return {subject: label for subject, label in rows}
+
+
+@pytest.mark.asyncio
+async def test_batches_priority_senders_first_and_stores_labels(db, model):
+    await _add_messages(
+        db,
+        ("a@example.com", "fyi newsletter"),
+        ("boss@corp.example", "urgent outage"),
+        ("b@example.com", "spam offer"),
+        ("c@example.com", "needs_reply lunch?"),
+        ("d@example.com", "fyi receipt"),
+    )
+    pipeline = _pipeline(db, model, TRIAGE_PRIORITY_SENDERS="@corp.example")
+
+    assert await pipeline.enqueue_pending() == 5
+    await _run(pipeline, batches=3)
+
+    # Priority senders first, then newest first, two summaries per request.
+    assert model.batches == [
+        ["urgent outage", "fyi receipt"],
+        ["needs_reply lunch?", "spam offer"],
+        ["fyi newsletter"],
+    ]
+    assert await _labels(db) == {
+        "fyi newsletter": "fyi",
+        "urgent outage": "urgent",
+        "spam offer": "spam",
+        "needs_reply lunch?": "needs_reply",
+        "fyi receipt": "fyi",
+    }
+    snapshot = pipeline.metrics.snapshot()
+    assert snapshot["emails"] == 5 and snapshot["batches"] == 3
+    assert snapshot["failed_batches"] == 0
+    assert snapshot["tokens_per_email"] == round((50 + 15) / 5, 1)
+    assert await pipeline.enqueue_pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_unlabelled_messages_are_picked_up_again(db, model):
+    await _add_messages(db, ("a@example.com", "skip me"), ("b@example.com", "fyi note"))
+    pipeline = _pipeline(db, model)
+
+    await pipeline.enqueue_pending()
+    await _run(pipeline, batches=1)
+
+    assert await _labels(db) == {"skip me": None, "fyi note": "fyi"}
+    assert pipeline.metrics.emails == 1
+    assert await pipeline.enqueue_pending() == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("subject", ["fail now", "garbled reply"])
+async def test_failed_batches_are_counted_and_retried(db, model, subject):
+    # Newest first: the failing message and "fyi x" share the first batch.
+    await _add_messages(
+        db, ("a@example.com", "spam y"), ("b@example.com", "fyi x"), ("c@example.com", subject)
+    )
+    pipeline = _pipeline(db, model)
+
+    await pipeline.enqueue_pending()
+    await _run(pipeline, batches=2)
+
+    labels = await _labels(db)
+    assert pipeline.metrics.failed_batches == 1
+    assert pipeline.metrics.batches == 1
+    assert labels["fyi x"] is None and labels[subject] is None
+    assert labels["spam y"] == "spam"
+    # The failed batch's messages are no longer pending, so the next sync retries them.
+    assert await pipeline.enqueue_pending() == 2
+
+
+@pytest.mark.asyncio
+async def test_client_rejects_refusals():
+    def refuse(request: httpx.Request) -> httpx.Response:
+        message = {"role": "assistant", "content": None, "refusal": "no"}
+        return httpx.Response(200, json={"choices": [{"message": message}]})
+
+    client = StructuredOutputClient(Settings(_env_file=None, OPENAI_BASE_URL=BASE_URL))
+    client._client = httpx.AsyncClient(base_url=BASE_URL, transport=httpx.MockTransport(refuse))
+
+    with pytest.raises(LLMError, match="refused"):
+        await client.send_request_with_json_schema("hi", {"type": "object"})
+    await client.close()
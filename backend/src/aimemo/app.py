@@ -7,6 +7,7 @@ from .db import init_db
 from .handlers.auth import AppleOAuthHandler, GoogleOAuthHandler, LoginHandler, RegisterHandler
 from .handlers.health import HealthHandler
 from .handlers.me import MeHandler
+from .handlers.sync import SyncHandler
 
 log = structlog.get_logger()
 
@@ -20,6 +21,7 @@ def make_app() -> Application:
             (r"/auth/oauth/google", GoogleOAuthHandler),
             (r"/auth/oauth/apple", AppleOAuthHandler),
             (r"/auth/me", MeHandler),
+            (r"/sync", SyncHandler),
         ],
         debug=settings.debug,
     )
@@ -1,10 +1,10 @@
 import json
 from pathlib import Path
 from functools import lru_cache
-from typing import List, Optional
+from typing import Annotated, List, Optional
 
 from pydantic import Field, field_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
@@ -19,11 +19,17 @@ class Settings(BaseSettings):
     auto_create_db: bool = Field(True, alias="AUTO_CREATE_DB")
 
     database_url: str = Field(..., alias="DATABASE_URL")
+    # NoDecode passes the raw string to the validators, which take JSON or comma-separated lists.
+    database_replica_urls: Annotated[List[str], NoDecode] = Field(
+        default_factory=list, alias="DATABASE_REPLICA_URLS"
+    )
+    database_replica_retry_seconds: float = Field(30.0, alias="DATABASE_REPLICA_RETRY_SECONDS")
+    database_primary_sticky_seconds: float = Field(5.0, alias="DATABASE_PRIMARY_STICKY_SECONDS")
     jwt_secret: str = Field(..., alias="JWT_SECRET")
     jwt_algorithm: str = Field("HS256", alias="JWT_ALGORITHM")
     jwt_expires_minutes: int = Field(60 * 24 * 7, alias="JWT_EXPIRES_MINUTES")
 
-    cors_allow_origins: List[str] = Field(
+    cors_allow_origins: Annotated[List[str], NoDecode] = Field(
         default_factory=lambda: [
             "http://localhost:8090",
             "http://localhost:8091",
@@ -55,9 +61,18 @@ class Settings(BaseSettings):
     def validate_cors_allow_origins(cls, value):
         return cls._parse_list(value)
 
+    @field_validator("database_replica_urls", mode="before")
+    @classmethod
+    def validate_database_replica_urls(cls, value):
+        return [cls._normalize_database_url(url) for url in cls._parse_list(value)]
+
     @field_validator("database_url", mode="before")
     @classmethod
     def validate_database_url(cls, value):
+        return cls._normalize_database_url(value)
+
+    @staticmethod
+    def _normalize_database_url(value):
         if not isinstance(value, str):
             return value
         if value.startswith("postgresql://"):
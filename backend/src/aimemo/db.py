@@ -1,12 +1,123 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import contextvars
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+import structlog
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import ORMExecuteState, Session
 
 from .config import settings
 from .models import Base
 
+log = structlog.get_logger()
+
+# Monotonic deadline until which reads in the current task stay on the primary, so a request
+# that just wrote does not read stale rows from a lagging replica.
+_primary_pinned_until: contextvars.ContextVar[float] = contextvars.ContextVar(
+    "primary_pinned_until", default=0.0
+)
+
+
+class _TrackingSession(Session):
+    pass
+
+
+@event.listens_for(_TrackingSession, "after_flush")
+def _mark_written(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(_TrackingSession, "do_orm_execute")
+def _mark_statement_written(state: ORMExecuteState) -> None:
+    # Core insert/update/delete run through session.execute() never flush.
+    if not state.is_select:
+        state.session.info["wrote"] = True
+
+
+class _PrimarySession(AsyncSession):
+    async def commit(self) -> None:
+        await super().commit()
+        if self.sync_session.info.pop("wrote", False):
+            _primary_pinned_until.set(time.monotonic() + settings.database_primary_sticky_seconds)
+
+
+@dataclass
+class _Replica:
+    url: str
+    session_factory: async_sessionmaker[AsyncSession]
+    unhealthy_until: float = 0.0
+
+
+def _read_only_sessionmaker(read_engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        read_engine.execution_options(postgresql_readonly=True), expire_on_commit=False
+    )
+
+
 engine = create_async_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+SessionLocal = async_sessionmaker(
+    engine,
+    class_=_PrimarySession,
+    sync_session_class=_TrackingSession,
+    expire_on_commit=False,
+)
+_PrimaryReadSession = _read_only_sessionmaker(engine)
+
+_replicas = [
+    _Replica(
+        url=url,
+        session_factory=_read_only_sessionmaker(create_async_engine(url, pool_pre_ping=True)),
+    )
+    for url in settings.database_replica_urls
+]
+_replica_cycle = itertools.cycle(range(len(_replicas) or 1))
 
 
 async def init_db() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+async def _open_read_session() -> AsyncSession:
+    if _replicas and time.monotonic() >= _primary_pinned_until.get():
+        start = next(_replica_cycle)
+        now = time.monotonic()
+        for replica in _replicas[start:] + _replicas[:start]:
+            if replica.unhealthy_until > now:
+                continue
+            session = replica.session_factory()
+            try:
+                await session.connection()
+            except (DBAPIError, OSError, TimeoutError) as exc:
+                await session.close()
+                replica.unhealthy_until = time.monotonic() + settings.database_replica_retry_seconds
+                log.warning("db.replica.unhealthy", url=replica.url, error=str(exc))
+                continue
+            return session
+    return _PrimaryReadSession()
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """Yield a session in a read-only transaction that is never committed.
+
+    Reads rotate across healthy `DATABASE_REPLICA_URLS` and fall back to the primary. A replica
+    that fails to connect is skipped for `DATABASE_REPLICA_RETRY_SECONDS`, and a task that
+    committed a write within `DATABASE_PRIMARY_STICKY_SECONDS` keeps reading from the primary.
+    """
+    session = await _open_read_session()
+    try:
+        yield session
+    finally:
+        # Releasing the connection ends the read-only transaction without a commit.
+        await session.close()
@@ -8,7 +8,7 @@ from ..auth import (
     register_user,
     serialize_user,
 )
-from ..db import SessionLocal
+from ..db import SessionLocal, read_session
 from ..models import AuthProvider
 from .base import BaseHandler
 
@@ -56,7 +56,7 @@ class LoginHandler(BaseHandler):
             self.write_json(400, {"error": "email and password are required"})
             return
 
-        async with SessionLocal() as session:
+        async with read_session() as session:
             try:
                 user = await login_user(session, email, password)
             except AuthError as exc:
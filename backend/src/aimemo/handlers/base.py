@@ -1,8 +1,12 @@
+import hashlib
 import json
+import uuid
 from typing import Any, Optional
 
+import jwt
 from tornado.web import RequestHandler
 
+from ..auth import decode_access_token
 from ..config import settings
 
 
@@ -16,7 +20,10 @@ class BaseHandler(RequestHandler):
             self.set_header("Access-Control-Allow-Origin", origin)
             self.set_header("Vary", "Origin")
 
-        self.set_header("Access-Control-Allow-Headers", "authorization,content-type")
+        self.set_header(
+            "Access-Control-Allow-Headers", "authorization,content-type,if-none-match"
+        )
+        self.set_header("Access-Control-Expose-Headers", "etag")
         self.set_header("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
         self.set_header("Access-Control-Allow-Credentials", "true")
 
@@ -37,6 +44,21 @@ class BaseHandler(RequestHandler):
         self.set_status(status)
         self.finish(json.dumps(payload))
 
+    def not_modified(self, *version: Any) -> bool:
+        """Set a strong ETag derived from ``version`` and answer 304 if the client has it.
+
+        Call before serializing the body. ``version`` should change whenever the
+        representation does, e.g. a row id plus its ``updated_at``. Responses without an
+        explicit version still get Tornado's content-hash ETag in ``finish``.
+        """
+        digest = hashlib.sha256("\x1f".join(str(part) for part in version).encode("utf-8"))
+        self.set_header("Etag", f'"{digest.hexdigest()[:32]}"')
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return True
+        return False
+
     def get_bearer_token(self) -> Optional[str]:
         auth_header = self.request.headers.get("Authorization")
         if not auth_header:
@@ -45,3 +67,22 @@ class BaseHandler(RequestHandler):
         if len(parts) != 2 or parts[0].lower() != "bearer":
             return None
         return parts[1]
+
+    def get_current_user_id(self) -> Optional[uuid.UUID]:
+        """Return the bearer token's user id, or write a 401 and return None."""
+        token = self.get_bearer_token()
+        if not token:
+            self.write_json(401, {"error": "missing bearer token"})
+            return None
+
+        try:
+            payload = decode_access_token(token)
+        except jwt.PyJWTError:
+            self.write_json(401, {"error": "invalid token"})
+            return None
+
+        try:
+            return uuid.UUID(payload.get("sub") or "")
+        except ValueError:
+            self.write_json(401, {"error": "invalid token"})
+            return None
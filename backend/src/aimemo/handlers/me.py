@@ -1,40 +1,26 @@
-import uuid
-
-import jwt
 from sqlalchemy import select
 
-from ..auth import decode_access_token, serialize_user
-from ..db import SessionLocal
+from ..auth import serialize_user
+from ..db import read_session
 from ..models import User
 from .base import BaseHandler
 
 
 class MeHandler(BaseHandler):
     async def get(self) -> None:
-        token = self.get_bearer_token()
-        if not token:
-            self.write_json(401, {"error": "missing bearer token"})
-            return
-
-        try:
-            payload = decode_access_token(token)
-        except jwt.PyJWTError:
-            self.write_json(401, {"error": "invalid token"})
+        user_id = self.get_current_user_id()
+        if user_id is None:
             return
 
-        user_id = payload.get("sub")
-        if not user_id:
-            self.write_json(401, {"error": "invalid token"})
-            return
-
-        async with SessionLocal() as session:
-            result = await session.execute(
-                select(User).where(User.id == uuid.UUID(user_id))
-            )
+        async with read_session() as session:
+            result = await session.execute(select(User).where(User.id == user_id))
             user = result.scalar_one_or_none()
 
         if not user:
             self.write_json(404, {"error": "user not found"})
             return
 
+        if self.not_modified(user.id, user.updated_at.isoformat() if user.updated_at else ""):
+            return
+
         self.write_json(200, {"user": serialize_user(user)})
@@ -0,0 +1,27 @@
+from ..db import read_session
+from ..sync import DEFAULT_PAGE_SIZE, decode_cursor, fetch_changes, serialize_sync_page
+from .base import BaseHandler
+
+
+class SyncHandler(BaseHandler):
+    async def get(self) -> None:
+        user_id = self.get_current_user_id()
+        if user_id is None:
+            return
+
+        try:
+            since = decode_cursor(self.get_query_argument("since", None))
+        except ValueError as exc:
+            self.write_json(400, {"error": str(exc)})
+            return
+
+        try:
+            limit = int(self.get_query_argument("limit", str(DEFAULT_PAGE_SIZE)))
+        except ValueError:
+            self.write_json(400, {"error": "limit must be an integer"})
+            return
+
+        async with read_session() as session:
+            page = await fetch_changes(session, user_id, since, limit)
+
+        self.write_json(200, serialize_sync_page(page))
@@ -0,0 +1,178 @@
+import base64
+import binascii
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from sqlalchemy import BigInteger, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import CalendarItem, Conversation, Message, Reminder
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+_CURSOR_PREFIX = "v2:"
+_LEGACY_CURSOR_PREFIX = "v1:"
+
+# Oldest transaction still running, or the next one to start if none is. Every transaction
+# below it has finished, so no row with a smaller change_xid can appear later.
+_SNAPSHOT_XMIN = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+# (change_xid, change_seq) of the last change a client has seen.
+Cursor = tuple[int, int]
+
+
+@dataclass
+class SyncPage:
+    changes: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    deleted: dict[str, list[str]] = field(default_factory=dict)
+    cursor: str = ""
+    has_more: bool = False
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    raw = f"{_CURSOR_PREFIX}{cursor[0]}:{cursor[1]}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Cursor:
+    if not cursor:
+        return (0, 0)
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise ValueError("Invalid sync cursor") from exc
+    if raw.startswith(_LEGACY_CURSOR_PREFIX) and raw[len(_LEGACY_CURSOR_PREFIX) :].isdigit():
+        # change_seq-only cursors from before change_xid. They are not comparable with the new
+        # ordering, so the client re-reads everything once, tombstones included.
+        return (0, int(raw[len(_LEGACY_CURSOR_PREFIX) :]))
+    xid, _, seq = raw[len(_CURSOR_PREFIX) :].partition(":")
+    if not raw.startswith(_CURSOR_PREFIX) or not xid.isdigit() or not seq.isdigit():
+        raise ValueError("Invalid sync cursor")
+    return (int(xid), int(seq))
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def serialize_conversation(item: Conversation) -> dict[str, Any]:
+    return {
+        "id": str(item.id),
+        "title": item.title,
+        "created_at": _iso(item.created_at),
+        "updated_at": _iso(item.updated_at),
+    }
+
+
+def serialize_message(item: Message) -> dict[str, Any]:
+    return {
+        "id": str(item.id),
+        "conversation_id": str(item.conversation_id),
+        "sender_id": str(item.sender_id) if item.sender_id else None,
+        "role": item.role,
+        "body": item.body,
+        "created_at": _iso(item.created_at),
+        "updated_at": _iso(item.updated_at),
+    }
+
+
+def serialize_reminder(item: Reminder) -> dict[str, Any]:
+    return {
+        "id": str(item.id),
+        "title": item.title,
+        "notes": item.notes,
+        "due_at": _iso(item.due_at),
+        "done": item.done,
+        "created_at": _iso(item.created_at),
+        "updated_at": _iso(item.updated_at),
+    }
+
+
+def serialize_calendar_item(item: CalendarItem) -> dict[str, Any]:
+    return {
+        "id": str(item.id),
+        "title": item.title,
+        "notes": item.notes,
+        "starts_at": _iso(item.starts_at),
+        "ends_at": _iso(item.ends_at),
+        "all_day": item.all_day,
+        "created_at": _iso(item.created_at),
+        "updated_at": _iso(item.updated_at),
+    }
+
+
+_SYNC_KINDS: dict[str, tuple[Any, Callable[[Any], dict[str, Any]]]] = {
+    "conversations": (Conversation, serialize_conversation),
+    "messages": (Message, serialize_message),
+    "reminders": (Reminder, serialize_reminder),
+    "calendar_items": (CalendarItem, serialize_calendar_item),
+}
+
+
+def _owned_by(model: Any, user_id: uuid.UUID):
+    if model is Message:
+        owned_conversations = select(Conversation.id).where(Conversation.owner_id == user_id)
+        return Message.conversation_id.in_(owned_conversations)
+    return model.owner_id == user_id
+
+
+async def fetch_changes(
+    session: AsyncSession, user_id: uuid.UUID, since: Cursor, limit: int = DEFAULT_PAGE_SIZE
+) -> SyncPage:
+    """Return up to ``limit`` rows changed after ``since``, oldest change first.
+
+    Changes are ordered by writing transaction, then by ``change_seq``, across every table.
+    Only rows whose transaction is older than every transaction still running are returned.
+    A sequence value is taken before its transaction commits, so ordering by ``change_seq``
+    alone could move the cursor past a row that becomes visible later. A long-running write
+    transaction therefore delays newer changes until it ends, but none are skipped.
+    A first sync (``since == (0, 0)``) skips tombstones since the client has nothing to delete.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    horizon = (await session.execute(select(_SNAPSHOT_XMIN))).scalar_one()
+    candidates: list[tuple[Cursor, str, Any]] = []
+    for kind, (model, _) in _SYNC_KINDS.items():
+        statement = (
+            select(model)
+            .where(
+                _owned_by(model, user_id),
+                tuple_(model.change_xid, model.change_seq)
+                > tuple_(*since, types=(BigInteger, BigInteger)),
+                model.change_xid < horizon,
+            )
+            .order_by(model.change_xid, model.change_seq)
+            .limit(limit + 1)
+        )
+        if since == (0, 0):
+            statement = statement.where(model.deleted_at.is_(None))
+        result = await session.execute(statement)
+        candidates.extend(((row.change_xid, row.change_seq), kind, row) for row in result.scalars())
+
+    candidates.sort(key=lambda entry: entry[0])
+    page = candidates[:limit]
+
+    sync_page = SyncPage(
+        changes={kind: [] for kind in _SYNC_KINDS},
+        deleted={kind: [] for kind in _SYNC_KINDS},
+        cursor=encode_cursor(page[-1][0] if page else since),
+        has_more=len(candidates) > limit,
+    )
+    for _, kind, row in page:
+        if row.deleted_at is not None:
+            sync_page.deleted[kind].append(str(row.id))
+        else:
+            sync_page.changes[kind].append(_SYNC_KINDS[kind][1](row))
+    return sync_page
+
+
+def serialize_sync_page(page: SyncPage) -> dict[str, Any]:
+    return {
+        "changes": page.changes,
+        "deleted": page.deleted,
+        "cursor": page.cursor,
+        "has_more": page.has_more,
+    }